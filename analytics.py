@@ -0,0 +1,97 @@
+from leaderboards import Leaderboards
+from partitions import TeamIndex
+from rankings import TeamRankings
+
+# The dashboard's numbers, computed from a season's frames. They are plain
+# functions of DataFrames so the Streamlit page and the HTTP API (server.py)
+# share them; the optional rankings/leaderboards/team_index arguments take the
+# structures precomputed once per snapshot.
+
+
+def get_team_kpis(team_totals_data, selected_team, rankings=None):
+    # Rankings are built once per snapshot; build them here when called on a bare table
+    if rankings is None:
+        rankings = TeamRankings(team_totals_data)
+
+    # Get the KPIs for the selected team
+    team_kpis = team_totals_data.iloc[rankings.position(selected_team)].copy()
+
+    # Add the rankings of each KPI as new columns
+    for kpi, ranking in rankings.team_ranks(selected_team).items():
+        team_kpis[f'{kpi}_Ranking'] = ranking
+
+    return team_kpis[['pointsScored', 'twoPointersPercentage', 'threePointersPercentage', 'threePointersMade',
+                       'defensiveRebounds', 'offensiveRebounds', 'foulsCommited', 'foulsDrawn',
+                      'pointsScored_Ranking', 'twoPointersPercentage_Ranking', 'threePointersPercentage_Ranking',
+                      'threePointersMade_Ranking', 'offensiveRebounds_Ranking', 'defensiveRebounds_Ranking','assists','turnovers']]
+
+def get_top_teams(team_totals_data, rankings=None):
+    if rankings is None:
+        rankings = TeamRankings(team_totals_data)
+
+    # Create a dictionary to map original KPI names to display names
+    kpi_display_names = {
+        'pointsScored': 'POINTS PER GAME',
+        'twoPointersPercentage': 'FIELD GOALS PERCENTAGE',
+        'threePointersPercentage': '3 POINTS PERCENTAGE',
+        'threePointersMade': '3 POINTS MADE',
+        'defensiveRebounds': 'DEFENSIVE REBOUNDS',
+        'offensiveRebounds': 'OFFENSIVE REBOUNDS'
+    }
+
+    # The top team (metric value, team name) for each metric
+    return {display_name: rankings.leader(kpi) for kpi, display_name in kpi_display_names.items()}
+
+
+def get_top_players(players_data, selected_team, metric, display_name, top_n=5, leaderboards=None):
+    if leaderboards is None:
+        leaderboards = Leaderboards(players_data, {metric: top_n})
+
+    # Players with no value for the metric are left out of the leaderboards
+    top_players = leaderboards.top(selected_team, metric).head(top_n)
+
+    # Define a mapping for the column names
+    column_mapping = {'player.name': 'Player', metric: display_name}
+
+    # Rename the columns based on the mapping
+    top_players.rename(columns=column_mapping, inplace=True)
+
+    return top_players[['Player', display_name]]
+
+# Function to get top players based on PIR
+def get_top_players_pir(players_data, selected_team, top_n=3, leaderboards=None):
+    if leaderboards is None:
+        leaderboards = Leaderboards(players_data, {'pir': top_n})
+    top_players = leaderboards.top(selected_team, 'pir').head(top_n)
+    return top_players[['player.name', 'pir', 'player.imageUrl','pointsScored', 'totalRebounds', 'assists', 'steals']]  # Directly use 'player.imageUrl'
+
+# Function to get scoring distribution
+def get_scoring_distribution(players_data, selected_team, team_index=None):
+    if team_index is None:
+        team_index = TeamIndex(players_data)
+    team_data = team_index.rows(selected_team)
+    total_points = team_data['pointsScored'].sum()
+    return team_data[['player.name']].assign(**{'Percentage of Total Points': (team_data['pointsScored'] / total_points) * 100})
+
+# Function to list the teams, from whichever frame could be fetched
+def get_teams(team_standings_df, team_totals_data, players_data):
+    if team_standings_df is not None:
+        return team_standings_df['club.tvCode'].unique()
+    if team_totals_data is not None:
+        return team_totals_data['team.tvCodes'].unique()
+    return players_data['player.team.tvCodes'].unique()
+
+# Function to get a team's short name, falling back to its code without standings
+def get_team_name(team_standings_df, team_code):
+    if team_standings_df is None:
+        return team_code
+    return team_standings_df.loc[team_standings_df['club.tvCode'] == team_code, 'club.abbreviatedName'].iloc[0]
+
+# Function to get where a team's points come from (percent of its points)
+def get_shot_distribution(advanced_team_stats, selected_team):
+    team_data = advanced_team_stats[advanced_team_stats['team.tvCodes'] == selected_team]
+    return {
+        'Two-Pointers': float(team_data['pointsFromTwoPointersPercentage'].values[0]),
+        'Three-Pointers': float(team_data['pointsFromThreePointersPercentage'].values[0]),
+        'Free Throws': float(team_data['pointsFromFreeThrowsPercentage'].values[0]),
+    }
@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
 import os
-import plotly.express as px
 import time
-from schedule import every, repeat, run_pending
 from datetime import datetime
 import io
 
@@ -18,165 +16,117 @@ body {
 """
 
 
-# Updated imports for euroleague-api
-from euroleague_api.standings import Standings
-from euroleague_api.player_stats import PlayerStats
-from euroleague_api.team_stats import TeamStats
-
-
+# Season snapshots are fetched (concurrently), kept fresh by a background refresher
+# and persisted to disk so restarts start warm. Once a season's boxscores are
+# ingested, refreshes only download the games played since the last one. With
+# EUROLEAGUE_SHARED_URL set, replicas share one refresh per season (shared.py).
+from refresher import make_refresher
+from exports import CONTENT_TYPES, ExportCache, file_name
+from analytics import get_team_kpis, get_team_name, get_teams, get_top_players, get_top_players_pir, get_top_teams
+from figures import WARM_AFTER_REFRESH, FigureCache
+from images import ImageCache, load_logos
+from history import current_season, season_label
+from live import LIVE_MODE, LIVE_POLL_SECONDS, LiveMonitor
+from leaderboards import snapshot_leaderboards
+from matchups import all_seasons_matchups, snapshot_matchups
+from rankings import snapshot_rankings
+from schema import DISPLAY_COLUMNS
+from similarity import snapshot_similarity
+from simulation import snapshot_odds, warm_odds_async
+from timing import (counter_rows, gauge_rows, prometheus_text, set_gauge, start_metrics_log,
+                    summary as timing_summary, timed)
+from trends import trend_store
+
+
+# Plotly figures shared by every session, bounded LRU
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+# One refresher per server process, shared by every session
+@st.cache_resource
+def get_refresher():
+    # Stored seasons are loaded with only the columns the page shows
+    refresher = make_refresher(columns=DISPLAY_COLUMNS)
+    # Rolling trends are brought up to date with the rounds ingested for each new snapshot
+    refresher.subscribe(lambda snapshot: trend_store.update_async(snapshot.season))
+    if WARM_AFTER_REFRESH:
+        # Every team's charts are ready before its first visitor
+        refresher.subscribe(get_figure_cache().warm_async)
+    # The season odds (100k simulated seasons) are ready before the first page shows them
+    refresher.subscribe(warm_odds_async)
+    refresher.start()
+    # Metrics go to the log too when timing.METRICS_LOG_SECONDS is set
+    start_metrics_log()
+    return refresher
+
+# Follows the current season's games while they are played (live.py), one per server process
+@st.cache_resource
+def get_live_monitor():
+    return LiveMonitor(get_refresher(), current_season()).start()
+
+# Exports of the stored seasons, written once per snapshot version
+@st.cache_resource
+def get_export_cache():
+    return ExportCache(get_refresher().store)
+
+# Headshots are downloaded once, resized and served from the local image cache
+@st.cache_resource
+def get_headshot_cache():
+    return ImageCache()
+
+# Function to start caching the headshots of every team's PIR leaders, once per snapshot
+def prefetch_headshots(snapshot, leaderboards):
+    urls = [url for (team, stat), players in leaderboards.boards.items() if stat == 'pir'
+            for url in players['player.imageUrl']]
+    return snapshot.derive('headshots_prefetched', lambda s: get_headshot_cache().prefetch(urls))
+
+# Function to get the current snapshot of a season; after the first load this never waits on the network
+def get_snapshot(season):
+    return get_refresher().get(season)
 
 # Modify the get_api_data function to use the updated API calls
-@st.cache_data(ttl=1800)  # 30 minutes cache
 def get_api_data(season):
-    # Initialize API classes
-    standings_api = Standings()
-    player_stats_api = PlayerStats()
-    team_stats_api = TeamStats()
-
-    # Get the latest round number
-    round_number = None
-    for i in range(1, 35):  # Assuming max 34 rounds
-        try:
-            standings = standings_api.get_standings(season=season, round_number=i)
-            if standings is not None:
-                round_number = i
-        except Exception:
-            break
-
-    if round_number is None:
-        round_number = 1  # Default to 1 if no valid round found
-
-    # Get team standings
-    team_standings_df = standings_api.get_standings(season=season, round_number=round_number)
-
-    # Get TRADITIONAL team stats
-    team_stats_df = team_stats_api.get_team_stats_single_season(
-        endpoint='traditional',
-        season=season,
-        phase_type_code='RS',
-        statistic_mode="PerGame"
-    )
-    # Get ADVANCED team stats
-    advanced_team_stats_df = team_stats_api.get_team_stats_single_season(
-        endpoint='advanced',
-        season=season,
-        phase_type_code='RS',
-        statistic_mode="Accumulated"
-    )
-
-
-    # Get TRADITIONAL player stats
-    player_df = player_stats_api.get_player_stats_single_season(
-        endpoint='traditional',
-        season=season,
-        phase_type_code='RS',
-        statistic_mode="PerGame"
-    )
-
-    # Get ADVANCED player stats
-    advanced_player_df = player_stats_api.get_player_stats_single_season(
-        endpoint='advanced',
-        season=season,
-        phase_type_code='RS',
-        statistic_mode="Accumulated"
-    )
-
-    return team_standings_df, team_stats_df, advanced_team_stats_df, player_df, advanced_player_df, round_number
-
-def get_team_kpis(team_totals_data, selected_team):
-    # Get the KPIs for the selected team
-    team_kpis = team_totals_data[team_totals_data['team.tvCodes'] == selected_team].iloc[0]
-
-    # Create a dictionary to store the rankings for each KPI
-    rankings = {}
-
-    # Define the KPIs
-    kpis = ['pointsScored', 'twoPointersPercentage', 'threePointersPercentage', 'threePointersMade',
-            'offensiveRebounds', 'defensiveRebounds', 'foulsCommited', 'foulsDrawn']
-
-    # Calculate the ranking for each KPI
-    for kpi in kpis:
-        # Sort the teams based on the KPI in descending order and get the index (ranking)
-        ranking = team_totals_data.sort_values(by=kpi, ascending=False).index.get_loc(team_kpis.name) + 1
-        # Store the ranking in the dictionary
-        rankings[kpi] = ranking
-
-    # Add the rankings as new columns to the team_kpis DataFrame
-    for kpi, ranking in rankings.items():
-        team_kpis[f'{kpi}_Ranking'] = ranking
-
-    return team_kpis[['pointsScored', 'twoPointersPercentage', 'threePointersPercentage', 'threePointersMade',
-                       'defensiveRebounds', 'offensiveRebounds', 'foulsCommited', 'foulsDrawn',
-                      'pointsScored_Ranking', 'twoPointersPercentage_Ranking', 'threePointersPercentage_Ranking',
-                      'threePointersMade_Ranking', 'offensiveRebounds_Ranking', 'defensiveRebounds_Ranking','assists','turnovers']]
-
-def get_top_teams(team_totals_data):
-    # Create a dictionary to map original KPI names to display names
-    kpi_display_names = {
-        'pointsScored': 'POINTS PER GAME',
-        'twoPointersPercentage': 'FIELD GOALS PERCENTAGE',
-        'threePointersPercentage': '3 POINTS PERCENTAGE',
-        'threePointersMade': '3 POINTS MADE',
-        'defensiveRebounds': 'DEFENSIVE REBOUNDS',
-        'offensiveRebounds': 'OFFENSIVE REBOUNDS'
-    }
-
-    # Create a dictionary to store the top team for each metric
-    top_teams = {}
-
-    # Calculate the top team for each metric
-    for kpi, display_name in kpi_display_names.items():
-        # Get the top team for the current metric
-        top_team_row = team_totals_data.sort_values(by=kpi, ascending=False).iloc[0]
-        # Extract metric value and team name
-        metric_value = top_team_row[kpi]
-        team_name = top_team_row['team.tvCodes']
-        # Store the metric value and team name in the dictionary
-        top_teams[display_name] = (metric_value, team_name)
-
-    return top_teams
-
-
-def get_top_players(players_data, selected_team, metric, display_name, top_n=5):
-    team_data = players_data[players_data['player.team.tvCodes'] == selected_team]
-
-    # Convert the metric column to numeric
-    team_data[metric] = pd.to_numeric(team_data[metric], errors='coerce')
-
-    # Drop rows with NaN values in the metric column
-    team_data = team_data.dropna(subset=[metric])
-
-    top_players = team_data.nlargest(top_n, metric)
-
-    # Define a mapping for the column names
-    column_mapping = {'player.name': 'Player', metric: display_name}
-
-    # Rename the columns based on the mapping
-    top_players.rename(columns=column_mapping, inplace=True)
-
-    return top_players[['Player', display_name]]
-
-# Function to get top players based on PIR
-def get_top_players_pir(players_data, selected_team, top_n=3):
-    team_data = players_data[players_data['player.team.tvCodes'] == selected_team]
-    top_players = team_data.nlargest(top_n, 'pir')
-    return top_players[['player.name', 'pir', 'player.imageUrl','pointsScored', 'totalRebounds', 'assists', 'steals']]  # Directly use 'player.imageUrl'
-
-# Function to get scoring distribution
-def get_scoring_distribution(players_data, selected_team):
-    team_data = players_data[players_data['player.team.tvCodes'] == selected_team]
-    total_points = team_data['pointsScored'].sum()
-    team_data['Percentage of Total Points'] = (team_data['pointsScored'] / total_points) * 100
-    return team_data[['player.name', 'Percentage of Total Points']]
-
-# Function to load team logos
+    # A failed endpoint comes back as None and only its section is skipped
+    return get_snapshot(season).as_tuple()
+
+# Function to list the seasons to choose from: every season in the store
+# (see history.py to backfill them) and the current one, newest first
+def get_season_options():
+    seasons = set(get_refresher().store.seasons())
+    seasons.add(current_season())
+    seasons.add(st.session_state.selected_season)
+    return sorted(seasons, reverse=True)
+
+# Function to show, under the sidebar standings, each team's odds of finishing
+# in the top 4, 6 and 10 from simulating the rest of the season (once per round)
+def show_season_odds(snapshot):
+    odds = snapshot_odds(snapshot)
+    if odds is None:
+        return
+    st.sidebar.subheader("Season Odds")
+    table = pd.DataFrame({
+        'Team': odds['name'],
+        'Proj. W': odds['projected_wins'].round(1),
+        'Top 4': odds['top4'].map('{:.0%}'.format),
+        'Top 6': odds['top6'].map('{:.0%}'.format),
+        'Top 10': odds['top10'].map('{:.0%}'.format),
+    }).set_index('Team')
+    st.sidebar.table(table)
+    schedule = "the remaining schedule" if odds.attrs['from_schedule'] else "the remaining rounds (approximate pairings)"
+    st.sidebar.caption(f"{odds.attrs['trials']:,} simulations of {schedule}, {odds.attrs['remaining_games']} games, "
+                       f"with team strength from offensive and defensive ratings.")
+
+# Function to show a section (or chart) whose data could not be fetched
+def show_unavailable(title=None):
+    if title:
+        st.header(title, divider='orange')
+    st.warning("This section is temporarily unavailable, euroleague-api did not return its data.", icon="⚠️")
+
+# Function to load team logos, decoded and resized to their display width once per server process
+@st.cache_resource
 def load_team_logos(folder_path):
-    logos = {}
-    for file_name in os.listdir(folder_path):
-        if file_name.endswith(".png"):
-            team_name = file_name.split(".")[0]
-            logos[team_name] = os.path.join(folder_path, file_name)
-    return logos
+    return load_logos(folder_path)
 
 # Function to display team logo
 def display_team_logo(team_logos, selected_team):
@@ -192,55 +142,45 @@ logos_folder_path = "logos"
 team_logos = load_team_logos(logos_folder_path)
 
 
-def main():
-    st.set_page_config(page_title="Euroleague Dashboard", page_icon=":basketball:", layout='wide')
+# League-wide leaders, the same for every team; only rerun with the whole page
+@timed('top teams')
+def show_top_teams(snapshot):
+    team_standings_df, team_totals = snapshot.standings, snapshot.team_stats
 
+    if team_totals is not None:
+        # Get the top team for each metric
+        top_teams = get_top_teams(team_totals, snapshot_rankings(snapshot))
 
-    st.markdown(custom_css, unsafe_allow_html=True)
+        # Display the top team for each metric in the same format as the existing KPIs
+        st.header("Top Team for Each Metric (on Average)", divider='orange')
 
-    st.title(":basketball: :orange[Euroleague Dashboard ] :basketball:")
-    logo_path = "images.png"  # Replace with the actual path to your logo image
+        top_teams_layout = st.columns(6)
+        pd.set_option('display.max_columns', None)  # None means no limit
 
-    st.caption('This is an analytics Dashboard aimed to quickly provide a general overview on some of the most important metrics for each team playing in Euroleague.')
 
-    # Create a session state variable for the selected season
-    if 'selected_season' not in st.session_state:
-        st.session_state.selected_season = 2024  # Default to 2024
+        for i, (kpi, (metric_value, team_name)) in enumerate(top_teams.items()):
+            with top_teams_layout[i]:
+                box_style_metric = "border: 2px solid #8B4000; padding: 15px; background-color: rgba(206,206,206, 0.0); height: 130px; width: 100%; margin: 10px auto; border-radius: 2px;"
+                box_style_ranking = "border: 0px solid #ddd; padding: 15px; background-color: rgba(255,255,255, 0.0); height: 60px; width: 100%; margin: 10px auto; border-radius: 25px;"
 
-    # Load data based on selected season
-    team_standings_df, team_totals, advanced_team_stats_df, players_data, advanced_player_df,  round_number = get_api_data(season=st.session_state.selected_season)
+                # Percentages are stored as numbers (52.3), so add the sign back
+                unit = '%' if 'PERCENTAGE' in kpi else ''
+                metric_html = f"<div style='{box_style_metric}'><p style='font-size:16px;'>{kpi}</p><p style='font-size:28px;'>{metric_value:.1f}{unit}</p></div>"
 
-    pd.set_option('display.max_columns', 500)
-    print(advanced_player_df.head())
+                ranking_html = f"<div style='{box_style_ranking}'><p style='font-size:16px;'>RANKING :1 ({get_team_name(team_standings_df, team_name)})</p></div>"
 
-    st.info(
-        f'All data used for calculations are fetched from [euroleague-api](https://pypi.org/project/euroleague-api/), refreshing automatically.',
-        icon="ℹ️"
-    )
-
-    # Display the last refresh time in the app with selected season
-    st.success(
-        f'#### **Selected Season:** {st.session_state.selected_season}    \n'
-        f'#### **Latest Round:** {round_number}'
-    )
+                st.markdown(metric_html, unsafe_allow_html=True)
+                st.markdown(ranking_html, unsafe_allow_html=True)
+    else:
+        show_unavailable("Top Team for Each Metric (on Average)")
 
-    # Buttons for season selection under the info message
-    col1, col2 = st.columns(2)  # Create two columns for layout
 
-    with col1:
-        if st.button('Season 2023'):
-            st.session_state.selected_season = 2023  # Set selected season to 2023
-            team_standings_df, team_stats_df, advanced_team_stats_df, player_df, advanced_player_df, round_number = get_api_data(
-                season=st.session_state.selected_season)
-
-    with col2:
-        if st.button('Season 2024'):
-            st.session_state.selected_season = 2024  # Set selected season to 2024
-            team_standings_df, team_stats_df, advanced_team_stats_df, player_df, advanced_player_df, round_number = get_api_data(
-                season=st.session_state.selected_season)
-
-    # List of teams as buttons
-    teams = team_standings_df['club.tvCode'].unique()
+# KPIs, form and players of the team picked in top_team_selectbox. A fragment,
+# so changing the team reruns only this section, not the whole page
+@st.fragment
+@timed('team section')
+def team_section(snapshot, teams):
+    team_standings_df, team_totals, advanced_team_stats_df, players_data, advanced_player_df, round_number = snapshot.as_tuple()
 
     # Add a team selection dropdown to the sidebar with custom styling
     st.markdown("<h1 style='text-align: center;'>Select Team</h1>", unsafe_allow_html=True)
@@ -248,239 +188,349 @@ def main():
 
     display_team_logo(team_logos, selected_team)
 
-    # Button to show/hide standings table
-    show_standings_button = st.button("Show Standings")
+    if team_totals is not None:
+        # Display KPIs for the selected team
+        st.header(f"Team Stats for {selected_team} (on Average)", divider='orange')
 
-    # Get the top team for each metric
-    top_teams = get_top_teams(team_totals)
+        # Get KPIs for the selected team
+        team_kpis = get_team_kpis(team_totals, selected_team, snapshot_rankings(snapshot))
 
-    # Display the top team for each metric in the same format as the existing KPIs
-    st.header("Top Team for Each Metric (on Average)", divider='orange')
+        # Display KPIs in a row with st.success
+        col1, col2, col3, col4, col5, col6 = st.columns(6)
 
-    top_teams_layout = st.columns(6)
-    pd.set_option('display.max_columns', None)  # None means no limit
+        box_style = "border: 1px solid #32612D; padding: 15px; background-color: rgba(206,206,206, 0.3); height: 130px; width: 100%; margin: 0px auto; border-radius: 7px;"
+        box_style6 = "border: 0px solid #ddd; padding: 15px; background-color: rgba(255,255,255, 0.3); height: 60px; width: 100%; margin: 10px auto; border-radius: 25px;"
 
+        # Calculate the average for 'pointsFor' and 'pointsAgainst'
+        #avg_points_for = selected_team_data['pointsFor'].sum() / selected_team_data['gamesPlayed'].sum()
 
-    for i, (kpi, (metric_value, team_name)) in enumerate(top_teams.items()):
-        with top_teams_layout[i]:
-            box_style_metric = "border: 2px solid #8B4000; padding: 15px; background-color: rgba(206,206,206, 0.0); height: 130px; width: 100%; margin: 10px auto; border-radius: 2px;"
-            box_style_ranking = "border: 0px solid #ddd; padding: 15px; background-color: rgba(255,255,255, 0.0); height: 60px; width: 100%; margin: 10px auto; border-radius: 25px;"
+        with col1:
 
-            # Check if metric_value is a numeric type
-            if isinstance(metric_value, (int, float)):
-                metric_html = f"<div style='{box_style_metric}'><p style='font-size:16px;'>{kpi}</p><p style='font-size:28px;'>{metric_value:.1f}</p></div>"
-            else:
-                metric_html = f"<div style='{box_style_metric}'><p style='font-size:16px;'>{kpi}</p><p style='font-size:28px;'>{metric_value}</p></div>"
+            points_per_game_html = f"<div style='{box_style}'><p style='font-size:16px;'>POINTS PER GAME</p><p style='font-size:28px;'>{team_kpis['pointsScored']:.1f}</p></div>"
+            points_per_game_ranking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['pointsScored_Ranking']:}</p></div>"
 
-            ranking_html = f"<div style='{box_style_ranking}'><p style='font-size:16px;'>RANKING :1 ({team_standings_df['club.abbreviatedName'].iloc[team_standings_df[team_standings_df['club.tvCode'] == team_name].index[0]]})</p></div>"
+            st.markdown(points_per_game_html, unsafe_allow_html=True)
+            st.markdown(points_per_game_ranking_html, unsafe_allow_html=True)
 
-            st.markdown(metric_html, unsafe_allow_html=True)
-            st.markdown(ranking_html, unsafe_allow_html=True)
+        with col2:
+            field_goals_percentage_html = f"<div style='{box_style}'><p style='font-size:16px;'>FIELD GOALS PERCENTAGE</p><p style='font-size:28px;'>{team_kpis['twoPointersPercentage']:.1f}%</p></div>"
+            twoPointersPercentage_Ranking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['twoPointersPercentage_Ranking']:}</p></div>"
+            st.markdown(field_goals_percentage_html, unsafe_allow_html=True)
+            st.markdown(twoPointersPercentage_Ranking_html, unsafe_allow_html=True)
 
-    # Check if the button is clicked and show the standings table in the sidebar
-    if show_standings_button:
-        st.sidebar.table(team_standings_df[['position', 'club.abbreviatedName', 'gamesPlayed','gamesWon','gamesLost']].rename(
-            columns={'position': 'Position', 'club.editorialName': 'Team', 'gamesPlayed': 'Games', 'gamesWon': 'Won', 'gamesLost': 'Lost'}
-        ).set_index('Position', drop=True))
+        with col3:
+            three_pointers_percentage_html = f"<div style='{box_style}'><p style='font-size:16px;'>3 POINTS PERCENTAGE</p><p style='font-size:28px;'>{team_kpis['threePointersPercentage']:.1f}%</p></div>"
+            threePointersPercentage_Ranking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['threePointersPercentage_Ranking']:}</p></div>"
+            st.markdown(three_pointers_percentage_html, unsafe_allow_html=True)
+            st.markdown(threePointersPercentage_Ranking_html, unsafe_allow_html=True)
 
-    # Display KPIs for the selected team
-    st.header(f"Team Stats for {selected_team} (on Average)", divider='orange')
+        with col4:
+            threePointersMade_html = f"<div style='{box_style}'><p style='font-size:16px;'>3 POINTS MADE</p><p style='font-size:28px;'>{team_kpis['threePointersMade']:.1f}</p></div>"
+            threePointersMadeRanking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['threePointersMade_Ranking']:}</p></div>"
 
-    # Get KPIs for the selected team
-    team_kpis = get_team_kpis(team_totals, selected_team)
+            st.markdown(threePointersMade_html, unsafe_allow_html=True)
+            st.markdown(threePointersMadeRanking_html, unsafe_allow_html=True)
 
-    # Display KPIs in a row with st.success
-    col1, col2, col3, col4, col5, col6 = st.columns(6)
+        with col5:
+            defensiveRebounds_html = f"<div style='{box_style}'><p style='font-size:16px;'>DEFENSIVE REBOUNDS</p><p style='font-size:28px;'>{team_kpis['defensiveRebounds']:.1f}</p></div>"
+            defensiveReboundsRanking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['defensiveRebounds_Ranking']:}</p></div>"
 
-    box_style = "border: 1px solid #32612D; padding: 15px; background-color: rgba(206,206,206, 0.3); height: 130px; width: 100%; margin: 0px auto; border-radius: 7px;"
-    box_style6 = "border: 0px solid #ddd; padding: 15px; background-color: rgba(255,255,255, 0.3); height: 60px; width: 100%; margin: 10px auto; border-radius: 25px;"
+            st.markdown(defensiveRebounds_html, unsafe_allow_html=True)
+            st.markdown(defensiveReboundsRanking_html, unsafe_allow_html=True)
 
-    selected_team_data = team_standings_df[team_standings_df['club.tvCode'] == selected_team]
+        with col6:
+            offensiveRebounds_html = f"<div style='{box_style}'><p style='font-size:16px;'>OFFENSIVE REBOUNDS</p><p style='font-size:28px;'>{team_kpis['offensiveRebounds']:.1f}</p></div>"
+            offensiveReboundsRanking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['offensiveRebounds_Ranking']:}</p></div>"
 
-    # Calculate the average for 'pointsFor' and 'pointsAgainst'
-    #avg_points_for = selected_team_data['pointsFor'].sum() / selected_team_data['gamesPlayed'].sum()
+            st.markdown(offensiveRebounds_html, unsafe_allow_html=True)
+            st.markdown(offensiveReboundsRanking_html, unsafe_allow_html=True)
+    else:
+        team_kpis = None
+        show_unavailable(f"Team Stats for {selected_team} (on Average)")
+
+    if team_standings_df is not None:
+        # Display KPIs for the opponent team vs selected team
+        st.header(f"Form for {selected_team}", divider='orange')
+
+        # Display KPIs in a row with st.success
+        col7, col8, col9, col10 = st.columns(4)
+
+        box_style2 = "border: 1px solid #ddd; padding: 15px; background-color: rgba(255,255,255,0.1); height: 130px; width: 80%; margin: 10px auto; border-radius: 7px;"
+        box_style3 = "border: 2px solid #32612D; padding: 15px; background-color: rgba(206,206,206, 0.3); height: 130px; width: 100%; margin: 10px auto; border-radius: 7px;"
+        box_style4 = "border: 2px solid #FF0000; padding: 15px; background-color: rgba(206,206,206, 0.3); height: 130px; width: 100%; margin: 10px auto; border-radius: 7px;"
+        box_style5 = "border: 1px solid #ddd; padding: 15px; background-color: rgba(255,255,255,0.1); height: 180px; width: 80%; margin: 10px auto; border-radius: 7px;"
+
+        with col7:
+            selected_team_games_won = \
+            team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'gamesWon'].dropna().iloc[0]
+            selected_team_games_lost = \
+            team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'gamesLost'].dropna().iloc[0]
+
+            st.markdown(
+                f"<div style='{box_style3}'><p style='font-size:18px;'>GAMES WON</p><p style='font-size:40px;'>{int(selected_team_games_won)}</p></div>",
+                unsafe_allow_html=True
+            )
+            st.markdown(
+                f"<div style='{box_style4}'><p style='font-size:18px;'>GAMES LOST</p><p style='font-size:40px;'>{int(selected_team_games_lost)}</p></div>",
+                unsafe_allow_html=True
+            )
+
+        with col8:
+            home_record_html = f"<div style='{box_style2}'><p style='font-size:18px;'>HOME RECORD</p><p style='font-size:30px;'>{team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'homeRecord'].iloc[0]}</p></div>"
+            away_record_html = f"<div style='{box_style2}'><p style='font-size:18px;'>AWAY RECORD</p><p style='font-size:30px;'>{team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'awayRecord'].iloc[0]}</p></div>"
+
+            st.markdown(home_record_html, unsafe_allow_html=True)
+            st.markdown(away_record_html, unsafe_allow_html=True)
+
+        with col9:
+            selected_team_last_5_form = \
+            team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'last5Form'].values[0]
+            # Remove single quotes, square brackets from the string
+            selected_team_last_5_form = str(selected_team_last_5_form).replace("'", "").replace("[", "").replace("]", "")
+
+            st.markdown(
+                f"<div style='{box_style5}'><p style='font-size:18px;'>LAST FIVE GAME (W - L)</p><p style='font-size:30px;'>{selected_team_last_5_form}</p></div>",
+                unsafe_allow_html=True
+            )
+
+        # 4th column with a bar chart
+        with col10:
+            if team_kpis is None:
+                st.warning("Team stats unavailable", icon="⚠️")
+            else:
+                # Calculate the ratio
+                if team_kpis['turnovers'] != 0:
+                    ratio_value = team_kpis['assists'] / team_kpis['turnovers']
+                else:
+                    ratio_value = 0  # or any other suitable value
 
-    with col1:
+                # Combine AVG assists, AVG turnovers, and RATIO in the same box with RATIO on the next line
+                combined_html = f"<div style='{box_style5}'><p style='font-size:18px;'>AVG ASSISTS / AVG TURNOVERS</p><p style='font-size:30px;'>{team_kpis['assists']:.1f} / {team_kpis['turnovers']:.1f}</p><p style='font-size:16px;'>RATIO (higher = better): {ratio_value:.2f}</p></div>"
 
-        points_per_game_html = f"<div style='{box_style}'><p style='font-size:16px;'>POINTS PER GAME</p><p style='font-size:28px;'>{team_kpis['pointsScored']:.1f}</p></div>"
-        points_per_game_ranking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['pointsScored_Ranking']:}</p></div>"
+                # Display the combined box
+                st.markdown(combined_html, unsafe_allow_html=True)
+    else:
+        show_unavailable(f"Form for {selected_team}")
+
+    if players_data is not None:
+        # Every team's leaderboards are built once per snapshot, switching teams is a lookup
+        players_leaderboards = snapshot_leaderboards(snapshot)
+        prefetch_headshots(snapshot, players_leaderboards)
+
+        # Add a row with three columns to show top players based on PIR
+        st.header(f"Top 3 Players Based on PIR (Performance Index Rating) for {selected_team}", divider='orange')
+
+        # Create a 1x3 grid layout for top players
+        top_players_layout = st.columns(3)
+
+        # Get top players based on PIR
+        top_pir_players = get_top_players_pir(players_data, selected_team, leaderboards=players_leaderboards)
+
+        # Display top players in each column
+        for i, (col, player_info) in enumerate(zip(top_players_layout, top_pir_players.iterrows())):
+            col.subheader(f"#{i + 1} {player_info[1]['player.name']}")
+
+            # Create a box with player image, PIR, and additional statistics
+            with col:
+                # Cached headshot; players first seen in boxscores get a placeholder
+                st.image(get_headshot_cache().get(player_info[1]['player.imageUrl']),
+                         width=130)  # Display player image with a maximum width of 130 pixels
+
+                # Display PIR value with font size 20 and bold
+                st.markdown(f"<p style='font-size: 22px;'><strong>PIR: {player_info[1]['pir']:.2f}</strong></p>",
+                            unsafe_allow_html=True)
+
+                # Convert percentage string to numeric for formatting
+                avg_points = float(player_info[1]['pointsScored'])
+                avg_rebounds = float(player_info[1]['totalRebounds'])
+                avg_assists = float(player_info[1]['assists'])
+
+                # Calculate total of average points, rebounds, and assists
+                total_avg = avg_points + avg_rebounds + avg_assists
+
+                # Display additional statistics with font size 15
+                st.markdown(f"Avg Points: {avg_points:.2f}", unsafe_allow_html=True)
+                st.markdown(f"Avg Rebounds: {avg_rebounds:.2f}", unsafe_allow_html=True)
+                st.markdown(f"Avg Assists: {avg_assists:.2f}", unsafe_allow_html=True)
+                # Display total of average points, rebounds, and assists
+                st.markdown(f"**Total Pts/Rebs/Asts: {total_avg:.2f}**", unsafe_allow_html=True)
+
+                st.divider()
+
+
+    # Display top players tables
+        st.header("Top 5 Players Categorized by :", divider='orange')
+
+        # Create a 2x2 grid layout for top players
+        top_players_layout = st.columns(2)
+
+        # Top 5 players in PPG
+        with top_players_layout[0]:
+            st.subheader("Points per game:")
+            top_ppg_players = get_top_players(players_data, selected_team, 'pointsScored', 'Points', leaderboards=players_leaderboards)
+            st.table(top_ppg_players.style.format({'Points': '{:.2f}'}))
+
+        # Top 5 players in RPG
+        with top_players_layout[1]:
+            st.subheader("Rebounds per game:")
+            top_rpg_players = get_top_players(players_data, selected_team, 'totalRebounds', 'Rebounds', leaderboards=players_leaderboards)
+            st.table(top_rpg_players.style.format({'Rebounds': '{:.2f}'}))
+
+        # Top 5 players in APG
+        with top_players_layout[0]:
+            st.subheader("Assists per game:")
+            top_apg_players = get_top_players(players_data, selected_team, 'assists', 'Assists', leaderboards=players_leaderboards)
+            st.table(top_apg_players.style.format({'Assists': '{:.2f}'}))
+
+        # Top 5 players in SPG
+        with top_players_layout[1]:
+            st.subheader("Steals per game:")
+            top_spg_players = get_top_players(players_data, selected_team, 'steals', 'Steals', leaderboards=players_leaderboards)
+            st.table(top_spg_players.style.format({'Steals': '{:.2f}'}))
+    else:
+        show_unavailable("Top Players")
 
-        st.markdown(points_per_game_html, unsafe_allow_html=True)
-        st.markdown(points_per_game_ranking_html, unsafe_allow_html=True)
 
+# Head-to-head and opponent-adjusted ratings of two teams, read from the
+# snapshot's team x team matchup matrices
+@st.fragment
+@timed('compare')
+def compare_section(snapshot, teams):
+    st.header("Compare Two Teams", divider='orange')
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        team_a = st.selectbox("Team", teams, key='compare_team_a')
     with col2:
-        # Extract the numeric part of the string and convert to float
-        two_pointers_percentage_str = team_kpis['twoPointersPercentage']
-        numeric_percentage = float(two_pointers_percentage_str.rstrip('%'))
-
-        field_goals_percentage_html = f"<div style='{box_style}'><p style='font-size:16px;'>FIELD GOALS PERCENTAGE</p><p style='font-size:28px;'>{numeric_percentage:.1f}%</p></div>"
-        twoPointersPercentage_Ranking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['twoPointersPercentage_Ranking']:}</p></div>"
-        st.markdown(field_goals_percentage_html, unsafe_allow_html=True)
-        st.markdown(twoPointersPercentage_Ranking_html, unsafe_allow_html=True)
-
+        team_b = st.selectbox("Opponent", teams, index=min(1, len(teams) - 1), key='compare_team_b')
     with col3:
-        three_pointers_percentage_str = team_kpis['threePointersPercentage']
-        numeric_three_pointers_percentage = float(three_pointers_percentage_str.rstrip('%'))
+        all_seasons = st.toggle("All stored seasons", key='compare_all_seasons')
 
-        three_pointers_percentage_html = f"<div style='{box_style}'><p style='font-size:16px;'>3 POINTS PERCENTAGE</p><p style='font-size:28px;'>{numeric_three_pointers_percentage:.1f}%</p></div>"
-        threePointersPercentage_Ranking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['threePointersPercentage_Ranking']:}</p></div>"
-        st.markdown(three_pointers_percentage_html, unsafe_allow_html=True)
-        st.markdown(threePointersPercentage_Ranking_html, unsafe_allow_html=True)
+    matchups = all_seasons_matchups(snapshot) if all_seasons else snapshot_matchups(snapshot)
+    comparison = matchups.compare(team_a, team_b)
+    if comparison is None or team_a == team_b:
+        st.info("Pick two different teams to compare.", icon="ℹ️")
+        return
 
+    wins_a, wins_b = comparison['wins']
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Head-to-head games", comparison['games'])
+    col2.metric(f"{team_a} - {team_b} wins", f"{wins_a} - {wins_b}")
+    if comparison['average_point_diff'] is not None:
+        col3.metric(f"Average point difference for {team_a}", f"{comparison['average_point_diff']:+.1f}")
+    else:
+        col3.metric(f"Average point difference for {team_a}", "-")
+
+    ratings = pd.DataFrame({
+        'Offensive Rating': comparison['offensive_rating'],
+        'Defensive Rating': comparison['defensive_rating'],
+        'Opponent-Adjusted Offense': comparison['adjusted_offense'],
+        'Opponent-Adjusted Defense': comparison['adjusted_defense'],
+    }, index=[team_a, team_b]).round(1)
+    st.table(ratings)
+    if not pd.isna(comparison['net_diff']):
+        st.caption(f"Adjusted net rating, {team_a} minus {team_b}: {comparison['net_diff']:+.1f} points per "
+                   f"100 possessions. Head-to-head numbers cover ingested games only.")
+
+
+# Players whose per-game profile is closest to a picked player, this season or
+# across every stored one, from the shared similarity index
+@st.fragment
+@timed('similar')
+def similar_players_section(snapshot, teams):
+    st.header("Similar Players", divider='orange')
+    index = snapshot_similarity(snapshot, store=get_refresher().store)
+    col1, col2, col3, col4 = st.columns([2, 3, 1, 1])
+    with col1:
+        team = st.selectbox("Team", teams, key='similar_team')
+    with col2:
+        player = st.selectbox("Player", index.players(snapshot.season, team), key='similar_player')
+    with col3:
+        k = st.number_input("Players", min_value=1, max_value=50, value=10, key='similar_k')
     with col4:
-        threePointersMade_html = f"<div style='{box_style}'><p style='font-size:16px;'>3 POINTS MADE</p><p style='font-size:28px;'>{team_kpis['threePointersMade']:.1f}</p></div>"
-        threePointersMadeRanking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['threePointersMade_Ranking']:}</p></div>"
-
-        st.markdown(threePointersMade_html, unsafe_allow_html=True)
-        st.markdown(threePointersMadeRanking_html, unsafe_allow_html=True)
-
-    with col5:
-        defensiveRebounds_html = f"<div style='{box_style}'><p style='font-size:16px;'>DEFENSIVE REBOUNDS</p><p style='font-size:28px;'>{team_kpis['defensiveRebounds']:.1f}</p></div>"
-        defensiveReboundsRanking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['defensiveRebounds_Ranking']:}</p></div>"
-
-        st.markdown(defensiveRebounds_html, unsafe_allow_html=True)
-        st.markdown(defensiveReboundsRanking_html, unsafe_allow_html=True)
-
-    with col6:
-        offensiveRebounds_html = f"<div style='{box_style}'><p style='font-size:16px;'>OFFENSIVE REBOUNDS</p><p style='font-size:28px;'>{team_kpis['offensiveRebounds']:.1f}</p></div>"
-        offensiveReboundsRanking_html = f"<div style='{box_style6}'><p style='font-size:16px;'>RANKING : {team_kpis['offensiveRebounds_Ranking']:}</p></div>"
-
-        st.markdown(offensiveRebounds_html, unsafe_allow_html=True)
-        st.markdown(offensiveReboundsRanking_html, unsafe_allow_html=True)
-
-    # Display KPIs for the opponent team vs selected team
-    st.header(f"Form for {selected_team}", divider='orange')
-
-    # Display KPIs in a row with st.success
-    col7, col8, col9, col10 = st.columns(4)
-
-    box_style2 = "border: 1px solid #ddd; padding: 15px; background-color: rgba(255,255,255,0.1); height: 130px; width: 80%; margin: 10px auto; border-radius: 7px;"
-    box_style3 = "border: 2px solid #32612D; padding: 15px; background-color: rgba(206,206,206, 0.3); height: 130px; width: 100%; margin: 10px auto; border-radius: 7px;"
-    box_style4 = "border: 2px solid #FF0000; padding: 15px; background-color: rgba(206,206,206, 0.3); height: 130px; width: 100%; margin: 10px auto; border-radius: 7px;"
-    box_style5 = "border: 1px solid #ddd; padding: 15px; background-color: rgba(255,255,255,0.1); height: 180px; width: 80%; margin: 10px auto; border-radius: 7px;"
-
-    with col7:
-        selected_team_games_won = \
-        pd.to_numeric(team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'gamesWon'],
-                      errors='coerce').dropna().iloc[0]
-        selected_team_games_lost = \
-        pd.to_numeric(team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'gamesLost'],
-                      errors='coerce').dropna().iloc[0]
-
-        st.markdown(
-            f"<div style='{box_style3}'><p style='font-size:18px;'>GAMES WON</p><p style='font-size:40px;'>{int(selected_team_games_won)}</p></div>",
-            unsafe_allow_html=True
-        )
-        st.markdown(
-            f"<div style='{box_style4}'><p style='font-size:18px;'>GAMES LOST</p><p style='font-size:40px;'>{int(selected_team_games_lost)}</p></div>",
-            unsafe_allow_html=True
-        )
-
-    with col8:
-        home_record_html = f"<div style='{box_style2}'><p style='font-size:18px;'>HOME RECORD</p><p style='font-size:30px;'>{team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'homeRecord'].iloc[0]}</p></div>"
-        away_record_html = f"<div style='{box_style2}'><p style='font-size:18px;'>AWAY RECORD</p><p style='font-size:30px;'>{team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'awayRecord'].iloc[0]}</p></div>"
-
-        st.markdown(home_record_html, unsafe_allow_html=True)
-        st.markdown(away_record_html, unsafe_allow_html=True)
-
-    with col9:
-        selected_team_last_5_form = \
-        team_standings_df.loc[team_standings_df['club.tvCode'] == selected_team, 'last5Form'].values[0]
-        # Remove single quotes, square brackets from the string
-        selected_team_last_5_form = str(selected_team_last_5_form).replace("'", "").replace("[", "").replace("]", "")
-
-        st.markdown(
-            f"<div style='{box_style5}'><p style='font-size:18px;'>LAST FIVE GAME (W - L)</p><p style='font-size:30px;'>{selected_team_last_5_form}</p></div>",
-            unsafe_allow_html=True
-        )
-
-    # 4th column with a bar chart
-    with col10:
-
-        # Calculate the ratio
-        if team_kpis['turnovers'] != 0:
-            ratio_value = team_kpis['assists'] / team_kpis['turnovers']
-        else:
-            ratio_value = 0  # or any other suitable value
-
-        # Combine AVG assists, AVG turnovers, and RATIO in the same box with RATIO on the next line
-        combined_html = f"<div style='{box_style5}'><p style='font-size:18px;'>AVG ASSISTS / AVG TURNOVERS</p><p style='font-size:30px;'>{team_kpis['assists']:.1f} / {team_kpis['turnovers']:.1f}</p><p style='font-size:16px;'>RATIO (higher = better): {ratio_value:.2f}</p></div>"
-
-        # Display the combined box
-        st.markdown(combined_html, unsafe_allow_html=True)
-
-
-
-    # Add a row with three columns to show top players based on PIR
-    st.header(f"Top 3 Players Based on PIR (Performance Index Rating) for {selected_team}", divider='orange')
-
-    # Create a 1x3 grid layout for top players
-    top_players_layout = st.columns(3)
-
-    # Get top players based on PIR
-    top_pir_players = get_top_players_pir(players_data, selected_team)
-
-    # Display top players in each column
-    for i, (col, player_info) in enumerate(zip(top_players_layout, top_pir_players.iterrows())):
-        col.subheader(f"#{i + 1} {player_info[1]['player.name']}")
-
-        # Create a box with player image, PIR, and additional statistics
-        with col:
-            st.image(player_info[1]['player.imageUrl'],
-                     width=130)  # Display player image with a maximum width of 100 pixels
-
-            # Display PIR value with font size 20 and bold
-            st.markdown(f"<p style='font-size: 22px;'><strong>PIR: {player_info[1]['pir']:.2f}</strong></p>",
-                        unsafe_allow_html=True)
-
-            # Convert percentage string to numeric for formatting
-            avg_points = float(player_info[1]['pointsScored'])
-            avg_rebounds = float(player_info[1]['totalRebounds'])
-            avg_assists = float(player_info[1]['assists'])
-
-            # Calculate total of average points, rebounds, and assists
-            total_avg = avg_points + avg_rebounds + avg_assists
-
-            # Display additional statistics with font size 15
-            st.markdown(f"Avg Points: {avg_points:.2f}", unsafe_allow_html=True)
-            st.markdown(f"Avg Rebounds: {avg_rebounds:.2f}", unsafe_allow_html=True)
-            st.markdown(f"Avg Assists: {avg_assists:.2f}", unsafe_allow_html=True)
-            # Display total of average points, rebounds, and assists
-            st.markdown(f"**Total Pts/Rebs/Asts: {total_avg:.2f}**", unsafe_allow_html=True)
-
-            st.divider()
-
-
-# Display top players tables
-    st.header("Top 5 Players Categorized by :", divider='orange')
-
-    # Create a 2x2 grid layout for top players
-    top_players_layout = st.columns(2)
-
-    # Top 5 players in PPG
-    with top_players_layout[0]:
-        st.subheader("Points per game:")
-        top_ppg_players = get_top_players(players_data, selected_team, 'pointsScored', 'Points')
-        st.table(top_ppg_players.style.format({'Points': '{:.2f}'}))
-
-    # Top 5 players in RPG
-    with top_players_layout[1]:
-        st.subheader("Rebounds per game:")
-        top_rpg_players = get_top_players(players_data, selected_team, 'totalRebounds', 'Rebounds')
-        st.table(top_rpg_players.style.format({'Rebounds': '{:.2f}'}))
-
-    # Top 5 players in APG
-    with top_players_layout[0]:
-        st.subheader("Assists per game:")
-        top_apg_players = get_top_players(players_data, selected_team, 'assists', 'Assists')
-        st.table(top_apg_players.style.format({'Assists': '{:.2f}'}))
-
-    # Top 5 players in SPG
-    with top_players_layout[1]:
-        st.subheader("Steals per game:")
-        top_spg_players = get_top_players(players_data, selected_team, 'steals', 'Steals')
-        st.table(top_spg_players.style.format({'Steals': '{:.2f}'}))
-
+        all_seasons = st.toggle("All stored seasons", key='similar_all_seasons')
+
+    similar = None
+    if player is not None:
+        similar = index.most_similar(snapshot.season, player, team, k=k,
+                                     seasons=None if all_seasons else [snapshot.season])
+    if similar is None or similar.empty:
+        st.info("Pick a player with enough games this season.", icon="ℹ️")
+        return
+
+    st.dataframe(pd.DataFrame({
+        'Season': similar['Season'].map(season_label),
+        'Player': similar['player.name'],
+        'Team': similar['player.team.tvCodes'],
+        'Similarity': (100 * similar['similarity'].astype('float64')).round(1),
+    }), hide_index=True, use_container_width=True)
+    usage = index.memory_usage()
+    st.caption(f"Cosine similarity of standardized per-game traditional and advanced stats. Index: "
+               f"{usage['players']:,} players over {usage['seasons']} season{'s' if usage['seasons'] != 1 else ''}, "
+               f"{(usage['vectors_bytes'] + usage['labels_bytes']) / 1e6:.2f} MB.")
+
+
+EXPORT_LABELS = {'standings': 'Standings', 'team_kpis': 'Team KPIs and ranks',
+                 'players': 'Player stats (traditional + advanced)'}
+
+# Scores of the games being played, rerun on its own every LIVE_POLL_SECONDS.
+# When a game ends it is added to the season's snapshot (as is any refresh);
+# the whole page then reruns with it, so standings, W/L and form keep up with
+# the games without reloading the page.
+@st.fragment(run_every=LIVE_POLL_SECONDS)
+@timed('live')
+def live_section(snapshot):
+    current = get_refresher().peek(snapshot.season)
+    if current is not None and current.version != snapshot.version:
+        st.rerun()
+    games = get_live_monitor().scoreboard()
+    if not games:
+        return
+    st.header("Live", divider='orange')
+    names = {}
+    if snapshot.standings is not None and 'club.code' in snapshot.standings:
+        names = dict(zip(snapshot.standings['club.code'].astype(str), snapshot.standings['club.abbreviatedName']))
+    scores = pd.DataFrame(games).drop(columns='gamecode')
+    scores['home'] = scores['home'].map(lambda code: names.get(code, code))
+    scores['away'] = scores['away'].map(lambda code: names.get(code, code))
+    st.dataframe(scores.rename(columns=str.title), hide_index=True, use_container_width=True)
+
+
+# League-wide tables of any stored season as CSV, Parquet or Excel. The file is
+# written in the background as soon as it is picked, then reused for the same round.
+@st.fragment
+@timed('export')
+def export_section(snapshot):
+    st.header("Export Data", divider='orange')
+    seasons = get_season_options()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        season = st.selectbox("Season", seasons, index=seasons.index(snapshot.season), format_func=season_label,
+                              key='export_season')
+    with col2:
+        table = st.selectbox("Table", list(EXPORT_LABELS), format_func=EXPORT_LABELS.get, key='export_table')
+    with col3:
+        fmt = st.selectbox("Format", list(CONTENT_TYPES), format_func=str.upper, key='export_format')
+
+    exports = get_export_cache()
+    version = exports.version(season)
+    if version is None:
+        st.info(f"Season {season_label(season)} is not stored yet.", icon="ℹ️")
+        return
+    if not exports.is_written(season, table, fmt):
+        # A click before it's written waits for the same write
+        exports.write_async(season, table, fmt)
+        st.caption("Preparing the file. Excel exports of every player can take up to half a minute the first time.")
+    st.download_button(f"Download {EXPORT_LABELS[table]} ({fmt.upper()})",
+                       data=lambda: exports.read(season, table, fmt),
+                       file_name=file_name(season, table, fmt, version), mime=CONTENT_TYPES[fmt],
+                       on_click='ignore', key='export_download')
+
+
+# Charts of the team picked in chart_team_selectbox, a fragment like team_section
+@st.fragment
+@timed('charts')
+def chart_section(snapshot, teams):
+    team_standings_df, team_totals, advanced_team_stats_df, players_data, advanced_player_df, round_number = snapshot.as_tuple()
 
     # Add a team selection dropdown to the sidebar with custom styling
     st.markdown("<h1 style='text-align: center;'>Select Team for Charts</h1>", unsafe_allow_html=True)
@@ -490,223 +540,134 @@ def main():
     # Display charts for the selected team
     st.header(f"Charts for {selected_team}", divider='orange')
 
-    # Get scoring distribution for selected team from team totals
-    scoring_distribution_team_totals = get_scoring_distribution(players_data, selected_team)
-
-    # Create a Plotly bar chart
-    fig = px.bar(
-        scoring_distribution_team_totals,
-        x='player.name',
-        y='Percentage of Total Points',
-        title=f'Scoring Distribution for Team: {selected_team}',
-        labels={'player.name': 'Player', 'Percentage of Total Points': 'Percentage of Total Points'},
-        color_discrete_sequence=['#32612D']
-    )
-
-
-    # Update layout
-    fig.update_layout(
-        xaxis_title='',  # Hide x-axis title
-        showlegend=False,  # Hide legend
-        xaxis_tickangle=-45,  # Rotate x-axis labels for better readability
-        plot_bgcolor='#fbf7f5',  # Set background color
-        height=400,  # Set a maximum height
-    )
-
-    fig.update_traces(textposition='outside', width=0.5)
-
-    # Display the Plotly figure in Streamlit
-    st.plotly_chart(fig, use_container_width=True)  # Responsive chart
-
-
+    # Figures are built once per snapshot and team, and only looked up on reruns
+    figures = get_figure_cache()
+
+    # Each chart with its rolling trend over the season's rounds next to it
+    for chart, trend_chart in [('scoring_distribution', 'pir_trend'), ('points', 'points_trend'),
+                               ('shot_distribution', 'shooting_trend')]:
+        for column, name in zip(st.columns(2), [chart, trend_chart]):
+            with column:
+                fig = figures.get(snapshot, selected_team, name)
+                if fig is not None:
+                    st.plotly_chart(fig, use_container_width=True)  # Responsive chart
+                elif name == trend_chart:
+                    st.info("Trends appear once this season's games are ingested.", icon="ℹ️")
+                else:
+                    show_unavailable()
+
+        st.divider()
+
+    if advanced_player_df is not None:
+        # Use Streamlit columns to display the charts side by side
+        col1, col2, col3 = st.columns(3)
+
+        # Display each pie chart in its respective column
+        with col1:
+            st.plotly_chart(figures.get(snapshot, selected_team, 'three_point_attempts'), use_container_width=True)
+
+        with col2:
+            st.plotly_chart(figures.get(snapshot, selected_team, 'two_point_attempts'), use_container_width=True)
+
+        with col3:
+            st.plotly_chart(figures.get(snapshot, selected_team, 'free_throw_attempts'), use_container_width=True)
+    else:
+        show_unavailable()
+
+
+# Hidden panel with the process' metrics: stage timings (fetch per endpoint,
+# normalization, derived tables, figure builds, page sections), cache hits and
+# misses, snapshot memory, and the same numbers as Prometheus text
+def admin_panel():
+    set_gauge('cached_figures', len(get_figure_cache()))
+    st.header("Admin", divider='orange')
+    stages, caches, memory, metrics = st.tabs(["Stages", "Caches", "Memory", "Prometheus"])
+    with stages:
+        st.dataframe(pd.DataFrame(timing_summary()).T.sort_index(), use_container_width=True)
+    with caches:
+        st.dataframe(pd.DataFrame(counter_rows()), hide_index=True, use_container_width=True)
+    with memory:
+        cache = get_refresher().cache.stats()
+        st.caption(f"Snapshots: {cache['seasons']} seasons, {cache['bytes'] / 1e6:.1f} MB of "
+                   f"{cache['budget_bytes'] / 1e6:.0f} MB, pinned {cache['pinned']}. "
+                   f"{cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions")
+        st.dataframe(pd.DataFrame(gauge_rows()), hide_index=True, use_container_width=True)
+    with metrics:
+        st.code(prometheus_text(), language='text')
+
+
+@timed('page')
+def main():
+    st.set_page_config(page_title="Euroleague Dashboard", page_icon=":basketball:", layout='wide')
 
-    # Filter the DataFrame for the selected team
-    selected_team_data = team_standings_df[team_standings_df['club.tvCode'] == selected_team]
-    selected_team_data_advanced = advanced_team_stats_df[advanced_team_stats_df['team.tvCodes'] == selected_team]
-    selected_team_data_players = advanced_player_df[advanced_player_df['player.team.tvCodes'] == selected_team]
 
-    st.divider()
+    st.markdown(custom_css, unsafe_allow_html=True)
 
-    # Calculate the average for 'pointsFor' and 'pointsAgainst'
-    avg_points_for = team_kpis['pointsScored']
-    avg_points_against = selected_team_data['pointsAgainst'].sum() / selected_team_data['gamesPlayed'].sum()
+    st.title(":basketball: :orange[Euroleague Dashboard ] :basketball:")
+    logo_path = "images.png"  # Replace with the actual path to your logo image
 
-    # Combine the average points for and against into a DataFrame
-    avg_data = pd.DataFrame({
-        'Metric': ['Average Points Scored', 'Average Points Conceded'],
-        'Value': [avg_points_for, avg_points_against]
-    })
+    st.caption('This is an analytics Dashboard aimed to quickly provide a general overview on some of the most important metrics for each team playing in Euroleague.')
 
-    # Set colors for the bars
-    colors = ['#32612D', '#FF0000']
+    # Create a session state variable for the selected season
+    if 'selected_season' not in st.session_state:
+        st.session_state.selected_season = current_season()  # Default to the season being played
 
-    fig2 = px.bar(
-        avg_data,
-        x='Metric',
-        y='Value',
-        title=f'Average Points SCORED vs CONCEDED for Team: {selected_team}',
-        color='Metric',
-        color_discrete_sequence=colors,
-        labels={'Metric': 'Metrics', 'Value': 'Average Points'},  # Added label for Metric
-        text='Value'  # Display the average points as text on the bars
-    )
+    # Load data based on selected season
+    snapshot = get_snapshot(st.session_state.selected_season)
+    team_standings_df, team_totals, advanced_team_stats_df, players_data, advanced_player_df,  round_number = snapshot.as_tuple()
 
-    # Update layout to customize appearance
-    fig2.update_layout(
-        xaxis_title='',  # Hide x-axis title
-        yaxis_title='Average Points',  # Y-axis title
-        plot_bgcolor='#fbf7f5',  # Set background color
-        height=500,  # Increase height for more space (adjust as needed)
-        showlegend=False,  # Hide legend
-        margin=dict(t=60, b=20, l=40, r=20)  # Add margin to the plot
+    st.info(
+        f'All data used for calculations are fetched from [euroleague-api](https://pypi.org/project/euroleague-api/), refreshing automatically.',
+        icon="ℹ️"
     )
 
-    # Update the text position above the bars
-    fig2.update_traces(
-        textposition='outside',  # Position text above bars
-        width=0.2,
-        textfont_size=16,
-        textfont_color='#232b2b'  # Set text color to black
+    # Display the last refresh time in the app with selected season
+    st.success(
+        f'#### **Selected Season:** {st.session_state.selected_season}    \n'
+        f'#### **Latest Round:** {round_number}    \n'
+        f'Data as of {snapshot.fetched_at.astimezone():%d/%m/%Y %H:%M}'
     )
 
-    # Customize text appearance
-    fig2.update_traces(textfont_size=16)  # Set font size
+    # Live scores of the season being played, while its games are on
+    if LIVE_MODE and st.session_state.selected_season == current_season():
+        live_section(snapshot)
 
-    # Display the Plotly figure in Streamlit
-    st.plotly_chart(fig2, use_container_width=True)  # Responsive chart
+    # Season selector under the info message; picking a season reruns the page with it
+    st.selectbox('Season', get_season_options(), format_func=season_label, key='selected_season')
 
-    st.divider()
-
-    euroleague_colors = ['#6BAF85', '#E7A86D', '#7A6A9D']
-
-    # Extract the percentages for two-pointers, three-pointers, and free throws
-    points_from_two = selected_team_data_advanced['pointsFromTwoPointersPercentage'].values[0].strip('%')
-    points_from_three = selected_team_data_advanced['pointsFromThreePointersPercentage'].values[0].strip('%')
-    points_from_free = selected_team_data_advanced['pointsFromFreeThrowsPercentage'].values[0].strip('%')
-
-    # Convert the string values to float
-    points_from_two = float(points_from_two)
-    points_from_three = float(points_from_three)
-    points_from_free = float(points_from_free)
+    # List of teams as buttons
+    teams = get_teams(team_standings_df, team_totals, players_data)
 
-    # Create a donut chart using the actual values from the data
-    fig3 = px.pie(
-        names=['Two-Pointers', 'Three-Pointers', 'Free Throws'],
-        values=[points_from_two, points_from_three, points_from_free],
-        title=f'Shot Distribution for {selected_team}',
-        color_discrete_sequence=euroleague_colors,
-        hole=0.5  # Set the hole size for the donut chart
-    )
+    # Button to show/hide standings table
+    show_standings_button = st.button("Show Standings")
 
-    # Update traces for text properties
-    fig3.update_traces(
-        textfont_size=14,  # Set text size to 16
-        textfont_color='#232b2b',  # Set text color to #232b2b
-        textinfo='percent+label'  # Display percentage and label
-    )
+    show_top_teams(snapshot)
 
-    # Hide the legend if not needed
-    fig3.update_layout(showlegend=False)
-
-    # Display the donut chart in Streamlit
-    st.plotly_chart(fig3, use_container_width=True)
-
-    st.divider()
-
-    # Assuming 'selected_team' contains the selected team's TV code (e.g., 'EA7', 'PAO', etc.)
-    selected_team_data_players = advanced_player_df[advanced_player_df['player.team.tvCodes'] == selected_team]
-
-    # Convert necessary columns to numeric after stripping '%'
-    selected_team_data_players['threePointAttemptsRatio'] = selected_team_data_players[
-        'threePointAttemptsRatio'].str.strip('%').astype(float)
-    selected_team_data_players['twoPointAttemptsRatio'] = selected_team_data_players['twoPointAttemptsRatio'].str.strip(
-        '%').astype(float)
-    selected_team_data_players['freeThrowsRate'] = selected_team_data_players['freeThrowsRate'].str.strip('%').astype(
-        float)
-
-    # Sort by highest three-point, two-point, and free-throw made rates
-    top_3pm_players = selected_team_data_players.sort_values(by='threePointAttemptsRatio', ascending=False).head(7)
-    top_2pm_players = selected_team_data_players.sort_values(by='twoPointAttemptsRatio', ascending=False).head(7)
-    top_ftm_players = selected_team_data_players.sort_values(by='freeThrowsRate', ascending=False).head(7)
-
-    # Define custom color palettes
-    three_point_colors = ['#4C7A5C', '#6BAF85', '#A2D3A4']  # Custom colors for Top 3-Point Makers
-    two_point_colors = ['#D68A3D', '#E7A86D', '#F0B89C']  # Custom colors for Top 2-Point Makers
-    free_throw_colors = ['#6A5ACD', '#7A6A9D', '#BFA5D8']  # Custom colors for Top Free-Throw Makers
-
-    # Create Pie Chart for Three-Point Makes (3PM)
-    fig_3pm = px.pie(
-        top_3pm_players,
-        names='player.name',
-        values='threePointAttemptsRatio',
-        title='Top 3-Point Makers (%)',
-        color_discrete_sequence=three_point_colors
-    )
-    fig_3pm.update_traces(
-        textinfo='value+label',
-        textfont_size=10,  # Make label text smaller
-        textfont_color='#232b2b'
-    )
-    fig_3pm.update_layout(
-        showlegend=False,  # Remove legend
-        paper_bgcolor='#f5f1f1',  # Set a light background color for the entire figure
-        plot_bgcolor='#f5f1f1',  # Set the same or a slightly different color for the plotting area
-        title_font = dict(color='#232b2b')
-    )
+    # Check if the button is clicked and show the standings table in the sidebar
+    if show_standings_button and team_standings_df is not None:
+        st.sidebar.table(team_standings_df[['position', 'club.abbreviatedName', 'gamesPlayed','gamesWon','gamesLost']].rename(
+            columns={'position': 'Position', 'club.editorialName': 'Team', 'gamesPlayed': 'Games', 'gamesWon': 'Won', 'gamesLost': 'Lost'}
+        ).set_index('Position', drop=True))
+        show_season_odds(snapshot)
 
-    # Create Pie Chart for Two-Point Makes (2PM)
-    fig_2pm = px.pie(
-        top_2pm_players,
-        names='player.name',
-        values='twoPointAttemptsRatio',
-        title='Top 2-Point Makers (%)',
-        color_discrete_sequence=two_point_colors
-    )
-    fig_2pm.update_traces(
-        textinfo='value+label',
-        textfont_size=10,  # Make label text smaller
-        textfont_color='#232b2b'
-    )
-    fig_2pm.update_layout(
-        showlegend=False,  # Remove legend
-        paper_bgcolor='#f5f1f1',  # Set a light background color for the entire figure
-        plot_bgcolor='#f5f1f1',  # Set the same or a slightly different color for the plotting area
-        title_font = dict(color='#232b2b')
-    )
+    # Each section reruns on its own when its team changes
+    team_section(snapshot, teams)
 
-    # Create Pie Chart for Free Throws Made (FTM)
-    fig_ftm = px.pie(
-        top_ftm_players,
-        names='player.name',
-        values='freeThrowsRate',
-        title='Top Free-Throw Makers (%)',
-        color_discrete_sequence=free_throw_colors
-    )
-    fig_ftm.update_traces(
-        textinfo='value+label',
-        textfont_size=10,  # Make label text smaller
-        textfont_color='#232b2b'
-    )
-    fig_ftm.update_layout(
-        showlegend=False,  # Remove legend
-        paper_bgcolor='#f5f1f1',  # Set a light background color for the entire figure
-        plot_bgcolor='#f5f1f1',  # Set the same or a slightly different color for the plotting area
-        title_font = dict(color='#232b2b')
-    )
+    compare_section(snapshot, teams)
 
-    # Use Streamlit columns to display the charts side by side
-    col1, col2, col3 = st.columns(3)
+    similar_players_section(snapshot, teams)
 
-    # Display each pie chart in its respective column
-    with col1:
-        st.plotly_chart(fig_3pm, use_container_width=True)
+    chart_section(snapshot, teams)
 
-    with col2:
-        st.plotly_chart(fig_2pm, use_container_width=True)
+    export_section(snapshot)
 
-    with col3:
-        st.plotly_chart(fig_ftm, use_container_width=True)
+    # Per-section render times (full page runs vs fragment reruns), shown with ?timings=1
+    if st.query_params.get('timings'):
+        st.dataframe(pd.DataFrame(timing_summary()).T)
 
+    # Operators' view of every stage, cache and snapshot, shown with ?admin=1
+    if st.query_params.get('admin'):
+        admin_panel()
 
     # Add a "Made by" section at the bottom
     st.markdown("---")
@@ -0,0 +1,94 @@
+# Benchmark: exporting the league-wide player table (traditional + advanced)
+# of a stored season, built whole in memory vs streamed in chunks by the export
+# cache (both starting from the stored season), with the peak memory of each
+# (traced, which slows both down, Excel most), then the same round downloaded
+# again. Excel is measured on a smaller league so the run stays short.
+#
+#   python benchmarks/bench_exports.py [--teams 40] [--players-per-team 1000] [--xlsx-teams 2]
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import EXPORT_WRITERS, ExportCache, players_export  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+from store import SnapshotStore  # noqa: E402
+from fake_api import make_player_stats, make_standings, make_team_stats  # noqa: E402
+
+SEASON = 2024
+DOWNLOADS = 20
+
+
+# Function to run fn and return its result, seconds and peak traced memory in MB
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def make_snapshot(season, teams, players_per_team):
+    return Snapshot.from_season_data(season, {
+        'round_number': 20, 'errors': {},
+        'standings': make_standings(teams, 20),
+        'team_stats': make_team_stats(teams, 'traditional'),
+        'advanced_team_stats': make_team_stats(teams, 'advanced'),
+        'player_stats': make_player_stats(teams, 'traditional', players_per_team),
+        'advanced_player_stats': make_player_stats(teams, 'advanced', players_per_team),
+    })
+
+
+def in_memory(store, season, fmt):
+    frame = pd.concat(players_export(store.load(season)), ignore_index=True)
+    if fmt == 'csv':
+        return frame.to_csv(index=False).encode('utf-8')
+    output = io.BytesIO()
+    if fmt == 'parquet':
+        frame.to_parquet(output, index=False)
+    else:
+        frame.to_excel(output, index=False)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=40)
+    parser.add_argument('--players-per-team', type=int, default=1000)
+    parser.add_argument('--xlsx-teams', type=int, default=2, help='teams of the league exported as Excel')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SnapshotStore(os.path.join(root, 'snapshots'))
+        seasons = {'csv': SEASON, 'parquet': SEASON, 'xlsx': SEASON - 1}
+        store.save(make_snapshot(SEASON, args.teams, args.players_per_team))
+        store.save(make_snapshot(SEASON - 1, args.xlsx_teams, args.players_per_team))
+        exports = ExportCache(store, os.path.join(root, 'exports'))
+        print(f"{'format':<8} {'players':>8} {'in memory s':>11} {'MB':>7} {'chunked s':>10} {'MB':>7} "
+              f"{'cached ms':>10} {'size MB':>8}")
+        for fmt in EXPORT_WRITERS:
+            season = seasons[fmt]
+            players = len(store.load(season).player_stats)
+            _, memory_seconds, memory_peak = measure(lambda: in_memory(store, season, fmt))
+            path, chunked_seconds, chunked_peak = measure(lambda: exports.get(season, 'players', fmt))
+            start = time.perf_counter()
+            for _ in range(DOWNLOADS):
+                for _ in exports.stream(season, 'players', fmt):
+                    pass
+            cached_ms = (time.perf_counter() - start) / DOWNLOADS * 1000
+            print(f"{fmt:<8} {players:>8,} {memory_seconds:>11.2f} {memory_peak:>7.1f} {chunked_seconds:>10.2f} "
+                  f"{chunked_peak:>7.1f} {cached_ms:>10.1f} {os.path.getsize(path) / 1e6:>8.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Benchmark: cold season fetch, sequential calls vs fetcher.fetch_season.
+#
+#   python benchmarks/bench_fetch.py [--standings 0.05] [--team 0.4] [--player 0.8] [--fail player_advanced]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import SEASON_DATASETS, dataset_call, fetch_season  # noqa: E402
+from rounds import RoundDiscovery  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+
+
+# The order get_api_data used before: round discovery, then each dataset in turn
+def fetch_sequential(clients, season):
+    RoundDiscovery().find_latest_round(clients['standings'], season)
+    for name in SEASON_DATASETS:
+        dataset_call(clients, name, season)()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--standings', type=float, default=0.05, help='seconds per standings request')
+    parser.add_argument('--team', type=float, default=0.4, help='seconds per team stats request')
+    parser.add_argument('--player', type=float, default=0.8, help='seconds per player stats request')
+    parser.add_argument('--fail', nargs='*', default=[], help='endpoints that always fail, e.g. player_advanced')
+    args = parser.parse_args()
+
+    latency = {
+        'standings': args.standings,
+        'team_traditional': args.team, 'team_advanced': args.team,
+        'player_traditional': args.player, 'player_advanced': args.player,
+    }
+
+    start = time.perf_counter()
+    try:
+        fetch_sequential(fake_clients(latency=latency), 2024)
+        print(f"sequential  {time.perf_counter() - start:6.2f} s")
+    except Exception as exc:
+        print(f"sequential  failed after {time.perf_counter() - start:6.2f} s: {exc}")
+
+    # Fresh module-level round cache so this is a cold start too
+    from rounds import round_discovery
+    round_discovery.forget()
+    start = time.perf_counter()
+    season_data = fetch_season(2024, clients=fake_clients(latency=latency, fail=args.fail), retries=1, backoff=0.1)
+    elapsed = time.perf_counter() - start
+    fetched = [name for name in ['standings', *SEASON_DATASETS] if season_data[name] is not None]
+    print(f"concurrent  {elapsed:6.2f} s  round={season_data['round_number']}  fetched={fetched}")
+    for name, error in season_data['errors'].items():
+        print(f"  {name} failed: {error!r}")
+
+
+if __name__ == '__main__':
+    main()
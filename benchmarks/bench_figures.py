@@ -0,0 +1,60 @@
+# Benchmark: cost of the chart section's six figures per team switch, built every rerun vs the FigureCache,
+# plus how long warming every team's charts after a refresh takes.
+#
+#   python benchmarks/bench_figures.py [--teams 18] [--switches 20]
+import argparse
+import os
+import sys
+import time
+
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetcher  # noqa: E402
+from figures import FIGURE_BUILDERS, FigureCache  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+from fake_api import fake_clients, team_codes  # noqa: E402
+
+
+# What st.plotly_chart does with a figure before sending it to the browser
+def emit(figure):
+    if figure is not None:
+        pio.to_json(figure, validate=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--switches', type=int, default=20)
+    args = parser.parse_args()
+
+    season_data = fetcher.fetch_season(2024, clients=fake_clients(n_teams=args.teams), retries=0)
+    snapshot = Snapshot.from_season_data(2024, season_data)
+    teams = team_codes(args.teams)
+
+    start = time.perf_counter()
+    for i in range(args.switches):
+        for builder in FIGURE_BUILDERS.values():
+            emit(builder(snapshot, teams[i % len(teams)]))
+    rebuild = (time.perf_counter() - start) / args.switches
+
+    cache = FigureCache()
+    start = time.perf_counter()
+    cache.warm(snapshot)
+    warm = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.switches):
+        for chart in FIGURE_BUILDERS:
+            emit(cache.get(snapshot, teams[i % len(teams)], chart))
+    cached = (time.perf_counter() - start) / args.switches
+
+    print(f"{len(FIGURE_BUILDERS)} charts, {args.teams} teams, {args.switches} team switches")
+    print(f"build every rerun  {rebuild * 1000:8.1f} ms per switch")
+    print(f"warm all teams     {warm * 1000:8.1f} ms once per snapshot ({len(cache)} figures)")
+    print(f"cached figures     {cached * 1000:8.1f} ms per switch (hits {cache.hits}, misses {cache.misses})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Benchmark: browsing every stored season, all frames kept in memory vs the
+# column-limited refresher within a memory budget. Prints the load time of a
+# season picked in the selector, the bytes held and the snapshot cache counters.
+#
+#   python benchmarks/bench_history.py [--seasons 25] [--teams 18] [--budget-mb 0.5]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import fetch_season  # noqa: E402
+from history import FIRST_SEASON, backfill  # noqa: E402
+from refresher import SnapshotCache, SnapshotRefresher  # noqa: E402
+from schema import DISPLAY_COLUMNS  # noqa: E402
+from store import SnapshotStore  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+
+
+def browse(refresher, seasons):
+    load_ms = []
+    for season in seasons:
+        start = time.perf_counter()
+        refresher.get(season)
+        load_ms.append((time.perf_counter() - start) * 1000)
+    return load_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=25)
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--budget-mb', type=float, default=0.5)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    seasons = list(range(FIRST_SEASON, FIRST_SEASON + args.seasons))
+    clients = fake_clients(n_teams=args.teams)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SnapshotStore(root)
+        start = time.perf_counter()
+        backfill(store, seasons, fetch=lambda season: fetch_season(season, clients=clients, retries=0))
+        print(f"backfill of {len(seasons)} seasons: {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        result = backfill(store, seasons, fetch=lambda season: fetch_season(season, clients=clients, retries=0))
+        print(f"second backfill: {(time.perf_counter() - start) * 1000:.1f} ms, {len(result['skipped'])} seasons skipped")
+
+        unbounded = SnapshotRefresher(store=store, cache=SnapshotCache(max_bytes=float('inf')))
+        bounded = SnapshotRefresher(store=store, columns=DISPLAY_COLUMNS,
+                                    cache=SnapshotCache(max_bytes=args.budget_mb * 1e6))
+        print(f"{'seasons browsed':>16} {'all in memory':>14} {'bounded':>10} {'seasons':>8}")
+        for count in [1, 5, 10, len(seasons)]:
+            browse(unbounded, seasons[:count])
+            browse(bounded, seasons[:count])
+            print(f"{count:16} {unbounded.cache.total_bytes() / 1e6:11.2f} MB "
+                  f"{bounded.cache.total_bytes() / 1e6:7.2f} MB {len(bounded.cache):8}")
+        # Going back over the seasons browsed last hits memory, the older ones the store
+        browse(bounded, seasons[::-1])
+        stats = bounded.cache.stats()
+        print(f"bounded cache ({args.budget_mb:g} MB): {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['evictions']} evictions")
+
+        full_ms = browse(SnapshotRefresher(store=store), seasons)
+        bounded_ms = browse(SnapshotRefresher(store=store, columns=DISPLAY_COLUMNS), seasons)
+        print(f"season load from the store: all columns {sorted(full_ms)[len(full_ms) // 2]:.1f} ms, "
+              f"page columns {sorted(bounded_ms)[len(bounded_ms) // 2]:.1f} ms (median)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Benchmark: headshot cost per team switch, remote download every time vs the local ImageCache,
+# plus the logo resize that now happens once per process.
+#
+#   python benchmarks/bench_images.py [--latency 0.15] [--players 30]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from images import HEADSHOT_WIDTH, ImageCache, load_logos, placeholder_png, resize_png  # noqa: E402
+
+LOGOS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logos')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.15, help='seconds per remote image download')
+    parser.add_argument('--players', type=int, default=30)
+    args = parser.parse_args()
+
+    # A large remote headshot, like the originals served by the Euroleague CDN
+    remote = resize_png(placeholder_png(HEADSHOT_WIDTH), 600)
+    downloads = []
+
+    def download(url):
+        downloads.append(url)
+        time.sleep(args.latency)
+        return remote
+
+    urls = [f'https://media.example.invalid/players/{i}.png' for i in range(args.players)]
+    cache = ImageCache(root=tempfile.mkdtemp(), download=download, max_images=args.players // 2)
+
+    start = time.perf_counter()
+    cold = [cache.get(url) for url in urls]
+    cold_time = time.perf_counter() - start
+    start = time.perf_counter()
+    warm = [cache.get(url) for url in urls[-(args.players // 2):]]
+    warm_time = time.perf_counter() - start
+
+    logos_dir = tempfile.mkdtemp()
+    start = time.perf_counter()
+    load_logos(LOGOS_DIR, cache_dir=logos_dir)
+    logos_cold = time.perf_counter() - start
+    start = time.perf_counter()
+    load_logos(LOGOS_DIR, cache_dir=logos_dir)
+    logos_warm = time.perf_counter() - start
+
+    print(f"{args.players} headshots, {args.latency * 1000:.0f} ms per download, cache keeps {args.players // 2}")
+    print(f"cold  {cold_time * 1000:8.1f} ms  downloads={len(downloads)}  {len(remote)} -> {len(cold[0])} bytes each")
+    print(f"warm  {warm_time * 1000:8.1f} ms  for the {len(warm)} most recent, no downloads")
+    print(f"files kept {len(os.listdir(cache.root))}")
+    print(f"logos decoded and resized {logos_cold * 1000:8.1f} ms, loaded resized after a restart {logos_warm * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Benchmark: refreshing a season by full re-download vs incremental per-round ingestion,
+# within a round and when a new round was played (requests per API and time).
+#
+#   python benchmarks/bench_ingest.py [--latency 0.05] [--rounds 20] [--new-rounds 1]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import fetch_season  # noqa: E402
+from ingest import RoundIngestor  # noqa: E402
+from rounds import RoundDiscovery  # noqa: E402
+import rounds  # noqa: E402
+from fake_api import FakeBoxScoreData, fake_clients  # noqa: E402
+
+
+def rows_in(season_data):
+    return sum(len(season_data[name]) for name in season_data
+               if name not in ('round_number', 'errors') and season_data[name] is not None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake request')
+    parser.add_argument('--rounds', type=int, default=20, help='rounds played before the refresh')
+    parser.add_argument('--new-rounds', type=int, default=1, help='rounds played since the last refresh')
+    args = parser.parse_args()
+
+    latest = args.rounds + args.new_rounds
+    clients = fake_clients(latest_round=latest, latency=args.latency)
+    start = time.perf_counter()
+    season_data = fetch_season(2024, clients=clients)
+    calls = sum(client.calls for client in clients.values())
+    print(f"{'full re-download':<24} {time.perf_counter() - start:6.2f} s  requests={calls:<4} "
+          f"rows={rows_in(season_data)}")
+
+    with tempfile.TemporaryDirectory() as root:
+        fakes = fake_clients(latest_round=args.rounds, latency=args.latency)
+        boxscores = FakeBoxScoreData(latest_round=args.rounds, latency=args.latency)
+        standings, players = fakes['standings'], fakes['player']
+        ingestor = RoundIngestor(root=root, boxscore_api=boxscores, standings_api=standings, player_api=players)
+        rounds.round_discovery = RoundDiscovery()
+
+        # Each refresh: (label, rounds played by then); the first new round
+        # brings players the identities don't know yet, the next ones don't
+        steps = [('one-time backfill', args.rounds), ('refresh, same round', args.rounds)]
+        steps += [(f'refresh, new round {n}', args.rounds + n * args.new_rounds) for n in (1, 2)]
+        for label, played in steps:
+            boxscores.latest_round = standings.latest_round = played
+            boxscores.calls = standings.calls = players.calls = 0
+            start = time.perf_counter()
+            season_data = ingestor.refresh(2024)
+            elapsed = time.perf_counter() - start
+            requests = boxscores.calls + standings.calls + players.calls
+            print(f"{label:<24} {elapsed:6.2f} s  requests={requests:<4} schedule+boxscores={boxscores.calls:<4} "
+                  f"standings={standings.calls} player stats={players.calls}  round={season_data['round_number']}  "
+                  f"rows={rows_in(season_data)}")
+
+if __name__ == '__main__':
+    main()
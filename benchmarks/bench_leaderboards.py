@@ -0,0 +1,54 @@
+# Benchmark: cost of the top-player tables when switching teams, per-team nlargest vs Leaderboards lookups.
+#
+#   python benchmarks/bench_leaderboards.py [--teams 18] [--reruns 200]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboards import LEADERBOARD_STATS, Leaderboards  # noqa: E402
+from schema import normalize_frame  # noqa: E402
+from fake_api import make_player_stats  # noqa: E402
+
+STATS = LEADERBOARD_STATS['player_stats']
+
+
+# What the PIR cards and the four top-5 tables did on every rerun before
+def legacy_rerun(players_data, team):
+    team_data = players_data[players_data['player.team.tvCodes'] == team]
+    return {stat: team_data.dropna(subset=[stat]).nlargest(top_n, stat) for stat, top_n in STATS.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    players = normalize_frame('player_stats', make_player_stats(args.teams, 'traditional'))
+    teams = players['player.team.tvCodes'].unique().tolist()
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        legacy_rerun(players, teams[i % len(teams)])
+    legacy = (time.perf_counter() - start) / args.reruns
+
+    start = time.perf_counter()
+    leaderboards = Leaderboards(players, STATS)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        {stat: leaderboards.top(teams[i % len(teams)], stat) for stat in STATS}
+    lookup = (time.perf_counter() - start) / args.reruns
+
+    print(f"{len(players)} players, {len(teams)} teams, {len(STATS)} stats, {args.reruns} reruns")
+    print(f"per-team nlargest   {legacy * 1000:8.3f} ms per rerun")
+    print(f"Leaderboards build  {build * 1000:8.3f} ms once per snapshot")
+    print(f"Leaderboards lookup {lookup * 1000:8.3f} ms per rerun")
+
+
+if __name__ == '__main__':
+    main()
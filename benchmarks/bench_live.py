@@ -0,0 +1,105 @@
+# Benchmark: keeping standings current through one game night (a round of 9
+# games tipping off in three waves), re-fetching the whole season on a timer vs
+# live mode polling only the games in progress with conditional requests.
+# Reports upstream requests, full responses, time spent and how long after a
+# game ended the snapshot had it.
+#
+#   python benchmarks/bench_live.py [--teams 18] [--poll 15]
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import timing  # noqa: E402
+from fetcher import fetch_season  # noqa: E402
+from live import ConditionalClient, LiveMonitor, LiveSource  # noqa: E402
+from refresher import SnapshotRefresher  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+from fake_api import FakeLiveSession, fake_clients  # noqa: E402
+
+SEASON = 2024
+LATEST_ROUND = 20
+TIPOFF = datetime(2024, 10, 17, 18, 0, tzinfo=timezone.utc)
+
+
+# Function to time one full season fetch; returns (requests, MB of the fetched frames as JSON, seconds)
+def full_refresh_cost(n_teams):
+    clients = fake_clients(latest_round=LATEST_ROUND, n_teams=n_teams)
+    start = time.perf_counter()
+    season_data = fetch_season(SEASON, clients=clients, retries=0)
+    Snapshot.from_season_data(SEASON, season_data)
+    elapsed = time.perf_counter() - start
+    size = sum(len(season_data[name].to_json(orient='records')) for name in
+               ['standings', 'team_stats', 'advanced_team_stats', 'player_stats', 'advanced_player_stats'])
+    return sum(client.calls for client in clients.values()), size / 1e6, elapsed
+
+
+# Function to follow the night with a live monitor; returns the fake session
+# (its requests, 304s and bytes), the poll times, and how long after its end
+# each game was applied
+def live_night(n_teams, poll_seconds):
+    session = FakeLiveSession(TIPOFF, latest_round=LATEST_ROUND, n_teams=n_teams)
+    refresher = SnapshotRefresher(fetch=lambda season: fetch_season(season, clients=fake_clients(
+        latest_round=LATEST_ROUND, n_teams=n_teams), retries=0))
+    refresher.get(SEASON)
+    monitor = LiveMonitor(refresher, SEASON, source=LiveSource(client=ConditionalClient(session=session)),
+                          poll_seconds=poll_seconds)
+
+    ends = {gamecode: (session.start(round_number, (gamecode - 1) % (n_teams // 2)) - TIPOFF).total_seconds()
+            + session.GAME_SECONDS for round_number, gamecode, _, _ in session.schedule
+            if round_number == LATEST_ROUND + 1}
+    lags = {}
+    poll_ms = []
+    elapsed = -20 * 60.0
+    while elapsed < max(ends.values()) + 3600:
+        session.elapsed = elapsed
+        start = time.perf_counter()
+        wait = monitor.poll(TIPOFF + timedelta(seconds=elapsed))
+        poll_ms.append((time.perf_counter() - start) * 1000)
+        for game in monitor.scoreboard():
+            if game['status'] == 'Final':
+                lags.setdefault(game['gamecode'], elapsed - ends[game['gamecode']])
+        elapsed += wait
+    snapshot = refresher.peek(SEASON)
+    assert monitor.applied == len(ends) and snapshot.provisional and snapshot.round_number == LATEST_ROUND
+    assert all(0 <= lag <= poll_seconds for lag in lags.values())
+    return session, poll_ms, lags, elapsed + 20 * 60
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--poll', type=float, default=15, help='seconds between live polls')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    requests_per_refresh, mb_per_refresh, seconds_per_refresh = full_refresh_cost(args.teams)
+    timing.reset()
+    session, poll_ms, lags, night_seconds = live_night(args.teams, args.poll)
+    polls = len(poll_ms)
+    apply_ms = timing.summary().get('live apply', {}).get('median_ms', 0.0)
+
+    print(f"Game night of {len(lags)} games followed for {night_seconds / 3600:.1f} h")
+    print()
+    # Worst lag: the longest a finished game can wait to show up on the page
+    print(f"{'mode':<34} {'requests':>9} {'full':>7} {'MB':>7} {'CPU s':>7} {'worst lag':>10}")
+    for label, interval in [('full refresh every 30 min (ttl)', 1800), (f'full refresh every {args.poll:.0f} s', args.poll)]:
+        refreshes = int(night_seconds // interval) + 1
+        print(f"{label:<34} {refreshes * requests_per_refresh:>9} {refreshes * requests_per_refresh:>7} "
+              f"{refreshes * mb_per_refresh:>7.1f} {refreshes * seconds_per_refresh:>7.1f} {interval:>9.0f}s")
+    full_responses = session.calls - session.not_modified
+    print(f"{f'live polling every {args.poll:.0f} s':<34} {session.calls:>9} {full_responses:>7} "
+          f"{session.bytes / 1e6:>7.1f} {sum(poll_ms) / 1000:>7.1f} {args.poll:>9.0f}s")
+    print()
+    print(f"{polls} live polls, median {sorted(poll_ms)[polls // 2]:.1f} ms; "
+          f"{session.not_modified} of {session.calls} requests answered 304 Not Modified; "
+          f"the games finished in a poll applied to the snapshot in {apply_ms:.1f} ms (median)")
+    print("Full refresh bytes are the fetched frames as JSON; the live mode's are the response bodies.")
+
+
+if __name__ == '__main__':
+    main()
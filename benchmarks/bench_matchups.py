@@ -0,0 +1,81 @@
+# Benchmark: comparing two teams over many seasons of games, filtering the
+# per-game rows on every view vs the team x team matchup matrices.
+#
+#   python benchmarks/bench_matchups.py [--seasons 25] [--teams 18]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matchups import Matchups  # noqa: E402
+from fake_api import make_schedule  # noqa: E402
+
+
+# Function to make per-game team rows shaped like the materialized team trends
+def make_team_games(seasons, n_teams, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for season in range(2000, 2000 + seasons):
+        for round_number, gamecode, home, away in make_schedule(n_teams):
+            home_points, away_points = rng.integers(60, 110, 2)
+            home_possessions, away_possessions = rng.normal(72, 4, 2)
+            rows.append((season, round_number, gamecode, home, home_points, away_points, home_possessions,
+                         away_possessions))
+            rows.append((season, round_number, gamecode, away, away_points, home_points, away_possessions,
+                         home_possessions))
+    return pd.DataFrame(rows, columns=['Season', 'Round', 'Gamecode', 'team.tvCodes', 'pointsScored',
+                                       'pointsScoredAgainst', 'possessions', 'possessionsAgainst'])
+
+
+# What a compare view costs without the matrices: scan every game of both teams
+def compare_by_filtering(games, team_a, team_b):
+    team_rows = games[games['team.tvCodes'] == team_a]
+    opponent_rows = games[games['team.tvCodes'] == team_b][['Season', 'Gamecode']]
+    head_to_head = team_rows.merge(opponent_rows, on=['Season', 'Gamecode'])
+    margin = head_to_head['pointsScored'] - head_to_head['pointsScoredAgainst']
+    ratings = games.groupby('team.tvCodes')[['pointsScored', 'possessions']].sum()
+    offense = 100 * ratings['pointsScored'] / ratings['possessions']
+    return len(head_to_head), int((margin > 0).sum()), margin.mean(), offense[team_a], offense[team_b]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=25)
+    parser.add_argument('--teams', type=int, default=18)
+    args = parser.parse_args()
+
+    games = make_team_games(args.seasons, args.teams)
+    print(f"{len(games) // 2:,} games over {args.seasons} seasons")
+
+    start = time.perf_counter()
+    matchups = Matchups(games)
+    print(f"build matrices ({len(matchups.teams)} x {len(matchups.teams)})   "
+          f"{(time.perf_counter() - start) * 1000:8.1f} ms once per snapshot")
+
+    rng = np.random.default_rng(1)
+    pairs = [tuple(rng.choice(matchups.teams, 2, replace=False)) for _ in range(200)]
+    start = time.perf_counter()
+    for team_a, team_b in pairs:
+        compare_by_filtering(games, team_a, team_b)
+    filtering = (time.perf_counter() - start) / len(pairs) * 1000
+    start = time.perf_counter()
+    for team_a, team_b in pairs:
+        matchups.compare(team_a, team_b)
+    matrix = (time.perf_counter() - start) / len(pairs) * 1000
+    print(f"compare view, filtering games     {filtering:8.3f} ms")
+    print(f"compare view, matrix lookups      {matrix:8.3f} ms")
+
+    team_a, team_b = pairs[0]
+    expected = compare_by_filtering(games, team_a, team_b)
+    comparison = matchups.compare(team_a, team_b)
+    assert expected[:2] == (comparison['games'], comparison['wins'][0])
+    assert np.isclose(expected[2], comparison['average_point_diff'])
+
+
+if __name__ == '__main__':
+    main()
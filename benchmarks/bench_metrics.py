@@ -0,0 +1,62 @@
+# Benchmark: what the instrumentation costs and what it shows. Times the
+# timed()/count() calls themselves, then fetches a season from fake endpoints,
+# one of them slow, and prints the per-endpoint stages and the Prometheus text.
+#
+#   python benchmarks/bench_metrics.py [--slow advanced_player_stats] [--latency 0.2]
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import timing  # noqa: E402
+from fetcher import SEASON_DATASETS, fetch_season  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+
+CALLS = 100_000
+
+# fake_api endpoint names of the fetcher's datasets
+FAKE_ENDPOINTS = {name: f"{client}_{endpoint}" for name, (client, endpoint, _) in SEASON_DATASETS.items()}
+
+
+def per_call_us(fn):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        fn()
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--slow', default='advanced_player_stats', choices=list(SEASON_DATASETS))
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    def empty_block():
+        with timing.timed('overhead'):
+            pass
+
+    print(f"timed() block        {per_call_us(empty_block):6.2f} us per call")
+    print(f"count()              {per_call_us(lambda: timing.count('overhead', result='hit')):6.2f} us per call")
+    timing.reset()
+
+    latency = {endpoint: 0.01 for endpoint in FAKE_ENDPOINTS.values()}
+    latency[FAKE_ENDPOINTS[args.slow]] = args.latency
+    clients = fake_clients(latency=latency)
+    for _ in range(3):
+        snapshot = Snapshot.from_season_data(2024, fetch_season(2024, clients=clients, retries=0))
+        snapshot.derive('example', lambda s: len(s.player_stats))
+    print()
+    print(f"{'stage':<30} {'runs':>5} {'median ms':>10}")
+    for stage, stats in sorted(timing.summary().items(), key=lambda item: -item[1]['median_ms']):
+        print(f"{stage:<30} {stats['runs']:>5} {stats['median_ms']:>10.1f}")
+    print()
+    print(timing.prometheus_text())
+
+
+if __name__ == '__main__':
+    main()
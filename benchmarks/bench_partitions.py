@@ -0,0 +1,63 @@
+# Benchmark: per-rerun cost of slicing a team's players, boolean scans vs the TeamIndex offsets.
+# The page takes a team's rows six times per rerun (PIR cards, four top-5 tables, scoring chart).
+#
+#   python benchmarks/bench_partitions.py [--teams 18] [--seasons 1] [--reruns 200]
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partitions import PLAYER_TEAM_COLUMN, TeamIndex  # noqa: E402
+from schema import normalize_frame  # noqa: E402
+from fake_api import make_player_stats  # noqa: E402
+
+SLICES_PER_RERUN = 6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--seasons', type=int, default=1, help='stack several seasons into one table')
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    seasons = []
+    for season in range(args.seasons):
+        frame = normalize_frame('player_stats', make_player_stats(args.teams, 'traditional', seed=season))
+        seasons.append(frame.assign(Season=2024 - season))
+    players = pd.concat(seasons, ignore_index=True)
+    key_columns = ['Season', PLAYER_TEAM_COLUMN] if args.seasons > 1 else PLAYER_TEAM_COLUMN
+
+    start = time.perf_counter()
+    index = TeamIndex(players, key_columns)
+    build = time.perf_counter() - start
+    keys = index.teams()
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        key = keys[i % len(keys)]
+        for _ in range(SLICES_PER_RERUN):
+            if args.seasons > 1:
+                players[(players['Season'] == key[0]) & (players[PLAYER_TEAM_COLUMN] == key[1])]
+            else:
+                players[players[PLAYER_TEAM_COLUMN] == key]
+    scans = (time.perf_counter() - start) / args.reruns
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        for _ in range(SLICES_PER_RERUN):
+            index.rows(keys[i % len(keys)])
+    lookups = (time.perf_counter() - start) / args.reruns
+
+    print(f"{len(players)} player rows, {len(keys)} partitions, {args.reruns} reruns")
+    print(f"boolean scans    {scans * 1000:8.3f} ms per rerun")
+    print(f"TeamIndex build  {build * 1000:8.3f} ms once per snapshot")
+    print(f"TeamIndex slices {lookups * 1000:8.3f} ms per rerun")
+
+
+if __name__ == '__main__':
+    main()
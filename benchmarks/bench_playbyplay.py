@@ -0,0 +1,111 @@
+# Benchmark: one season of play-by-play from recorded payloads (no network).
+# Parsing every game into one DataFrame (what euroleague-api's
+# get_game_play_by_play_data_single_season does) vs the chunked ingestor, then
+# an interrupted backfill resumed.
+#
+#   python benchmarks/bench_playbyplay.py [--teams 18] [--rows-per-part 50000]
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playbyplay import PERIODS, PlayByPlayIngestor, RecordedSource  # noqa: E402
+from fake_api import FakeGameSource  # noqa: E402
+
+SEASON = 2024
+
+
+# Function to record a season of fake payloads as fixture files
+def record_fixtures(directory, n_teams):
+    source = FakeGameSource(latest_round=2 * (n_teams - 1), n_teams=n_teams)
+    season_dir = os.path.join(directory, f'E{SEASON}')
+    os.makedirs(season_dir)
+    size = 0
+    for code in source.games(SEASON):
+        payload = source.payload(SEASON, code)
+        size += len(payload)
+        with open(os.path.join(season_dir, f'{code}.json'), 'wb') as file:
+            file.write(payload)
+    return size
+
+
+# The way euroleague-api builds a season: json_normalize every quarter, concat everything
+def parse_all_at_once(source):
+    games = []
+    for code in source.games(SEASON):
+        data = json.loads(source.payload(SEASON, code))
+        for period, name in enumerate(PERIODS, start=1):
+            if data[name]:
+                frame = pd.json_normalize(data[name])
+                frame['PERIOD'] = period
+                frame.insert(0, 'Gamecode', code)
+                games.append(frame)
+    return pd.concat(games, ignore_index=True)
+
+
+# Function to run fn twice: timed, then under tracemalloc for its peak memory
+def measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--rows-per-part', type=int, default=50_000)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as root:
+        fixtures = os.path.join(root, 'fixtures')
+        json_bytes = record_fixtures(fixtures, args.teams)
+        source = RecordedSource(fixtures)
+        print(f"{len(source.games(SEASON))} games, {json_bytes / 1e6:.1f} MB of JSON")
+
+        frame, elapsed, peak = measure(lambda: parse_all_at_once(source))
+        print(f"all at once       {elapsed:6.2f}s  peak {peak:7.1f} MB  "
+              f"result {frame.memory_usage(deep=True).sum() / 1e6:6.1f} MB in memory")
+        del frame
+
+        stores = iter(range(2))
+
+        def ingest():
+            ingestor = PlayByPlayIngestor(os.path.join(root, f'store{next(stores)}'), source=source,
+                                          rows_per_part=args.rows_per_part)
+            return ingestor, ingestor.ingest(SEASON)[0]
+
+        (ingestor, stored), elapsed, peak = measure(ingest)
+        season_dir = ingestor.season_dir(SEASON)
+        on_disk = sum(os.path.getsize(os.path.join(season_dir, name)) for name in os.listdir(season_dir))
+        print(f"chunked ingestor  {elapsed:6.2f}s  peak {peak:7.1f} MB  "
+              f"{stored} games in {len(ingestor.manifest(SEASON)['parts'])} parts, {on_disk / 1e6:.1f} MB on disk")
+
+        plays, elapsed, _ = measure(lambda: ingestor.load(SEASON))
+        print(f"load the season   {elapsed:6.2f}s  {len(plays):,} plays, "
+              f"{plays.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
+
+        # Interrupted backfill: half the games, then resume
+        resumed = PlayByPlayIngestor(os.path.join(root, 'resumed'), source=source, rows_per_part=args.rows_per_part)
+        first, _ = resumed.ingest(SEASON, max_games=len(source.games(SEASON)) // 2)
+        second, _ = resumed.ingest(SEASON)
+        third, _ = resumed.ingest(SEASON)
+        duplicates = resumed.load(SEASON).duplicated(['Gamecode', 'NUMBEROFPLAY']).sum()
+        print(f"resumed backfill: {first} + {second} games, {third} on a third run, {duplicates} duplicate plays")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Benchmark: per-rerun cost of the team KPI rankings, per-KPI sorting vs TeamRankings.
+#
+#   python benchmarks/bench_rankings.py [--teams 300] [--reruns 200]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rankings import RANKED_KPIS, TeamRankings  # noqa: E402
+from fake_api import make_team_stats  # noqa: E402
+
+TOP_TEAM_KPIS = ['pointsScored', 'twoPointersPercentage', 'threePointersPercentage', 'threePointersMade',
+                 'defensiveRebounds', 'offensiveRebounds']
+
+
+# What get_team_kpis + get_top_teams did on every rerun before
+def legacy_rerun(team_totals_data, selected_team):
+    team_kpis = team_totals_data[team_totals_data['team.tvCodes'] == selected_team].iloc[0]
+    rankings = {}
+    for kpi in RANKED_KPIS:
+        rankings[kpi] = team_totals_data.sort_values(by=kpi, ascending=False).index.get_loc(team_kpis.name) + 1
+    top_teams = {}
+    for kpi in TOP_TEAM_KPIS:
+        row = team_totals_data.sort_values(by=kpi, ascending=False).iloc[0]
+        top_teams[kpi] = (row[kpi], row['team.tvCodes'])
+    return rankings, top_teams
+
+
+def rankings_rerun(rankings, team_totals_data, selected_team):
+    team_kpis = team_totals_data.iloc[rankings.position(selected_team)]
+    return team_kpis, rankings.team_ranks(selected_team), {kpi: rankings.leader(kpi) for kpi in TOP_TEAM_KPIS}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=300)
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    team_totals = make_team_stats(args.teams, 'traditional')
+    teams = team_totals['team.tvCodes'].tolist()
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        legacy_rerun(team_totals, teams[i % len(teams)])
+    legacy = (time.perf_counter() - start) / args.reruns
+
+    start = time.perf_counter()
+    rankings = TeamRankings(team_totals)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(args.reruns):
+        rankings_rerun(rankings, team_totals, teams[i % len(teams)])
+    lookup = (time.perf_counter() - start) / args.reruns
+
+    print(f"{args.teams} teams, {args.reruns} reruns")
+    print(f"per-KPI sorting     {legacy * 1000:8.3f} ms per rerun")
+    print(f"TeamRankings build  {build * 1000:8.3f} ms once per snapshot")
+    print(f"TeamRankings lookup {lookup * 1000:8.3f} ms per rerun")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Benchmark: latest-round discovery, old linear probe vs RoundDiscovery.
+#
+#   python benchmarks/bench_round_discovery.py [--latency 0.05] [--latest-round 20]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rounds import RoundDiscovery  # noqa: E402
+from fake_api import FakeStandings  # noqa: E402
+
+
+# The probe get_api_data used before: every round 1..34, then the chosen one again
+def linear_probe(standings_api, season):
+    round_number = None
+    for i in range(1, 35):
+        try:
+            standings = standings_api.get_standings(season=season, round_number=i)
+            if standings is not None:
+                round_number = i
+        except Exception:
+            break
+    if round_number is None:
+        round_number = 1
+    return round_number, standings_api.get_standings(season=season, round_number=round_number)
+
+
+def run(label, fn, standings_api):
+    standings_api.calls = 0
+    start = time.perf_counter()
+    round_number, _ = fn(standings_api, 2024)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} round={round_number:<3} calls={standings_api.calls:<3} time={elapsed * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake request')
+    parser.add_argument('--latest-round', type=int, default=20)
+    args = parser.parse_args()
+
+    standings_api = FakeStandings(latest_round=args.latest_round, latency=args.latency)
+    discovery = RoundDiscovery()
+
+    run('linear probe (cold)', linear_probe, standings_api)
+    run('round discovery (cold)', discovery.find_latest_round, standings_api)
+    run('round discovery (refresh)', discovery.find_latest_round, standings_api)
+
+    # A new round gets played between refreshes
+    standings_api.latest_round += 1
+    run('round discovery (new round)', discovery.find_latest_round, standings_api)
+    standings_api.latest_round += 5
+    run('round discovery (5 new rounds)', discovery.find_latest_round, standings_api)
+
+
+if __name__ == '__main__':
+    main()
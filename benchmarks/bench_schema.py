@@ -0,0 +1,74 @@
+# Benchmark: per-rerun cost of parsing "52.3%" strings in the page vs frames normalized once at ingest,
+# plus the memory of the raw and the normalized frames.
+#
+#   python benchmarks/bench_schema.py [--teams 18] [--reruns 200]
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import normalize_frame  # noqa: E402
+from fake_api import make_player_stats, make_team_stats  # noqa: E402
+
+RATIO_COLUMNS = ['threePointAttemptsRatio', 'twoPointAttemptsRatio', 'freeThrowsRate']
+
+
+# What the page did with the raw frames on every rerun before
+def legacy_rerun(team_stats, advanced_player_stats, player_stats, team):
+    row = team_stats[team_stats['team.tvCodes'] == team].iloc[0]
+    values = [float(row['twoPointersPercentage'].rstrip('%')), float(row['threePointersPercentage'].rstrip('%'))]
+    players = advanced_player_stats[advanced_player_stats['player.team.tvCodes'] == team].copy()
+    for column in RATIO_COLUMNS:
+        players[column] = players[column].str.strip('%').astype(float)
+    team_players = player_stats[player_stats['player.team.tvCodes'] == team].copy()
+    team_players['pir'] = pd.to_numeric(team_players['pir'], errors='coerce')
+    return values, players.nlargest(7, RATIO_COLUMNS[0]), team_players.nlargest(5, 'pir')
+
+
+def normalized_rerun(team_stats, advanced_player_stats, player_stats, team):
+    row = team_stats[team_stats['team.tvCodes'] == team].iloc[0]
+    values = [row['twoPointersPercentage'], row['threePointersPercentage']]
+    players = advanced_player_stats[advanced_player_stats['player.team.tvCodes'] == team]
+    team_players = player_stats[player_stats['player.team.tvCodes'] == team]
+    return values, players.nlargest(7, RATIO_COLUMNS[0]), team_players.nlargest(5, 'pir')
+
+
+def timed(rerun, frames, teams, reruns):
+    start = time.perf_counter()
+    for i in range(reruns):
+        rerun(*frames, teams[i % len(teams)])
+    return (time.perf_counter() - start) / reruns
+
+
+def megabytes(frames):
+    return sum(frame.memory_usage(deep=True).sum() for frame in frames) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--reruns', type=int, default=200)
+    args = parser.parse_args()
+
+    raw = (make_team_stats(args.teams, 'traditional'), make_player_stats(args.teams, 'advanced'),
+           make_player_stats(args.teams, 'traditional'))
+    teams = raw[0]['team.tvCodes'].tolist()
+
+    start = time.perf_counter()
+    normalized = tuple(normalize_frame(name, frame) for name, frame in
+                       zip(['team_stats', 'advanced_player_stats', 'player_stats'], raw))
+    build = time.perf_counter() - start
+
+    print(f"{args.teams} teams, {args.reruns} reruns")
+    print(f"parsing per rerun     {timed(legacy_rerun, raw, teams, args.reruns) * 1000:8.3f} ms per rerun")
+    print(f"normalize at ingest   {build * 1000:8.3f} ms once per snapshot")
+    print(f"normalized frames     {timed(normalized_rerun, normalized, teams, args.reruns) * 1000:8.3f} ms per rerun")
+    print(f"memory raw {megabytes(raw):.2f} MB, normalized {megabytes(normalized):.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Benchmark: render cost per page section, from the timings the app records.
+# Before fragments every widget change paid for the whole page; now changing the
+# top team reruns only "team section" and changing the chart team only "charts".
+# (AppTest always reruns the full script, so fragment costs are read per section.)
+#
+#   python benchmarks/bench_sections.py [--switches 10]
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('EUROLEAGUE_DATA_DIR', tempfile.mkdtemp())
+# No live monitor polling the schedule
+os.environ['EUROLEAGUE_LIVE'] = '0'
+
+import timing  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+from harness import patch_app  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+# The app reads fake season data, fake boxscores and placeholder headshots: no network
+patch_app(fake_clients())
+
+
+# Function to switch a selectbox through the teams; returns the page's own
+# timings of those reruns and their wall time (ms, median)
+def switch_teams(app, key, switches, offset):
+    timing.reset()
+    wall = []
+    for i in range(switches):
+        start = time.perf_counter()
+        app.selectbox(key=key).select_index((i + offset) % 18).run()
+        wall.append((time.perf_counter() - start) * 1000)
+    return timing.summary(), statistics.median(wall)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--switches', type=int, default=10)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    os.chdir(ROOT)
+    app = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120).run()
+    # Every switch kind reruns the whole script under AppTest, which is what
+    # each of them cost before fragments
+    top, top_wall = switch_teams(app, 'top_team_selectbox', args.switches, 1)
+    charts, charts_wall = switch_teams(app, 'chart_team_selectbox', args.switches, 4)
+
+    print(f"{args.switches} switches of each team selectbox")
+    print(f"{'section':14} {'median ms':>10} {'p95 ms':>8}")
+    for section in ['page', 'top teams', 'team section', 'charts']:
+        stats = top[section] if section == 'team section' else charts[section]
+        print(f"{section:14} {stats['median_ms']:10.1f} {stats['p95_ms']:8.1f}")
+    print(f"top team switch: {top['page']['median_ms']:.1f} ms before (full page, {top_wall:.1f} ms with AppTest), "
+          f"{top['team section']['median_ms']:.1f} ms as a fragment")
+    print(f"chart team switch: {charts['page']['median_ms']:.1f} ms before (full page, {charts_wall:.1f} ms with AppTest), "
+          f"{charts['charts']['median_ms']:.1f} ms as a fragment")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Load test: requests per second of the analytics API (server.py) against fake season data.
+# Clients keep connections alive and cycle through every endpoint of every team.
+#
+#   python benchmarks/bench_server.py [--clients 8] [--requests 2000] [--teams 18]
+import argparse
+import http.client
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fetcher  # noqa: E402
+from refresher import SnapshotRefresher  # noqa: E402
+from server import ARROW_TYPE, AnalyticsService, make_server  # noqa: E402
+from fake_api import fake_clients, team_codes  # noqa: E402
+
+SEASON = 2024
+
+# name -> extra request headers
+MODES = {
+    'json': {},
+    'json gzip': {'Accept-Encoding': 'gzip'},
+    'arrow': {'Accept': ARROW_TYPE},
+    'revalidate (304)': None,
+}
+
+
+def paths(n_teams):
+    season_paths = [f'/seasons/{SEASON}/{name}' for name in ['standings', 'teams', 'top-teams']]
+    team_paths = [f'/seasons/{SEASON}/teams/{team}/{name}' for team in team_codes(n_teams)
+                  for name in ['kpis', 'top-players', 'scoring-distribution', 'shot-distribution']]
+    return season_paths + team_paths
+
+
+def run_client(port, urls, headers, count, latencies, sizes, statuses):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    etags = {}
+    for i in range(count):
+        url = urls[i % len(urls)]
+        request_headers = headers
+        if headers is None:
+            request_headers = {'If-None-Match': etags[url]} if url in etags else {}
+        start = time.perf_counter()
+        connection.request('GET', url, headers=request_headers)
+        response = connection.getresponse()
+        body = response.read()
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(body))
+        statuses.append(response.status)
+        etags[url] = response.getheader('ETag')
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000, help='requests per mode')
+    parser.add_argument('--teams', type=int, default=18)
+    args = parser.parse_args()
+
+    clients = fake_clients(n_teams=args.teams)
+    refresher = SnapshotRefresher(fetch=lambda season: fetcher.fetch_season(season, clients=clients, retries=0))
+    service = AnalyticsService(refresher, [SEASON])
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = paths(args.teams)
+
+    # Cold: the first request of every response builds it
+    start = time.perf_counter()
+    service.warm(refresher.get(SEASON))
+    print(f"{len(urls)} endpoints x 2 formats built in {(time.perf_counter() - start) * 1000:.0f} ms once per snapshot")
+
+    per_client = args.requests // args.clients
+    for mode, headers in MODES.items():
+        latencies, sizes, statuses = [], [], []
+        threads = [threading.Thread(target=run_client,
+                                    args=(server.server_port, urls[i:] + urls[:i], headers, per_client,
+                                          latencies, sizes, statuses))
+                   for i in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        not_modified = statuses.count(304)
+        print(f"{mode:18} {len(latencies) / elapsed:8.0f} req/s  p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms"
+              f"  p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms"
+              f"  avg body {sum(sizes) / len(sizes):7.0f} B  304s {not_modified}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Benchmark: euroleague-api calls and time when several replicas refresh the
+# same season, each on its own vs through the shared snapshot tier (one lease
+# holder fetches, the others pick its version up), and loading a version from
+# the shared tier (Arrow, memory mapped) vs the Parquet snapshot store.
+#
+#   python benchmarks/bench_shared.py [--replicas 1 2 4 8] [--teams 18] [--latency 0.05]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import fetch_season  # noqa: E402
+from refresher import SnapshotRefresher  # noqa: E402
+from shared import DirectoryBackend, MemoryBackend, SharedSnapshots  # noqa: E402
+from store import SnapshotStore  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+
+SEASON = 2024
+LOADS = 20
+
+
+# Function to refresh one season on every replica at once; returns API calls and seconds
+def refresh_replicas(replicas, clients):
+    for client in clients.values():
+        client.calls = 0
+    threads = [threading.Thread(target=replica.refresh, args=(SEASON,)) for replica in replicas]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    assert all(replica.peek(SEASON) is not None for replica in replicas)
+    return sum(client.calls for client in clients.values()), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--replicas', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake request')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    clients = fake_clients(n_teams=args.teams, latency=args.latency)
+
+    def fetch(season):
+        return fetch_season(season, clients=clients)
+
+    # Round discovery remembers the latest round per process, so warm it up first
+    snapshot = SnapshotRefresher(fetch=fetch).refresh(SEASON)
+    print(f"{'replicas':>8} {'alone: calls':>13} {'s':>6} {'shared: calls':>14} {'s':>6}")
+    for n in args.replicas:
+        alone = [SnapshotRefresher(fetch=fetch) for _ in range(n)]
+        alone_calls, alone_seconds = refresh_replicas(alone, clients)
+        backend = MemoryBackend()
+        shared = [SnapshotRefresher(fetch=fetch, shared=SharedSnapshots(backend)) for _ in range(n)]
+        shared_calls, shared_seconds = refresh_replicas(shared, clients)
+        print(f"{n:>8} {alone_calls:>13} {alone_seconds:>6.2f} {shared_calls:>14} {shared_seconds:>6.2f}")
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SnapshotStore(os.path.join(root, 'store'))
+        store.save(snapshot)
+        tier = SharedSnapshots(DirectoryBackend(os.path.join(root, 'shared')))
+        version = tier.publish(snapshot)['version']
+        print()
+        for label, load in [('store (Parquet)', lambda: store.load(SEASON)),
+                            ('shared (Arrow mmap)', lambda: tier.load(SEASON, version))]:
+            start = time.perf_counter()
+            for _ in range(LOADS):
+                load()
+            print(f"{label:<20} {(time.perf_counter() - start) / LOADS * 1000:7.1f} ms per load")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# Benchmark: "players most similar to X" over every stored season.
+#  - recomputing the standardized features and cosine scores per query vs the
+#    SimilarityIndex (one matrix-vector product)
+#  - building the index from the store, then re-syncing after one new round
+#    (only that season's block is rebuilt) vs rebuilding everything
+#
+#   python benchmarks/bench_similarity.py [--seasons 25] [--teams 18]
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import fetch_season  # noqa: E402
+from history import FIRST_SEASON, backfill  # noqa: E402
+from similarity import SIMILARITY_COLUMNS, SimilarityIndex, season_vectors  # noqa: E402
+from snapshot import Snapshot  # noqa: E402
+from store import SnapshotStore  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+
+
+# What a query costs without the index: build every season's vectors, then score
+def most_similar_by_scanning(frames, season, name, team, k):
+    built = [season_vectors(s, *pair) for s, pair in frames.items()]
+    labels = pd.concat([labels for labels, _ in built], ignore_index=True)
+    vectors = np.concatenate([vectors for _, vectors in built])
+    row = labels.index[(labels['Season'] == season) & (labels['player.name'] == name)
+                       & (labels['player.team.tvCodes'] == team)][0]
+    scores = pd.Series(vectors @ vectors[row]).drop(row)
+    return labels.loc[scores.nlargest(k).index]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=25)
+    parser.add_argument('--teams', type=int, default=18)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    seasons = list(range(FIRST_SEASON, FIRST_SEASON + args.seasons))
+    clients = fake_clients(n_teams=args.teams)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SnapshotStore(root)
+        backfill(store, seasons, fetch=lambda season: fetch_season(season, clients=clients, retries=0))
+
+        index = SimilarityIndex()
+        start = time.perf_counter()
+        index.sync(store)
+        usage = index.memory_usage()
+        print(f"build index from the store    {(time.perf_counter() - start) * 1000:8.1f} ms  "
+              f"{usage['players']:,} players x {usage['features']} features over {usage['seasons']} seasons, "
+              f"{usage['vectors_bytes'] / 1e6:.2f} MB vectors + {usage['labels_bytes'] / 1e6:.2f} MB labels")
+
+        frames = {}
+        for season in seasons:
+            snapshot = store.load(season, columns=SIMILARITY_COLUMNS)
+            frames[season] = (snapshot.player_stats, snapshot.advanced_player_stats)
+
+        rng = np.random.default_rng(0)
+        queries = index.labels.iloc[rng.integers(0, len(index.labels), 50)].itertuples(index=False)
+        queries = [tuple(query) for query in queries]
+        start = time.perf_counter()
+        for season, name, team in queries[:5]:
+            most_similar_by_scanning(frames, season, name, team, 10)
+        scanning = (time.perf_counter() - start) / 5 * 1000
+        start = time.perf_counter()
+        for season, name, team in queries:
+            similar = index.most_similar(season, name, team, k=10)
+        indexed = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"top-10 query, scanning        {scanning:8.2f} ms")
+        print(f"top-10 query, index           {indexed:8.2f} ms")
+        expected = most_similar_by_scanning(frames, *queries[-1], 10)
+        assert list(similar['player.name']) == list(expected['player.name'])
+
+        # A new round of the newest season: a new stored snapshot, one block to rebuild
+        latest = store.load(seasons[-1])
+        store.save(Snapshot(latest.season, latest.round_number + 1, latest.frames))
+        start = time.perf_counter()
+        changed = index.sync(store)
+        print(f"sync after a new round        {(time.perf_counter() - start) * 1000:8.1f} ms  "
+              f"({changed} season rebuilt)")
+        start = time.perf_counter()
+        SimilarityIndex().sync(store)
+        print(f"rebuild every season          {(time.perf_counter() - start) * 1000:8.1f} ms")
+        start = time.perf_counter()
+        index.sync(store)
+        print(f"sync with nothing new         {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Benchmark: Monte Carlo odds of finishing top 4/6/10, simulating the rest of
+# the season game by game in Python vs the vectorized simulator, in-process and
+# over a process pool.
+#
+#   python benchmarks/bench_simulation.py [--trials 100000] [--teams 18] [--round 20]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schema import normalize_frame  # noqa: E402
+from simulation import MARGIN_SD, normal_cdf, remaining_games, simulate_season, team_strengths  # noqa: E402
+from fake_api import make_standings, make_team_stats  # noqa: E402
+
+
+# One season at a time, one game at a time
+def simulate_with_loops(standings, advanced_team_stats, round_number, trials):
+    standings = standings.sort_values('position')
+    home, away, _ = remaining_games(standings, round_number)
+    strength = team_strengths(standings, advanced_team_stats)
+    points_difference = list(standings['pointsFor'] - standings['pointsAgainst'])
+    top4 = [0] * len(standings)
+    for _ in range(trials):
+        wins = list(standings['gamesWon'])
+        for h, a in zip(home, away):
+            if random.random() < normal_cdf((strength[h] - strength[a]) / MARGIN_SD):
+                wins[h] += 1
+            else:
+                wins[a] += 1
+        order = sorted(range(len(wins)), key=lambda i: (-wins[i], -points_difference[i], random.random()))
+        for i in order[:4]:
+            top4[i] += 1
+    return [count / trials for count in top4]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trials', type=int, default=100_000)
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--round', type=int, default=20)
+    args = parser.parse_args()
+
+    standings = normalize_frame('standings', make_standings(args.teams, args.round, seed=2024))
+    advanced = normalize_frame('advanced_team_stats', make_team_stats(args.teams, 'advanced', seed=2024))
+
+    loop_trials = max(args.trials // 100, 1)
+    start = time.perf_counter()
+    simulate_with_loops(standings, advanced, args.round, loop_trials)
+    loops = (time.perf_counter() - start) * args.trials / loop_trials
+    print(f"python loops          {loops:8.2f}s  (extrapolated from {loop_trials:,} seasons)")
+
+    for workers in [0, 2, 4]:
+        start = time.perf_counter()
+        odds = simulate_season(standings, advanced, round_number=args.round, trials=args.trials, workers=workers)
+        label = 'vectorized' if not workers else f'vectorized, {workers} procs'
+        print(f"{label:<21} {time.perf_counter() - start:8.2f}s  {args.trials:,} seasons, "
+              f"{odds.attrs['remaining_games']} games left")
+    print(odds.head(6).round(3).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Benchmark: cold start from euroleague-api vs warm start from the snapshot store.
+#
+#   python benchmarks/bench_store.py [--teams 18] [--latency 0.3]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import fetch_season  # noqa: E402
+from refresher import SnapshotRefresher  # noqa: E402
+from rounds import round_discovery  # noqa: E402
+from store import SnapshotStore  # noqa: E402
+from fake_api import fake_clients  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=18)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds per fake request')
+    args = parser.parse_args()
+
+    # A season still in progress, so the warm start checks for a newer round
+    today = date.today()
+    season = today.year if today.month >= 9 else today.year - 1
+
+    with tempfile.TemporaryDirectory() as root:
+        clients = fake_clients(n_teams=args.teams, latency=args.latency)
+
+        def fetch(season):
+            return fetch_season(season, clients=clients)
+
+        def check_round(season):
+            return round_discovery.find_latest_round(clients['standings'], season)[0]
+
+        # First process: nothing stored yet
+        start = time.perf_counter()
+        cold = SnapshotRefresher(fetch=fetch, store=SnapshotStore(root), check_round=check_round)
+        cold.get(season)
+        print(f"cold start (network)  {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        # Restarted process: same store, empty memory
+        round_discovery.forget()
+        for client in clients.values():
+            client.calls = 0
+        start = time.perf_counter()
+        warm = SnapshotRefresher(fetch=fetch, store=SnapshotStore(root), check_round=check_round)
+        snapshot = warm.get(season)
+        print(f"warm start (store)    {(time.perf_counter() - start) * 1000:8.1f} ms  round={snapshot.round_number}")
+
+        # Give the background "newer round?" check time to finish
+        time.sleep(args.latency * 3)
+        calls = sum(client.calls for client in clients.values())
+        print(f"requests after warm start: {calls} (newer round check only)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Benchmark: rolling player trends over many seasons of per-game rows.
+#  - a Python loop over every player, then pandas groupby().rolling(), vs the
+#    prefix-sum rolling_sums used by trends.py
+#  - materializing one new round incrementally vs recomputing all history
+#
+#   python benchmarks/bench_trends.py [--seasons 10] [--window 5]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import RoundIngestor  # noqa: E402
+from trends import PLAYER_TRENDS, TrendStore, add_rolling, compact, game_columns  # noqa: E402
+from fake_api import FakeBoxScoreData, fake_clients  # noqa: E402
+
+ROUNDS = 34
+GAMES_PER_ROUND = 9
+PLAYERS_PER_GAME = 20
+
+
+# Function to make per-game player rows shaped like trends.player_game_rows output
+def make_player_games(seasons, seed=0):
+    rng = np.random.default_rng(seed)
+    n = seasons * ROUNDS * GAMES_PER_ROUND * PLAYERS_PER_GAME
+    game = np.arange(n) // PLAYERS_PER_GAME
+    games = pd.DataFrame({
+        'Season': 2000 + game // (ROUNDS * GAMES_PER_ROUND),
+        'Round': 1 + (game // GAMES_PER_ROUND) % ROUNDS,
+        'Gamecode': 1 + game % (ROUNDS * GAMES_PER_ROUND),
+        # Rosters change a little every season
+        'player.code': (rng.integers(0, 360, n) + 40 * (game // (ROUNDS * GAMES_PER_ROUND))).astype(str),
+    })
+    for column in game_columns(PLAYER_TRENDS):
+        games[column] = rng.gamma(2.0, 3.0, n).round()
+    return compact(games)
+
+
+def python_loop(games, window):
+    results = {}
+    for code, player in games.sort_values(['Season', 'Round', 'Gamecode']).groupby('player.code', observed=True):
+        pir = list(player['pir'])
+        results[code] = [sum(pir[max(0, i - window + 1):i + 1]) / (i + 1 - max(0, i - window + 1))
+                         for i in range(len(pir))]
+    return results
+
+
+def pandas_rolling(games, window):
+    ordered = games.sort_values(['player.code', 'Season', 'Round', 'Gamecode'])
+    grouped = ordered.groupby('player.code', observed=True)
+    rolled = {column: grouped[column].rolling(window, min_periods=1).sum() for column in game_columns(PLAYER_TRENDS)}
+    return rolled
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=10)
+    parser.add_argument('--window', type=int, default=5)
+    args = parser.parse_args()
+
+    games = make_player_games(args.seasons)
+    print(f"{len(games):,} player games, {games['player.code'].nunique():,} players, "
+          f"{games.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    print(f"python loop (PIR only)    {timed(lambda: python_loop(games, args.window), 1):9.1f} ms")
+    print(f"pandas groupby().rolling  {timed(lambda: pandas_rolling(games, args.window)):9.1f} ms")
+    print(f"prefix-sum rolling_sums   {timed(lambda: add_rolling(games, 'player.code', PLAYER_TRENDS, args.window)):9.1f} ms")
+
+    # Materialization from ingested boxscores (fake API): history once, then one new round
+    with tempfile.TemporaryDirectory() as root:
+        boxscores = FakeBoxScoreData(latest_round=ROUNDS - 1)
+        ingestor = RoundIngestor(os.path.join(root, 'rounds'), boxscore_api=boxscores,
+                                 standings_api=fake_clients()['standings'])
+        seasons = [2022, 2023, 2024]
+        for season in seasons:
+            ingestor.ingest(season)
+        store = TrendStore(os.path.join(root, 'trends'), ingestor=ingestor, window=args.window)
+        start = time.perf_counter()
+        for season in seasons:
+            store.update(season)
+        print(f"materialize {len(seasons)} seasons       {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+        boxscores.latest_round = ROUNDS
+        ingestor.ingest(seasons[-1])
+        start = time.perf_counter()
+        new_games = store.update(seasons[-1])
+        print(f"one new round ({new_games} games)   {(time.perf_counter() - start) * 1000:9.1f} ms (incremental)")
+        start = time.perf_counter()
+        new_games = store.update(seasons[-1])
+        print(f"nothing new               {(time.perf_counter() - start) * 1000:9.1f} ms")
+
+        rebuilt = TrendStore(os.path.join(root, 'rebuilt'), ingestor=ingestor, window=args.window)
+        start = time.perf_counter()
+        for season in seasons:
+            rebuilt.update(season)
+        print(f"recompute all history     {(time.perf_counter() - start) * 1000:9.1f} ms")
+        pd.testing.assert_frame_equal(store.load(seasons[-1], 'players'), rebuilt.load(seasons[-1], 'players'))
+
+
+if __name__ == '__main__':
+    main()
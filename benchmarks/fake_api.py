@@ -0,0 +1,437 @@
+# Local stand-ins for the euroleague-api clients used by the benchmarks.
+# They return synthetic frames shaped like the real responses, sleep to mimic
+# network latency and count every call so benchmarks can report requests made.
+import hashlib
+import json
+import time
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import xmltodict
+
+
+def team_codes(n_teams):
+    return [f"T{i:03d}" for i in range(n_teams)]
+
+
+# Function to format a float array like the API's percent strings ("52.3%")
+def percent_strings(values):
+    return [f"{v:.1f}%" for v in values]
+
+
+def make_standings(n_teams, round_number, seed=0):
+    rng = np.random.default_rng(seed + round_number)
+    codes = team_codes(n_teams)
+    won = rng.integers(0, round_number + 1, n_teams)
+    lost = round_number - won
+    home_won = won // 2
+    away_won = won - home_won
+    return pd.DataFrame({
+        'position': np.argsort(np.argsort(-won)) + 1,
+        'club.code': codes,
+        'club.tvCode': codes,
+        'club.abbreviatedName': [f"Team {c}" for c in codes],
+        'club.editorialName': [f"Team {c}" for c in codes],
+        'gamesPlayed': round_number,
+        'gamesWon': won,
+        'gamesLost': lost,
+        'pointsFor': rng.integers(70, 95, n_teams) * round_number,
+        'pointsAgainst': rng.integers(70, 95, n_teams) * round_number,
+        'homeRecord': [f"{h}-{round_number // 2 - h if round_number // 2 >= h else 0}" for h in home_won],
+        'awayRecord': [f"{a}-{max(round_number - round_number // 2 - a, 0)}" for a in away_won],
+        'last5Form': [str(list(rng.choice(['W', 'L'], 5))) for _ in range(n_teams)],
+    }).sort_values('position').reset_index(drop=True)
+
+
+def make_team_stats(n_teams, endpoint, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = team_codes(n_teams)
+    frame = pd.DataFrame({
+        'team.code': codes,
+        'team.tvCodes': codes,
+        'team.name': [f"Team {c}" for c in codes],
+        'gamesPlayed': 20,
+    })
+    if endpoint == 'traditional':
+        frame['pointsScored'] = rng.normal(82, 5, n_teams).round(1)
+        frame['twoPointersPercentage'] = percent_strings(rng.normal(54, 3, n_teams))
+        frame['threePointersPercentage'] = percent_strings(rng.normal(36, 3, n_teams))
+        frame['freeThrowsPercentage'] = percent_strings(rng.normal(77, 4, n_teams))
+        frame['threePointersMade'] = rng.normal(9, 1.5, n_teams).round(1)
+        frame['offensiveRebounds'] = rng.normal(10, 1.5, n_teams).round(1)
+        frame['defensiveRebounds'] = rng.normal(24, 2, n_teams).round(1)
+        frame['totalRebounds'] = frame['offensiveRebounds'] + frame['defensiveRebounds']
+        frame['assists'] = rng.normal(18, 2, n_teams).round(1)
+        frame['steals'] = rng.normal(7, 1, n_teams).round(1)
+        frame['turnovers'] = rng.normal(12, 1.5, n_teams).round(1)
+        frame['blocks'] = rng.normal(2.5, 0.6, n_teams).round(1)
+        frame['foulsCommited'] = rng.normal(20, 2, n_teams).round(1)
+        frame['foulsDrawn'] = rng.normal(20, 2, n_teams).round(1)
+        frame['pir'] = rng.normal(90, 8, n_teams).round(1)
+    else:
+        from_two = rng.normal(52, 4, n_teams)
+        from_three = rng.normal(32, 4, n_teams)
+        frame['pointsFromTwoPointersPercentage'] = percent_strings(from_two)
+        frame['pointsFromThreePointersPercentage'] = percent_strings(from_three)
+        frame['pointsFromFreeThrowsPercentage'] = percent_strings(100 - from_two - from_three)
+        frame['offensiveRating'] = rng.normal(112, 5, n_teams).round(1)
+        frame['defensiveRating'] = rng.normal(112, 5, n_teams).round(1)
+        frame['possesions'] = rng.normal(72, 3, n_teams).round(1) * 20
+        frame['pace'] = rng.normal(72, 3, n_teams).round(1)
+        frame['effectiveFieldGoalPercentage'] = percent_strings(rng.normal(54, 3, n_teams))
+        frame['trueShootingPercentage'] = percent_strings(rng.normal(58, 3, n_teams))
+        frame['assistsRatio'] = percent_strings(rng.normal(18, 2, n_teams))
+        frame['turnoversRatio'] = percent_strings(rng.normal(14, 2, n_teams))
+    return frame
+
+
+def make_player_stats(n_teams, endpoint, players_per_team=14, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    codes = np.repeat(team_codes(n_teams), players_per_team)
+    n_players = len(codes)
+    ids = [f"P{i:05d}" for i in range(n_players)]
+    frame = pd.DataFrame({
+        'player.code': ids,
+        'player.name': [f"PLAYER, {pid}" for pid in ids],
+        'player.team.code': codes,
+        'player.team.tvCodes': codes,
+        'player.team.name': [f"Team {c}" for c in codes],
+        'player.imageUrl': [f"https://media.example.invalid/players/{pid}.png" for pid in ids],
+        'gamesPlayed': rng.integers(1, 21, n_players),
+    })
+    if endpoint == 'traditional':
+        frame['minutesPlayed'] = rng.uniform(2, 32, n_players).round(1)
+        frame['pointsScored'] = rng.gamma(2.0, 3.5, n_players).round(1)
+        frame['totalRebounds'] = rng.gamma(2.0, 1.5, n_players).round(1)
+        frame['offensiveRebounds'] = (frame['totalRebounds'] * 0.3).round(1)
+        frame['defensiveRebounds'] = frame['totalRebounds'] - frame['offensiveRebounds']
+        frame['assists'] = rng.gamma(1.5, 1.2, n_players).round(1)
+        frame['steals'] = rng.gamma(1.2, 0.5, n_players).round(1)
+        frame['turnovers'] = rng.gamma(1.2, 0.9, n_players).round(1)
+        frame['blocks'] = rng.gamma(1.0, 0.3, n_players).round(1)
+        frame['twoPointersPercentage'] = percent_strings(rng.uniform(30, 70, n_players))
+        frame['threePointersPercentage'] = percent_strings(rng.uniform(20, 50, n_players))
+        frame['freeThrowsPercentage'] = percent_strings(rng.uniform(50, 95, n_players))
+        frame['pir'] = (frame['pointsScored'] + frame['totalRebounds'] + frame['assists']
+                        - frame['turnovers'] + rng.normal(0, 1.5, n_players)).round(1)
+    else:
+        two_ratio = rng.uniform(20, 80, n_players)
+        frame['twoPointAttemptsRatio'] = percent_strings(two_ratio)
+        frame['threePointAttemptsRatio'] = percent_strings(100 - two_ratio)
+        frame['freeThrowsRate'] = percent_strings(rng.uniform(5, 60, n_players))
+        frame['effectiveFieldGoalPercentage'] = percent_strings(rng.uniform(35, 70, n_players))
+        frame['trueShootingPercentage'] = percent_strings(rng.uniform(40, 72, n_players))
+        frame['offensiveReboundsPercentage'] = percent_strings(rng.uniform(0, 15, n_players))
+        frame['defensiveReboundsPercentage'] = percent_strings(rng.uniform(5, 30, n_players))
+        frame['assistsRatio'] = percent_strings(rng.uniform(2, 40, n_players))
+        frame['turnoversRatio'] = percent_strings(rng.uniform(5, 25, n_players))
+        frame['usage'] = percent_strings(rng.uniform(8, 32, n_players))
+    return frame
+
+
+# Function to build a double round robin schedule: [(round, gamecode, home, away)]
+def make_schedule(n_teams):
+    codes = team_codes(n_teams)
+    rotation = list(range(n_teams))
+    first_half = []
+    for round_index in range(n_teams - 1):
+        pairs = [(rotation[i], rotation[n_teams - 1 - i]) for i in range(n_teams // 2)]
+        first_half.append([(a, b) if round_index % 2 else (b, a) for a, b in pairs])
+        rotation = [rotation[0], rotation[-1], *rotation[1:-1]]
+    rounds = first_half + [[(away, home) for home, away in games] for games in first_half]
+    schedule = []
+    for round_number, games in enumerate(rounds, start=1):
+        for home, away in games:
+            schedule.append((round_number, len(schedule) + 1, codes[home], codes[away]))
+    return schedule
+
+
+BOXSCORE_STATS = ['FieldGoalsMade2', 'FieldGoalsAttempted2', 'FieldGoalsMade3', 'FieldGoalsAttempted3',
+                  'FreeThrowsMade', 'FreeThrowsAttempted', 'OffensiveRebounds', 'DefensiveRebounds',
+                  'TotalRebounds', 'Assistances', 'Steals', 'Turnovers', 'BlocksFavour', 'BlocksAgainst',
+                  'FoulsCommited', 'FoulsReceived', 'Valuation', 'Points']
+
+
+# Function to build one team's side of a boxscore (players, then the Team and Total rows)
+def make_boxscore_side(season, gamecode, team, home, rng, players_per_team=10):
+    made2 = rng.integers(0, 7, players_per_team)
+    made3 = rng.integers(0, 4, players_per_team)
+    made_ft = rng.integers(0, 5, players_per_team)
+    offensive = rng.integers(0, 3, players_per_team)
+    defensive = rng.integers(0, 6, players_per_team)
+    assists = rng.integers(0, 6, players_per_team)
+    steals = rng.integers(0, 3, players_per_team)
+    turnovers = rng.integers(0, 4, players_per_team)
+    points = 2 * made2 + 3 * made3 + made_ft
+    side = pd.DataFrame({
+        'Player_ID': [f"P{team}{i:02d}" for i in range(players_per_team)],
+        'IsStarter': [1] * 5 + [0] * (players_per_team - 5),
+        'IsPlaying': 1,
+        'Team': team,
+        'Dorsal': [str(i) for i in range(players_per_team)],
+        'Player': [f"PLAYER {i}, {team}" for i in range(players_per_team)],
+        'Minutes': [f"{m:02d}:{s:02d}" for m, s in zip(rng.integers(5, 35, players_per_team),
+                                                      rng.integers(0, 60, players_per_team))],
+        'FieldGoalsMade2': made2, 'FieldGoalsAttempted2': made2 + rng.integers(0, 6, players_per_team),
+        'FieldGoalsMade3': made3, 'FieldGoalsAttempted3': made3 + rng.integers(0, 5, players_per_team),
+        'FreeThrowsMade': made_ft, 'FreeThrowsAttempted': made_ft + rng.integers(0, 3, players_per_team),
+        'OffensiveRebounds': offensive, 'DefensiveRebounds': defensive, 'TotalRebounds': offensive + defensive,
+        'Assistances': assists, 'Steals': steals, 'Turnovers': turnovers,
+        'BlocksFavour': rng.integers(0, 2, players_per_team), 'BlocksAgainst': rng.integers(0, 2, players_per_team),
+        'FoulsCommited': rng.integers(0, 5, players_per_team), 'FoulsReceived': rng.integers(0, 5, players_per_team),
+        'Points': points,
+    })
+    side['Valuation'] = points + offensive + defensive + assists + steals - turnovers
+    totals = side[BOXSCORE_STATS].sum()
+    team_row = {'Player_ID': 'Team', 'Team': team, 'Player': 'Team', 'Minutes': '', **{c: 0 for c in BOXSCORE_STATS}}
+    total_row = {'Player_ID': 'Total', 'Team': team, 'Player': 'Total', 'Minutes': '200:00', **totals.to_dict()}
+    side = pd.concat([side, pd.DataFrame([team_row, total_row])], ignore_index=True)
+    side.insert(0, 'Season', season)
+    side.insert(1, 'Gamecode', gamecode)
+    side.insert(2, 'Home', home)
+    return side
+
+
+PLAY_TYPES = ['2FGM', '2FGA', '3FGM', '3FGA', 'FTM', 'FTA', 'D', 'O', 'AS', 'TO', 'ST', 'CM', 'RV', 'FV', 'IN', 'OUT']
+PERIODS = ['FirstQuarter', 'SecondQuarter', 'ThirdQuarter', 'ForthQuarter', 'ExtraTime']
+
+
+# Function to build a live.euroleague.net PlaybyPlay payload: plays grouped by quarter
+def make_play_by_play_payload(season, gamecode, home, away, plays_per_quarter=110):
+    rng = np.random.default_rng(season * 1000 + gamecode)
+    points = {home: 0, away: 0}
+    payload = {'Live': False, 'TeamA': f"Team {home}", 'TeamB': f"Team {away}",
+               'CodeTeamA': home, 'CodeTeamB': away, 'ActualQuarter': 4, 'ExtraTime': []}
+    number = 0
+    for quarter in PERIODS[:4]:
+        plays = []
+        seconds = np.sort(rng.integers(0, 600, plays_per_quarter))[::-1]
+        for second in seconds:
+            number += 1
+            team = home if rng.random() < 0.5 else away
+            play_type = PLAY_TYPES[rng.integers(len(PLAY_TYPES))]
+            scored = {'2FGM': 2, '3FGM': 3, 'FTM': 1}.get(play_type, 0)
+            points[team] += scored
+            player = rng.integers(10)
+            plays.append({
+                'TYPE': 0, 'NUMBEROFPLAY': number, 'CODETEAM': f"{team}      ",
+                'PLAYER_ID': f"P{team}{player:02d}   ", 'PLAYTYPE': play_type,
+                'PLAYER': f"PLAYER {player}, {team}", 'TEAM': f"Team {team}", 'DORSAL': str(player),
+                'MINUTE': int(10 - second // 60 + 10 * PERIODS.index(quarter)),
+                'MARKERTIME': f"{second // 60:02d}:{second % 60:02d}",
+                'POINTS_A': points[home] if scored else None, 'POINTS_B': points[away] if scored else None,
+                'COMMENT': '', 'PLAYINFO': f"{play_type} ({player})",
+            })
+        payload[quarter] = plays
+    return payload
+
+
+class FakeClient:
+    # latency: seconds per call, or a dict of seconds keyed by endpoint
+    # fail: endpoints that always raise
+    def __init__(self, n_teams=18, latency=0.0, fail=()):
+        self.n_teams = n_teams
+        self.latency = latency
+        self.fail = set(fail)
+        self.calls = 0
+
+    def _request(self, endpoint):
+        self.calls += 1
+        latency = self.latency.get(endpoint, 0.0) if isinstance(self.latency, dict) else self.latency
+        time.sleep(latency)
+        if endpoint in self.fail:
+            raise ConnectionError(f"{endpoint} is down")
+
+
+class FakeStandings(FakeClient):
+    def __init__(self, latest_round=20, n_teams=18, latency=0.0, fail=()):
+        super().__init__(n_teams, latency, fail)
+        self.latest_round = latest_round
+
+    def get_standings(self, season, round_number, endpoint='basicstandings'):
+        self._request('standings')
+        if round_number > self.latest_round:
+            # The live API errors out for rounds that haven't been played
+            raise ValueError(f"Round {round_number} not played yet")
+        return make_standings(self.n_teams, round_number, seed=season)
+
+
+class FakeTeamStats(FakeClient):
+    def get_team_stats_single_season(self, endpoint, season, phase_type_code, statistic_mode):
+        self._request(f"team_{endpoint}")
+        return make_team_stats(self.n_teams, endpoint, seed=season)
+
+
+class FakePlayerStats(FakeClient):
+    def get_player_stats_single_season(self, endpoint, season, phase_type_code, statistic_mode):
+        self._request(f"player_{endpoint}")
+        return make_player_stats(self.n_teams, endpoint, seed=season)
+
+
+class FakeBoxScoreData(FakeClient):
+    def __init__(self, latest_round=20, n_teams=18, latency=0.0, fail=()):
+        super().__init__(n_teams, latency, fail)
+        self.latest_round = latest_round
+        self.schedule = make_schedule(n_teams)
+
+    def get_game_metadata_season(self, season):
+        self._request('schedule')
+        return pd.DataFrame({
+            'round': 'RS',
+            'gameday': [game[0] for game in self.schedule],
+            'gamenumber': [game[1] for game in self.schedule],
+            'homecode': [game[2] for game in self.schedule],
+            'awaycode': [game[3] for game in self.schedule],
+            'played': [game[0] <= self.latest_round for game in self.schedule],
+        })
+
+    def get_player_boxscore_stats_data(self, season, gamecode):
+        self._request('boxscore')
+        round_number, _, home, away = self.schedule[gamecode - 1]
+        if round_number > self.latest_round:
+            raise ValueError(f"Game code, {gamecode}, did not return any data.")
+        rng = np.random.default_rng(season * 1000 + gamecode)
+        return pd.concat([make_boxscore_side(season, gamecode, home, 1, rng),
+                          make_boxscore_side(season, gamecode, away, 0, rng)], ignore_index=True)
+
+
+class FakeGameSource(FakeClient):
+    # Stand-in for playbyplay.LiveSource: the schedule's played games and raw JSON payloads
+    def __init__(self, latest_round=20, n_teams=18, latency=0.0, fail=()):
+        super().__init__(n_teams, latency, fail)
+        self.latest_round = latest_round
+        self.schedule = make_schedule(n_teams)
+
+    def games(self, season):
+        self._request('schedule')
+        return [gamecode for round_number, gamecode, _, _ in self.schedule if round_number <= self.latest_round]
+
+    def payload(self, season, gamecode):
+        self._request('playbyplay')
+        _, _, home, away = self.schedule[gamecode - 1]
+        return json.dumps(make_play_by_play_payload(season, gamecode, home, away)).encode('utf-8')
+
+
+class FakeResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ConnectionError(f"HTTP {self.status_code}")
+
+
+class FakeLiveSession(FakeClient):
+    # Stand-in for the requests session live.LiveSource polls: the results XML
+    # and the live Boxscore JSON of a game night. The round after latest_round
+    # tips off at tipoff (a timezone-aware datetime), a third of its games every
+    # stagger_minutes; advance(seconds) moves the clock on. Boxscores change
+    # every game_step_seconds while a game is on. Every response carries an
+    # ETag and If-None-Match is answered with a 304.
+    GAME_SECONDS = 2 * 3600
+    # Start times in the schedule are local to the league office
+    TIMEZONE = ZoneInfo('Europe/Madrid')
+
+    def __init__(self, tipoff, latest_round=20, n_teams=18, stagger_minutes=30, game_step_seconds=90,
+                 latency=0.0, fail=()):
+        super().__init__(n_teams, latency, fail)
+        self.tipoff = tipoff
+        self.latest_round = latest_round
+        self.stagger_minutes = stagger_minutes
+        self.game_step_seconds = game_step_seconds
+        self.schedule = make_schedule(n_teams)
+        self.elapsed = 0.0
+        self.not_modified = 0
+        self.bytes = 0
+        self._bodies = {}
+        self._finals = {}
+
+    def advance(self, seconds):
+        self.elapsed += seconds
+
+    def start(self, round_number, index):
+        if round_number > self.latest_round:
+            return self.tipoff + timedelta(days=7 * (round_number - self.latest_round - 1),
+                                           minutes=self.stagger_minutes * (index % 3))
+        return self.tipoff - timedelta(days=7 * (self.latest_round + 1 - round_number))
+
+    # Function to get how far a game is, from 0 (not started) to 1 (over)
+    def progress(self, round_number, index):
+        seconds = self.elapsed - (self.start(round_number, index) - self.tipoff).total_seconds()
+        if seconds <= 0:
+            return 0.0
+        if seconds >= self.GAME_SECONDS:
+            return 1.0
+        return (seconds // self.game_step_seconds * self.game_step_seconds) / self.GAME_SECONDS
+
+    def schedule_xml(self):
+        slots = [(round_number, index % (self.n_teams // 2))
+                 for index, (round_number, _, _, _) in enumerate(self.schedule)]
+        played = tuple(self.progress(round_number, slot) >= 1 for round_number, slot in slots)
+        if played not in self._bodies:
+            games = []
+            for (round_number, gamecode, home, away), (_, slot), is_played in zip(self.schedule, slots, played):
+                start = self.start(round_number, slot).astimezone(self.TIMEZONE)
+                games.append({'gameday': round_number, 'gamenumber': gamecode, 'round': 'RS',
+                              'homecode': home, 'awaycode': away, 'homescore': 0, 'awayscore': 0,
+                              'played': str(is_played).lower(),
+                              'date': f"{start:%b %d, %Y}", 'startime': f"{start:%H:%M}"})
+            self._bodies[played] = xmltodict.unparse({'results': {'game': games}}).encode('utf-8')
+        return self._bodies[played]
+
+    def boxscore_json(self, season, gamecode):
+        round_number, _, home, away = self.schedule[gamecode - 1]
+        progress = self.progress(round_number, (gamecode - 1) % (self.n_teams // 2))
+        # Built once per game step, like a server rendering it once per change
+        key = (season, gamecode, progress)
+        if key not in self._bodies:
+            self._bodies[key] = self._boxscore_body(season, gamecode, home, away, progress)
+        return self._bodies[key]
+
+    # Function to build a game's final player rows once; a game in progress shows a share of them
+    def final_players(self, season, gamecode, home, away):
+        key = (season, gamecode)
+        if key not in self._finals:
+            rng = np.random.default_rng(season * 1000 + gamecode)
+            sides = [make_boxscore_side(season, gamecode, team, is_home, rng) for team, is_home in [(home, 1), (away, 0)]]
+            self._finals[key] = [
+                side[~side['Player_ID'].isin(['Team', 'Total'])].drop(columns=['Season', 'Gamecode', 'Home'])
+                .astype({column: int for column in BOXSCORE_STATS}).to_dict('records') for side in sides]
+        return self._finals[key]
+
+    def _boxscore_body(self, season, gamecode, home, away, progress):
+        stats = []
+        for team, players in zip([home, away], self.final_players(season, gamecode, home, away)):
+            players = [{**player, **{column: int(player[column] * progress) for column in BOXSCORE_STATS}}
+                       for player in players]
+            stats.append({'Team': f"Team {team}", 'PlayersStats': players,
+                          'tmr': {column: 0 for column in BOXSCORE_STATS},
+                          'totr': {column: sum(player[column] for player in players) for column in BOXSCORE_STATS}})
+        return json.dumps({'Live': 0 < progress < 1, 'Stats': stats}).encode('utf-8')
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        if url.endswith('/results'):
+            self._request('schedule')
+            body = self.schedule_xml()
+        else:
+            self._request('boxscore')
+            body = self.boxscore_json(int(params['seasoncode'][1:]), int(params['gamecode']))
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if (headers or {}).get('If-None-Match') == etag:
+            self.not_modified += 1
+            return FakeResponse(304, b'', {'ETag': etag})
+        self.bytes += len(body)
+        return FakeResponse(200, body, {'ETag': etag})
+
+
+# Function to build the clients dict fetcher.fetch_season expects
+def fake_clients(latest_round=20, n_teams=18, latency=0.0, fail=()):
+    return {
+        'standings': FakeStandings(latest_round, n_teams, latency, fail),
+        'team': FakeTeamStats(n_teams, latency, fail),
+        'player': FakePlayerStats(n_teams, latency, fail),
+    }
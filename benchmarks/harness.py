@@ -0,0 +1,488 @@
+# Offline benchmark harness: replays recorded Standings/TeamStats/PlayerStats
+# responses (with latency and scaled up to more teams, players and seasons),
+# drives the data and analytics functions headlessly and the whole page through
+# Streamlit's AppTest, and reports cold/warm latency, peak memory and API calls.
+# Results are saved per commit so a change can be compared with an earlier run.
+#
+#   python benchmarks/harness.py record --out fixtures/ --seasons 2023 2024   live API, once
+#   python benchmarks/harness.py record --out fixtures/ --synthetic           fake data, no network
+#   python benchmarks/harness.py run [--fixtures fixtures/] [--teams 18] [--players-per-team 14]
+#                                    [--seasons 3] [--latency 0.05] [--no-page] [--save]
+#   python benchmarks/harness.py compare [OLD.json NEW.json]                 default: the last two saved
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Nothing the harness runs touches the real data directory
+os.environ.setdefault('EUROLEAGUE_DATA_DIR', tempfile.mkdtemp(prefix='euroleague-harness-'))
+
+from fetcher import SEASON_DATASETS, dataset_call, fetch_season  # noqa: E402
+from rounds import find_latest_round  # noqa: E402
+from fake_api import FakeBoxScoreData, FakeClient, make_player_stats, make_standings, make_team_stats  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# A metric this much slower (or bigger) than in the older run is flagged
+REGRESSION_THRESHOLD = 0.10
+
+# Calls averaged for a warm timing
+WARM_REPEATS = 20
+
+# Background work the app starts after a refresh (figure warming, backfills, trends);
+# measurements wait for it, so one step's threads don't slow the next one down
+BACKGROUND_THREADS = ('warm-figures-', 'backfill-', 'refresh-', 'trends-')
+
+# Columns holding team or player identities; scaled copies get a suffix on them
+TEAM_CODE_COLUMNS = ['club.code', 'club.tvCode', 'club.abbreviatedName', 'club.editorialName', 'team.code',
+                     'team.tvCodes', 'team.name', 'player.team.code', 'player.team.tvCodes', 'player.team.name']
+PLAYER_CODE_COLUMNS = ['player.code', 'player.name']
+
+
+# Function to name the recorded file of a dataset: team_traditional, player_advanced, ...
+def dataset_file(name):
+    client, endpoint, _ = SEASON_DATASETS[name]
+    return f'{client}_{endpoint}.parquet'
+
+
+def season_dir(directory, season):
+    return os.path.join(directory, f'season={season}')
+
+
+# Function to save one season's responses: the latest standings and the four stats datasets
+def write_recording(directory, season, latest_round, standings, datasets):
+    os.makedirs(season_dir(directory, season), exist_ok=True)
+    standings.to_parquet(os.path.join(season_dir(directory, season), 'standings.parquet'))
+    for name, frame in datasets.items():
+        frame.to_parquet(os.path.join(season_dir(directory, season), dataset_file(name)))
+    with open(os.path.join(season_dir(directory, season), 'meta.json'), 'w') as f:
+        json.dump({'season': season, 'latest_round': latest_round}, f, indent=2)
+
+
+# Function to record the live API's responses for some seasons
+def record_live(directory, seasons):
+    from euroleague_api.player_stats import PlayerStats
+    from euroleague_api.standings import Standings
+    from euroleague_api.team_stats import TeamStats
+
+    clients = {'standings': Standings(), 'team': TeamStats(), 'player': PlayerStats()}
+    for season in seasons:
+        latest_round, standings = find_latest_round(clients['standings'], season)
+        datasets = {name: dataset_call(clients, name, season)() for name in SEASON_DATASETS}
+        write_recording(directory, season, latest_round, standings, datasets)
+        print(f"recorded season {season} (round {latest_round})")
+
+
+# Function to record synthetic responses shaped like the live ones (no network)
+def record_synthetic(directory, seasons, n_teams=18, players_per_team=14, latest_round=20):
+    for season in seasons:
+        datasets = {}
+        for name, (client, endpoint, _) in SEASON_DATASETS.items():
+            if client == 'team':
+                datasets[name] = make_team_stats(n_teams, endpoint, seed=season)
+            else:
+                datasets[name] = make_player_stats(n_teams, endpoint, players_per_team=players_per_team, seed=season)
+        write_recording(directory, season, latest_round, make_standings(n_teams, latest_round, seed=season), datasets)
+
+
+# Function to scale a recorded frame to `teams` teams and `players_per_team`
+# players: rows are copied with a suffix on their codes, or dropped
+def scale_frame(frame, teams=None, players_per_team=None):
+    team_column = next((column for column in ['club.tvCode', 'team.tvCodes', 'player.team.tvCodes']
+                        if column in frame), None)
+    if team_column is None:
+        return frame
+    if players_per_team is not None and 'player.code' in frame:
+        per_team = max(frame.groupby(team_column, observed=True).size().max(), 1)
+        copies = [frame] + [suffixed(frame, PLAYER_CODE_COLUMNS, f'#{i}')
+                            for i in range(1, math.ceil(players_per_team / per_team))]
+        frame = pd.concat(copies, ignore_index=True).groupby(team_column, observed=True).head(players_per_team)
+    if teams is not None:
+        recorded = sorted(set(frame[team_column].astype(str)))
+        suffixes = [''] + [str(i) for i in range(1, math.ceil(teams / max(len(recorded), 1)))]
+        frame = pd.concat([frame] + [suffixed(frame, TEAM_CODE_COLUMNS + PLAYER_CODE_COLUMNS, suffix)
+                                     for suffix in suffixes[1:]], ignore_index=True)
+        # The same teams in every frame, whatever order each one lists them in
+        kept = [code + suffix for suffix in suffixes for code in recorded][:teams]
+        frame = frame[frame[team_column].astype(str).isin(kept)].reset_index(drop=True)
+        if 'position' in frame:
+            frame['position'] = range(1, len(frame) + 1)
+    return frame
+
+
+def suffixed(frame, columns, suffix):
+    frame = frame.copy()
+    for column in columns:
+        if column in frame:
+            frame[column] = frame[column].astype(str) + suffix
+    return frame
+
+
+class Recording:
+    # Recorded seasons, read once and scaled; a season that wasn't recorded is
+    # served from the nearest recorded one, so any number of seasons can be replayed
+
+    def __init__(self, directory, teams=None, players_per_team=None):
+        self.directory = directory
+        self.teams = teams
+        self.players_per_team = players_per_team
+        self.seasons = sorted(int(os.path.basename(path).split('=')[1])
+                              for path in glob.glob(os.path.join(directory, 'season=*')))
+        if not self.seasons:
+            raise SystemExit(f"No recorded seasons in {directory}")
+        self._frames = {}
+
+    def recorded_season(self, season):
+        return min(self.seasons, key=lambda recorded: abs(recorded - season))
+
+    def latest_round(self, season):
+        with open(os.path.join(season_dir(self.directory, self.recorded_season(season)), 'meta.json')) as f:
+            return json.load(f)['latest_round']
+
+    def frame(self, season, file_name):
+        key = (self.recorded_season(season), file_name)
+        if key not in self._frames:
+            frame = pd.read_parquet(os.path.join(season_dir(self.directory, key[0]), file_name))
+            self._frames[key] = scale_frame(frame, self.teams, self.players_per_team)
+        return self._frames[key].copy()
+
+
+class ReplayStandings(FakeClient):
+    def __init__(self, recording, latency=0.0):
+        super().__init__(latency=latency)
+        self.recording = recording
+
+    def get_standings(self, season, round_number, endpoint='basicstandings'):
+        self._request('standings')
+        if round_number > self.recording.latest_round(season):
+            # The live API errors out for rounds that haven't been played
+            raise ValueError(f"Round {round_number} not played yet")
+        return self.recording.frame(season, 'standings.parquet')
+
+
+class ReplayTeamStats(FakeClient):
+    def __init__(self, recording, latency=0.0):
+        super().__init__(latency=latency)
+        self.recording = recording
+
+    def get_team_stats_single_season(self, endpoint, season, phase_type_code, statistic_mode):
+        self._request(f'team_{endpoint}')
+        return self.recording.frame(season, f'team_{endpoint}.parquet')
+
+
+class ReplayPlayerStats(FakeClient):
+    def __init__(self, recording, latency=0.0):
+        super().__init__(latency=latency)
+        self.recording = recording
+
+    def get_player_stats_single_season(self, endpoint, season, phase_type_code, statistic_mode):
+        self._request(f'player_{endpoint}')
+        return self.recording.frame(season, f'player_{endpoint}.parquet')
+
+
+# Function to build the clients dict fetcher.fetch_season expects, replaying a recording
+def replay_clients(recording, latency=0.0):
+    return {
+        'standings': ReplayStandings(recording, latency),
+        'team': ReplayTeamStats(recording, latency),
+        'player': ReplayPlayerStats(recording, latency),
+    }
+
+
+def api_calls(clients):
+    return sum(client.calls for client in clients.values())
+
+
+def wait_for_background():
+    for thread in threading.enumerate():
+        if thread.name.startswith(BACKGROUND_THREADS):
+            thread.join()
+
+
+# Function to run fn twice: timed, then under tracemalloc for its peak memory.
+# setup runs before each, untimed (e.g. to make the second run cold as well).
+def measure(fn, setup=None):
+    if setup:
+        setup()
+    wait_for_background()
+    start = time.perf_counter()
+    result = fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    wait_for_background()
+    if setup:
+        setup()
+    wait_for_background()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    wait_for_background()
+    return result, elapsed_ms, peak / 1e6
+
+
+def warm_ms(fn, repeats=WARM_REPEATS):
+    wait_for_background()
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+# Function to point the app at the replayed API: no boxscore ingestion (not
+# part of the recording), trends from a boxscore source with no played games
+# and headshots that are placeholders instead of downloads
+def patch_app(clients):
+    import images
+    import ingest
+    import refresher
+    import trends
+
+    refresher.make_incremental_fetch = lambda ingestor, full_fetch=None: (
+        lambda season: fetch_season(season, clients=clients, retries=0))
+    trends.trend_store.ingestor = ingest.RoundIngestor(boxscore_api=FakeBoxScoreData(latest_round=0),
+                                                       standings_api=clients['standings'])
+
+    class OfflineImageCache(images.ImageCache):
+        def __init__(self, *args, **kwargs):
+            kwargs['download'] = lambda url: images.placeholder_png(images.HEADSHOT_WIDTH)
+            super().__init__(*args, **kwargs)
+    images.ImageCache = OfflineImageCache
+
+
+# Function to forget everything the app holds: Streamlit caches, the refresher
+# (and its thread) and the stored snapshots, so the next run starts cold
+def reset_app():
+    import streamlit as st
+
+    import app
+    from store import SNAPSHOT_DIR
+
+    try:
+        app.get_refresher().stop()
+    except Exception:
+        pass
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+
+def row(name, cold_ms=None, warm=None, peak_mb=None, calls=None):
+    return {'name': name, 'cold_ms': cold_ms, 'warm_ms': warm, 'peak_mb': peak_mb, 'api_calls': calls}
+
+
+# Function to benchmark get_api_data and the analytics functions without a browser
+def run_headless(clients, seasons):
+    import app
+    from analytics import (get_scoring_distribution, get_team_kpis, get_teams, get_top_players,
+                           get_top_players_pir, get_top_teams)
+    from leaderboards import snapshot_leaderboards
+    from partitions import snapshot_team_index
+    from rankings import snapshot_rankings
+
+    season = seasons[-1]
+    results = []
+    before = api_calls(clients)
+    _, cold, peak = measure(lambda: app.get_api_data(season), setup=reset_app)
+    calls = (api_calls(clients) - before) // 2
+    results.append(row('get_api_data (API)', cold, warm_ms(lambda: app.get_api_data(season)), peak, calls))
+
+    def restart():
+        app.get_refresher().stop()
+        import streamlit as st
+        st.cache_resource.clear()
+    before = api_calls(clients)
+    _, cold, peak = measure(lambda: app.get_api_data(season), setup=restart)
+    results.append(row('get_api_data (store)', cold, None, peak, (api_calls(clients) - before) // 2))
+
+    snapshot = app.get_snapshot(season)
+    standings, team_totals, _, players, _, _ = snapshot.as_tuple()
+    teams = list(get_teams(standings, team_totals, players))
+    team = teams[0]
+
+    # Each function as the page calls it; cold builds the snapshot's index it uses
+    calls = {
+        'get_team_kpis': lambda s: get_team_kpis(s.team_stats, team, snapshot_rankings(s)),
+        'get_top_teams': lambda s: get_top_teams(s.team_stats, snapshot_rankings(s)),
+        'get_top_players': lambda s: get_top_players(s.player_stats, team, 'pointsScored', 'Points',
+                                                     leaderboards=snapshot_leaderboards(s)),
+        'get_top_players_pir': lambda s: get_top_players_pir(s.player_stats, team,
+                                                             leaderboards=snapshot_leaderboards(s)),
+        'get_scoring_distribution': lambda s: get_scoring_distribution(s.player_stats, team,
+                                                                       snapshot_team_index(s, 'player_stats')),
+    }
+    for name, call in calls.items():
+        fresh = []
+        _, cold, peak = measure(lambda: call(fresh[-1]),
+                                setup=lambda: fresh.append(type(snapshot)(snapshot.season, snapshot.round_number,
+                                                                          snapshot.frames)))
+        results.append(row(name, cold, warm_ms(lambda: call(snapshot)), peak))
+
+    # Every season in turn, as when browsing the season selector
+    before = api_calls(clients)
+    _, cold, peak = measure(lambda: [app.get_api_data(s) for s in seasons], setup=reset_app)
+    results.append(row(f'get_api_data x {len(seasons)} seasons', cold, None, peak,
+                       (api_calls(clients) - before) // 2))
+    return results
+
+
+# Function to benchmark full page runs through Streamlit's AppTest: a cold
+# start, a warm rerun and a team switch
+def run_page(clients):
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    results = []
+    pages = []
+
+    def cold_page():
+        pages.append(AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=300))
+        pages[-1].run()
+        if pages[-1].exception:
+            raise RuntimeError(f"The page failed: {[e.value for e in pages[-1].exception]}")
+
+    before = api_calls(clients)
+    _, cold, peak = measure(cold_page, setup=reset_app)
+    results.append(row('page', cold, warm_ms(lambda: pages[-1].run(), repeats=5), peak,
+                       (api_calls(clients) - before) // 2))
+
+    page = pages[-1]
+    options = page.selectbox(key='top_team_selectbox').options
+    switches = iter(range(1, 10_000))
+    results.append(row('page, team switch', None,
+                       warm_ms(lambda: page.selectbox(key='top_team_selectbox').select_index(
+                           next(switches) % len(options)).run(), repeats=5)))
+    return results
+
+
+def commit_id():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def format_value(value, unit):
+    return '-' if value is None else f"{value:.1f}{unit}" if unit else str(value)
+
+
+def print_results(results):
+    print(f"{'':34} {'cold':>10} {'warm':>10} {'peak':>10} {'API calls':>10}")
+    for result in results:
+        print(f"{result['name']:34} {format_value(result['cold_ms'], ' ms'):>10} "
+              f"{format_value(result['warm_ms'], ' ms'):>10} {format_value(result['peak_mb'], ' MB'):>10} "
+              f"{format_value(result['api_calls'], ''):>10}")
+
+
+def run(args):
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as synthetic:
+        if args.fixtures:
+            recording = Recording(args.fixtures, args.teams, args.players_per_team)
+        else:
+            record_synthetic(synthetic, [2024], args.teams or 18, args.players_per_team or 14)
+            recording = Recording(synthetic)
+        clients = replay_clients(recording, args.latency)
+        patch_app(clients)
+        seasons = list(range(2025 - args.seasons, 2025))
+
+        results = run_headless(clients, seasons)
+        if not args.no_page:
+            results += run_page(clients)
+        reset_app()
+
+    print_results(results)
+    report = {
+        'commit': commit_id(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key != 'command'},
+        'results': results,
+    }
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit']}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {path}")
+
+
+# Function to compare two saved runs metric by metric, flagging regressions
+def compare(args):
+    paths = args.runs or sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))[-2:]
+    if len(paths) != 2:
+        raise SystemExit("Need two saved runs to compare (run with --save first)")
+    old, new = [json.load(open(path)) for path in paths]
+    if old['config'] != new['config']:
+        print(f"note: the runs used different settings: {old['config']} vs {new['config']}")
+    print(f"{old['commit']} ({old['timestamp']}) -> {new['commit']} ({new['timestamp']})")
+    old_results = {result['name']: result for result in old['results']}
+    for result in new['results']:
+        before = old_results.get(result['name'])
+        if before is None:
+            continue
+        for metric, unit in [('cold_ms', 'ms'), ('warm_ms', 'ms'), ('peak_mb', 'MB'), ('api_calls', 'calls')]:
+            if before[metric] is None or result[metric] is None:
+                continue
+            change = (result[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            flag = '  REGRESSION' if change > REGRESSION_THRESHOLD else ''
+            print(f"{result['name']:34} {metric:9} {before[metric]:10.1f} -> {result[metric]:10.1f} {unit:5} "
+                  f"{change:+7.1%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks of the dashboard on replayed API responses')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='record API responses to replay')
+    record.add_argument('--out', required=True)
+    record.add_argument('--seasons', type=int, nargs='+', default=[2024])
+    record.add_argument('--synthetic', action='store_true', help='fake responses instead of the live API')
+    record.add_argument('--teams', type=int, default=18)
+    record.add_argument('--players-per-team', type=int, default=14)
+
+    bench = commands.add_parser('run', help='run the benchmarks')
+    bench.add_argument('--fixtures', help='recorded responses (default: synthetic ones)')
+    bench.add_argument('--teams', type=int, help='scale every season to this many teams')
+    bench.add_argument('--players-per-team', type=int, help='scale every team to this many players')
+    bench.add_argument('--seasons', type=int, default=3, help='seasons to replay')
+    bench.add_argument('--latency', type=float, default=0.05, help='seconds per API call')
+    bench.add_argument('--no-page', action='store_true', help='skip the AppTest page runs')
+    bench.add_argument('--save', action='store_true', help=f'save the results under {RESULTS_DIR}')
+
+    diff = commands.add_parser('compare', help='compare two saved runs')
+    diff.add_argument('runs', nargs='*', help='OLD.json NEW.json (default: the last two saved)')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        if args.synthetic:
+            record_synthetic(args.out, args.seasons, args.teams, args.players_per_team)
+        else:
+            record_live(args.out, args.seasons)
+    elif args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    main()
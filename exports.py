@@ -0,0 +1,318 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+from rankings import snapshot_rankings
+from similarity import KEY_COLUMNS
+from store import DATA_DIR, SnapshotStore
+from timing import count, timed
+
+logger = logging.getLogger(__name__)
+
+# Where exports are kept; one directory per season and snapshot version
+EXPORT_DIR = os.path.join(DATA_DIR, 'exports')
+
+# Rows built, converted and written at a time (one Parquet row group each),
+# so an export never holds its whole table, in any format
+CHUNK_ROWS = 10_000
+
+# Bytes read at a time when streaming an export
+STREAM_BYTES = 64 * 1024
+
+# Snapshot versions whose exports are kept per season
+KEEP_VERSIONS = 2
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+# Function to require one of a snapshot's frames
+def require(snapshot, name):
+    data = getattr(snapshot, name)
+    if data is None:
+        raise ExportUnavailable(f"{name} of season {snapshot.season} could not be fetched")
+    return data
+
+
+def chunks(frame):
+    for start in range(0, max(len(frame), 1), CHUNK_ROWS):
+        yield frame.iloc[start:start + CHUNK_ROWS]
+
+
+# Export tables are iterators of CHUNK_ROWS row chunks; the writers take them in turn
+
+def standings_export(snapshot):
+    return chunks(require(snapshot, 'standings').sort_values('position', ignore_index=True))
+
+
+# Every team's stats with its rank on each ranked KPI next to them (pointsScored_Ranking, ...)
+def team_kpis_export(snapshot):
+    team_stats = require(snapshot, 'team_stats').reset_index(drop=True)
+    ranks = snapshot_rankings(snapshot).ranks.add_suffix('_Ranking').reset_index(drop=True)
+    return chunks(pd.concat([team_stats, ranks], axis=1))
+
+
+# Every player's traditional stats joined with the advanced stats the traditional
+# table doesn't have, one slice of players at a time. Advanced rows are looked
+# up by position, so no merged or re-indexed copy of either frame is made.
+def players_export(snapshot):
+    player_stats = require(snapshot, 'player_stats')
+    advanced = snapshot.advanced_player_stats
+    if advanced is None:
+        return chunks(player_stats.reset_index(drop=True))
+    columns = [column for column in advanced if column not in KEY_COLUMNS and column not in player_stats]
+    keys = advanced[KEY_COLUMNS]
+    first = np.flatnonzero(~keys.duplicated().to_numpy())
+    lookup = pd.MultiIndex.from_frame(keys.iloc[first])
+    # Players without advanced stats get NaN: integer columns are float in
+    # every slice, as in a merge of the whole table
+    missing = any((lookup.get_indexer(pd.MultiIndex.from_frame(chunk[KEY_COLUMNS])) < 0).any()
+                  for chunk in chunks(player_stats))
+
+    def merged(chunk):
+        found = lookup.get_indexer(pd.MultiIndex.from_frame(chunk[KEY_COLUMNS]))
+        rows = advanced.iloc[first[np.where(found >= 0, found, 0)]][columns].reset_index(drop=True)
+        if missing:
+            rows = rows.where(pd.Series(found >= 0), axis=0)
+            rows = rows.astype({column: 'float64' for column in columns if pd.api.types.is_integer_dtype(rows[column])})
+        return pd.concat([chunk.reset_index(drop=True), rows], axis=1)
+    return (merged(chunk) for chunk in chunks(player_stats))
+
+
+EXPORT_TABLES = {'standings': standings_export, 'team_kpis': team_kpis_export, 'players': players_export}
+
+
+# Function to store object columns pyarrow can't type (mixed values from the JSON payloads) as strings
+def stringify_mixed(frame):
+    frame = frame.copy()
+    for column in frame.columns[frame.dtypes == object]:
+        frame[column] = frame[column].map(lambda value: value if value is None else str(value))
+    return frame
+
+
+def write_csv(frames, file):
+    for number, chunk in enumerate(frames):
+        chunk.to_csv(file, index=False, header=number == 0, encoding='utf-8')
+
+
+# One row group per chunk. The schema is the first chunk's, with object
+# columns (mixed values from the JSON payloads) stored as strings in every chunk
+def write_parquet(frames, file):
+    writer = None
+    try:
+        for chunk in frames:
+            mixed = chunk.columns[chunk.dtypes == object]
+            if len(mixed):
+                chunk = stringify_mixed(chunk)
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                for column in mixed:
+                    index = schema.get_field_index(str(column))
+                    schema = schema.set(index, pa.field(str(column), pa.string()))
+                writer = pq.ParquetWriter(file, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# A write-only workbook keeps the rows it was given in a temporary file, not in memory
+def write_xlsx(frames, file, title='export'):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    for number, chunk in enumerate(frames):
+        if number == 0:
+            sheet.append([str(column) for column in chunk.columns])
+        values = chunk.astype(object)
+        for row in values.where(chunk.notna(), None).to_numpy().tolist():
+            sheet.append([value if value is None or isinstance(value, (int, float, str)) else str(value)
+                          for value in row])
+    workbook.save(file)
+
+
+EXPORT_WRITERS = {'csv': write_csv, 'parquet': write_parquet, 'xlsx': write_xlsx}
+
+
+class ExportCache:
+    # Exports of the seasons in the store, written once per snapshot version:
+    #
+    #   exports/season=2024/2024-r20-20250301120000/players.xlsx
+    #
+    # Only the store's (cheap) manifest is read to find the version, so
+    # downloading the same round again is just streaming the file. A new
+    # snapshot gets a new version, and older versions are pruned.
+
+    def __init__(self, store=None, root=EXPORT_DIR, keep_versions=KEEP_VERSIONS):
+        self.store = store if store is not None else SnapshotStore()
+        self.root = root
+        self.keep_versions = keep_versions
+        self._locks = {}
+        self._writing = set()
+        self._lock = threading.Lock()
+
+    def season_dir(self, season):
+        return os.path.join(self.root, f'season={season}')
+
+    def path(self, season, version, table, fmt):
+        return os.path.join(self.season_dir(season), version, f'{table}.{fmt}')
+
+    # Function to get the snapshot version exports of a season are taken from (None if not stored)
+    def version(self, season):
+        manifest = self.store.latest_manifest(season)
+        if manifest is None:
+            return None
+        return f"{manifest['season']}-r{manifest['round_number']}-{manifest['version']}"
+
+    # Function to get the path of an export, writing it the first time a version is asked for
+    def get(self, season, table, fmt):
+        if table not in EXPORT_TABLES or fmt not in EXPORT_WRITERS:
+            raise KeyError(f"unknown export {table}.{fmt}")
+        version = self.version(season)
+        if version is None:
+            raise ExportUnavailable(f"season {season} is not stored")
+        path = self.path(season, version, table, fmt)
+        if os.path.exists(path):
+            count('cache_requests', cache='exports', result='hit')
+            return path
+
+        with self._lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        # Once written, later requests find the file before needing the lock
+        with lock, self._forgetting(path):
+            if os.path.exists(path):
+                count('cache_requests', cache='exports', result='hit')
+                return path
+            count('cache_requests', cache='exports', result='miss')
+            # Every column, not only the ones the dashboard shows
+            snapshot = self.store.load(season)
+            if snapshot is None:
+                raise ExportUnavailable(f"season {season} is not stored")
+            # A newer snapshot may have been stored since the manifest was read
+            path = self.path(season, snapshot.version, table, fmt)
+            with timed(f'export {fmt}'):
+                self._write(path, EXPORT_TABLES[table](snapshot), fmt, table)
+        self._prune(season)
+        logger.info("Exported %s of season %s (%s) as %s", table, season, snapshot.version, fmt)
+        return path
+
+    # Function to check whether an export of the season's current version is already written
+    def is_written(self, season, table, fmt):
+        version = self.version(season)
+        return version is not None and os.path.exists(self.path(season, version, table, fmt))
+
+    # Function to write an export from a background thread, so a slow one
+    # (e.g. every player as Excel) is ready by the time it is downloaded
+    def write_async(self, season, table, fmt):
+        key = (season, table, fmt)
+        with self._lock:
+            if key in self._writing:
+                return
+            self._writing.add(key)
+
+        def write():
+            try:
+                self.get(season, table, fmt)
+            except Exception:
+                logger.exception("Export of %s (season %s) as %s failed", table, season, fmt)
+            finally:
+                with self._lock:
+                    self._writing.discard(key)
+
+        threading.Thread(target=write, name=f'export-{season}-{table}-{fmt}', daemon=True).start()
+
+    @contextmanager
+    def _forgetting(self, path):
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._locks.pop(path, None)
+
+    def _write(self, path, frames, fmt, table):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp_path, 'wb') as file:
+                if fmt == 'xlsx':
+                    write_xlsx(frames, file, title=table)
+                else:
+                    EXPORT_WRITERS[fmt](frames, file)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune(self, season):
+        season_dir = self.season_dir(season)
+        # Versions end with the fetch time, so they sort by round, then time
+        versions = sorted(os.listdir(season_dir),
+                          key=lambda version: (int(version.split('-r')[1].split('-')[0]), version))
+        for version in versions[:-self.keep_versions]:
+            shutil.rmtree(os.path.join(season_dir, version), ignore_errors=True)
+
+    # Function to read a whole export (what the dashboard's download button serves)
+    def read(self, season, table, fmt):
+        with open(self.get(season, table, fmt), 'rb') as file:
+            return file.read()
+
+    # Function to stream an export in STREAM_BYTES blocks
+    def stream(self, season, table, fmt):
+        with open(self.get(season, table, fmt), 'rb') as file:
+            while True:
+                block = file.read(STREAM_BYTES)
+                if not block:
+                    return
+                yield block
+
+
+# Function to name the downloaded file of an export
+def file_name(season, table, fmt, version=None):
+    round_part = f"-{version.split('-')[1]}" if version else ''
+    return f"euroleague-{season}{round_part}-{table}.{fmt}"
+
+
+# Exports a stored season without the dashboard:
+#
+#   python exports.py --season 2024 --table players --format xlsx --out players.xlsx
+def main():
+    parser = argparse.ArgumentParser(description='Export a stored Euroleague season')
+    parser.add_argument('--season', type=int, required=True)
+    parser.add_argument('--table', choices=list(EXPORT_TABLES), required=True)
+    parser.add_argument('--format', choices=list(EXPORT_WRITERS), default='csv')
+    parser.add_argument('--out', help='file to write (default: stdout)')
+    args = parser.parse_args()
+
+    cache = ExportCache()
+    try:
+        blocks = cache.stream(args.season, args.table, args.format)
+        if args.out is None:
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+        else:
+            with open(args.out, 'wb') as file:
+                for block in blocks:
+                    file.write(block)
+    except ExportUnavailable as exc:
+        parser.error(str(exc))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from euroleague_api.standings import Standings
+from euroleague_api.player_stats import PlayerStats
+from euroleague_api.team_stats import TeamStats
+
+from rounds import find_latest_round
+from timing import count, timed
+
+# Seconds each endpoint gets, retries included
+FETCH_TIMEOUT = 60
+FETCH_RETRIES = 2
+# First retry waits this long, then it doubles
+FETCH_BACKOFF = 0.5
+
+# The season datasets next to the standings: name -> (client, endpoint, statistic mode)
+SEASON_DATASETS = {
+    'team_stats': ('team', 'traditional', 'PerGame'),
+    'advanced_team_stats': ('team', 'advanced', 'Accumulated'),
+    'player_stats': ('player', 'traditional', 'PerGame'),
+    'advanced_player_stats': ('player', 'advanced', 'Accumulated'),
+}
+
+# Shared pool; a call that times out keeps its worker until requests gives up
+_executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix='euroleague-fetch')
+
+
+# Function to call fn, retrying failures with exponential backoff until the deadline
+def call_with_retry(fn, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, deadline=None):
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception:
+            delay = backoff * 2 ** attempt
+            out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+            if attempt >= retries or out_of_time:
+                raise
+            time.sleep(delay)
+            attempt += 1
+
+
+# Function to run independent calls concurrently.
+# calls maps a name to a zero-argument callable. Returns (results, errors):
+# a failing or timed out call only lands in errors, the others still return.
+def fetch_concurrently(calls, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    deadline = time.monotonic() + timeout
+    futures = {
+        name: _executor.submit(call_with_retry, fn, retries, backoff, deadline)
+        for name, fn in calls.items()
+    }
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            errors[name] = TimeoutError(f"{name} did not answer within {timeout}s")
+        except Exception as exc:
+            errors[name] = exc
+    return results, errors
+
+
+# Function to build the zero-argument call for one of SEASON_DATASETS
+def dataset_call(clients, name, season):
+    client, endpoint, statistic_mode = SEASON_DATASETS[name]
+    if client == 'team':
+        return lambda: clients['team'].get_team_stats_single_season(
+            endpoint=endpoint,
+            season=season,
+            phase_type_code='RS',
+            statistic_mode=statistic_mode
+        )
+    return lambda: clients['player'].get_player_stats_single_season(
+        endpoint=endpoint,
+        season=season,
+        phase_type_code='RS',
+        statistic_mode=statistic_mode
+    )
+
+
+# Function to check the latest played round only (one request when nothing new was played)
+def latest_round(season, standings_api=None):
+    round_number, _ = find_latest_round(standings_api or Standings(), season, refetch=False)
+    return round_number
+
+
+# Function to fetch everything the dashboard needs for a season in parallel.
+# Returns a dict with the round number, one frame per dataset (None when that
+# endpoint failed) and the errors keyed by dataset name.
+def fetch_season(season, clients=None, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    if clients is None:
+        clients = {'standings': Standings(), 'team': TeamStats(), 'player': PlayerStats()}
+
+    # Round discovery doesn't depend on the stats calls, so it runs alongside them
+    calls = {'standings': lambda: find_latest_round(clients['standings'], season)}
+    for name in SEASON_DATASETS:
+        calls[name] = dataset_call(clients, name, season)
+    # Every attempt is timed per endpoint, so slow upstreams show up in the metrics
+    calls = {name: timed(f'fetch {name}')(call) for name, call in calls.items()}
+
+    results, errors = fetch_concurrently(calls, timeout=timeout, retries=retries, backoff=backoff)
+    for name in errors:
+        count('fetch_errors', endpoint=name)
+
+    round_number, standings = results.pop('standings', (None, None))
+    season_data = {'round_number': round_number, 'standings': standings, 'errors': errors}
+    for name in SEASON_DATASETS:
+        season_data[name] = results.get(name)
+    return season_data
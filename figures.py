@@ -0,0 +1,322 @@
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+
+from analytics import get_scoring_distribution, get_shot_distribution, get_team_kpis, get_teams
+from leaderboards import snapshot_leaderboards
+from partitions import snapshot_team_index
+from rankings import snapshot_rankings
+from timing import count, timed
+from trends import TREND_WINDOW, snapshot_trends
+
+logger = logging.getLogger(__name__)
+
+# Figures kept across snapshots; 9 charts x 18 teams is ~160 per snapshot
+MAX_CACHED_FIGURES = 500
+
+# Build every team's charts in the background whenever a new snapshot is published
+WARM_AFTER_REFRESH = True
+
+
+# Every chart builder takes (snapshot, team) and returns a Plotly figure, or
+# None when the data it needs could not be fetched
+
+def scoring_distribution_figure(snapshot, selected_team):
+    if snapshot.player_stats is None:
+        return None
+    # Get scoring distribution for selected team from team totals
+    scoring_distribution_team_totals = get_scoring_distribution(snapshot.player_stats, selected_team,
+                                                                 snapshot_team_index(snapshot, 'player_stats'))
+
+    # Create a Plotly bar chart
+    fig = px.bar(
+        scoring_distribution_team_totals,
+        x='player.name',
+        y='Percentage of Total Points',
+        title=f'Scoring Distribution for Team: {selected_team}',
+        labels={'player.name': 'Player', 'Percentage of Total Points': 'Percentage of Total Points'},
+        color_discrete_sequence=['#32612D']
+    )
+
+    # Update layout
+    fig.update_layout(
+        xaxis_title='',  # Hide x-axis title
+        showlegend=False,  # Hide legend
+        xaxis_tickangle=-45,  # Rotate x-axis labels for better readability
+        plot_bgcolor='#fbf7f5',  # Set background color
+        height=400,  # Set a maximum height
+    )
+
+    fig.update_traces(textposition='outside', width=0.5)
+    return fig
+
+
+def points_figure(snapshot, selected_team):
+    team_standings_df, team_totals = snapshot.standings, snapshot.team_stats
+    if team_standings_df is None or team_totals is None:
+        return None
+    team_kpis = get_team_kpis(team_totals, selected_team, snapshot_rankings(snapshot))
+
+    # Filter the DataFrame for the selected team
+    selected_team_data = team_standings_df[team_standings_df['club.tvCode'] == selected_team]
+
+    # Calculate the average for 'pointsFor' and 'pointsAgainst'
+    avg_points_for = team_kpis['pointsScored']
+    avg_points_against = selected_team_data['pointsAgainst'].sum() / selected_team_data['gamesPlayed'].sum()
+
+    # Combine the average points for and against into a DataFrame
+    avg_data = pd.DataFrame({
+        'Metric': ['Average Points Scored', 'Average Points Conceded'],
+        'Value': [avg_points_for, avg_points_against]
+    })
+
+    # Set colors for the bars
+    colors = ['#32612D', '#FF0000']
+
+    fig2 = px.bar(
+        avg_data,
+        x='Metric',
+        y='Value',
+        title=f'Average Points SCORED vs CONCEDED for Team: {selected_team}',
+        color='Metric',
+        color_discrete_sequence=colors,
+        labels={'Metric': 'Metrics', 'Value': 'Average Points'},  # Added label for Metric
+        text='Value'  # Display the average points as text on the bars
+    )
+
+    # Update layout to customize appearance
+    fig2.update_layout(
+        xaxis_title='',  # Hide x-axis title
+        yaxis_title='Average Points',  # Y-axis title
+        plot_bgcolor='#fbf7f5',  # Set background color
+        height=500,  # Increase height for more space (adjust as needed)
+        showlegend=False,  # Hide legend
+        margin=dict(t=60, b=20, l=40, r=20)  # Add margin to the plot
+    )
+
+    # Update the text position above the bars
+    fig2.update_traces(
+        textposition='outside',  # Position text above bars
+        width=0.2,
+        textfont_size=16,
+        textfont_color='#232b2b'  # Set text color to black
+    )
+    return fig2
+
+
+def shot_distribution_figure(snapshot, selected_team):
+    if snapshot.advanced_team_stats is None:
+        return None
+    euroleague_colors = ['#6BAF85', '#E7A86D', '#7A6A9D']
+
+    # Extract the percentages for two-pointers, three-pointers, and free throws
+    shot_distribution = get_shot_distribution(snapshot.advanced_team_stats, selected_team)
+
+    # Create a donut chart using the actual values from the data
+    fig3 = px.pie(
+        names=list(shot_distribution),
+        values=list(shot_distribution.values()),
+        title=f'Shot Distribution for {selected_team}',
+        color_discrete_sequence=euroleague_colors,
+        hole=0.5  # Set the hole size for the donut chart
+    )
+
+    # Update traces for text properties
+    fig3.update_traces(
+        textfont_size=14,  # Set text size to 16
+        textfont_color='#232b2b',  # Set text color to #232b2b
+        textinfo='percent+label'  # Display percentage and label
+    )
+
+    # Hide the legend if not needed
+    fig3.update_layout(showlegend=False)
+    return fig3
+
+
+# Function to build a pie chart of a team's highest attempt rates on one stat
+def attempt_rate_figure(snapshot, selected_team, stat, title, colors):
+    if snapshot.advanced_player_stats is None:
+        return None
+    top_players = snapshot_leaderboards(snapshot, 'advanced_player_stats').top(selected_team, stat)
+
+    fig = px.pie(
+        top_players,
+        names='player.name',
+        values=stat,
+        title=title,
+        color_discrete_sequence=colors
+    )
+    fig.update_traces(
+        textinfo='value+label',
+        textfont_size=10,  # Make label text smaller
+        textfont_color='#232b2b'
+    )
+    fig.update_layout(
+        showlegend=False,  # Remove legend
+        paper_bgcolor='#f5f1f1',  # Set a light background color for the entire figure
+        plot_bgcolor='#f5f1f1',  # Set the same or a slightly different color for the plotting area
+        title_font=dict(color='#232b2b')
+    )
+    return fig
+
+
+# Function to get one team's rows of a season's team trends, in round order
+def team_trend(snapshot, selected_team):
+    teams = snapshot_trends(snapshot, 'teams')
+    if teams is None:
+        return None
+    team = teams[teams['team.tvCodes'] == selected_team]
+    return None if team.empty else team
+
+
+# Function to build a line chart of rolling metrics over the rounds of a season
+def trend_figure(frame, metrics, title, y_title, colors):
+    fig = px.line(
+        frame,
+        x='Round',
+        y=list(metrics),
+        title=title,
+        markers=True,
+        color_discrete_sequence=colors
+    )
+    fig.for_each_trace(lambda trace: trace.update(name=metrics[trace.name]))
+    fig.update_layout(
+        xaxis_title='Round',
+        yaxis_title=y_title,
+        legend_title_text='',
+        plot_bgcolor='#fbf7f5',
+        height=400,
+    )
+    return fig
+
+
+def points_trend_figure(snapshot, selected_team):
+    team = team_trend(snapshot, selected_team)
+    if team is None:
+        return None
+    return trend_figure(team, {'rolling.points': 'Scored', 'rolling.pointsAgainst': 'Conceded'},
+                        f'Points Scored vs Conceded, Last {TREND_WINDOW} Games: {selected_team}', 'Average Points',
+                        ['#32612D', '#FF0000'])
+
+
+def shooting_trend_figure(snapshot, selected_team):
+    team = team_trend(snapshot, selected_team)
+    if team is None:
+        return None
+    return trend_figure(team, {'rolling.twoPointersPercentage': '2PT %', 'rolling.threePointersPercentage': '3PT %',
+                               'rolling.freeThrowsPercentage': 'FT %'},
+                        f'Shooting, Last {TREND_WINDOW} Games: {selected_team}', 'Percentage',
+                        ['#6BAF85', '#E7A86D', '#7A6A9D'])
+
+
+# Function to chart the rolling PIR of a team's three highest PIR contributors this season
+def pir_trend_figure(snapshot, selected_team):
+    players = snapshot_trends(snapshot, 'players')
+    if players is None:
+        return None
+    team_players = players[players['player.team.tvCodes'] == selected_team]
+    if team_players.empty:
+        return None
+    leaders = team_players.groupby('player.code', observed=True)['pir'].sum().nlargest(3).index
+    leaders_games = team_players[team_players['player.code'].isin(leaders)]
+
+    fig = px.line(
+        leaders_games,
+        x='Round',
+        y='rolling.pir',
+        color='player.name',
+        title=f'PIR of the Top 3 Players, Last {TREND_WINDOW} Games: {selected_team}',
+        labels={'rolling.pir': 'Average PIR', 'player.name': ''},
+        markers=True,
+        color_discrete_sequence=['#4C7A5C', '#D68A3D', '#6A5ACD']
+    )
+    fig.update_layout(plot_bgcolor='#fbf7f5', height=400)
+    return fig
+
+
+# Chart name -> builder, in the order the chart section shows them
+FIGURE_BUILDERS = {
+    'scoring_distribution': scoring_distribution_figure,
+    'points': points_figure,
+    'shot_distribution': shot_distribution_figure,
+    # Rolling trends from the ingested boxscores, each shown next to the chart above
+    'pir_trend': pir_trend_figure,
+    'points_trend': points_trend_figure,
+    'shooting_trend': shooting_trend_figure,
+    # Custom colors for Top 3-Point, 2-Point and Free-Throw Makers
+    'three_point_attempts': lambda snapshot, team: attempt_rate_figure(
+        snapshot, team, 'threePointAttemptsRatio', 'Top 3-Point Makers (%)', ['#4C7A5C', '#6BAF85', '#A2D3A4']),
+    'two_point_attempts': lambda snapshot, team: attempt_rate_figure(
+        snapshot, team, 'twoPointAttemptsRatio', 'Top 2-Point Makers (%)', ['#D68A3D', '#E7A86D', '#F0B89C']),
+    'free_throw_attempts': lambda snapshot, team: attempt_rate_figure(
+        snapshot, team, 'freeThrowsRate', 'Top Free-Throw Makers (%)', ['#6A5ACD', '#7A6A9D', '#BFA5D8']),
+}
+
+
+class FigureCache:
+    # Built figures keyed by (snapshot version, team, chart), least recently
+    # used evicted first. The version changes with the season, the round and
+    # every refresh, so a new snapshot never gets an old figure.
+    #
+    # The Figure objects themselves are kept rather than their JSON: Streamlit
+    # validates a figure given as a dict all over again, but only serializes a
+    # Figure. Cached figures are shared, so they must not be modified.
+
+    def __init__(self, max_figures=MAX_CACHED_FIGURES, builders=FIGURE_BUILDERS):
+        self.max_figures = max_figures
+        self.builders = builders
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._figures)
+
+    # Function to get a chart of a team, building it on a miss
+    def get(self, snapshot, team, chart):
+        key = (snapshot.version, team, chart)
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                count('cache_requests', cache='figures', result='hit')
+                self._figures.move_to_end(key)
+                return self._figures[key]
+            self.misses += 1
+            count('cache_requests', cache='figures', result='miss')
+
+        with timed('figure build'):
+            figure = self.builders[chart](snapshot, team)
+        if figure is None:
+            # Nothing to chart (e.g. frames still missing): build again next time
+            return figure
+
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_figures:
+                self._figures.popitem(last=False)
+                self.evictions += 1
+                count('cache_evictions', cache='figures')
+        return figure
+
+    # Function to build every chart of every team of a snapshot, so the first
+    # visitor of each team already gets cached figures
+    def warm(self, snapshot):
+        if snapshot.standings is None and snapshot.team_stats is None and snapshot.player_stats is None:
+            return
+        teams = get_teams(snapshot.standings, snapshot.team_stats, snapshot.player_stats)
+        for team in teams:
+            for chart in self.builders:
+                try:
+                    self.get(snapshot, team, chart)
+                except Exception:
+                    logger.exception("Could not build the %s chart of %s", chart, team)
+
+    def warm_async(self, snapshot):
+        threading.Thread(target=self.warm, args=(snapshot,), name=f'warm-figures-{snapshot.season}',
+                         daemon=True).start()
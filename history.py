@@ -0,0 +1,88 @@
+import argparse
+import logging
+import time
+from datetime import date, datetime
+
+from fetcher import fetch_season
+from snapshot import Snapshot
+from store import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# First season euroleague-api has standings and stats for
+FIRST_SEASON = 2000
+
+# A season is the current one from this (month, day) of its first year
+SEASON_STARTS = (9, 1)
+
+
+def current_season(today=None):
+    today = today or date.today()
+    return today.year if (today.month, today.day) >= SEASON_STARTS else today.year - 1
+
+
+# Function to list every season euroleague-api offers, newest first
+def available_seasons(today=None):
+    return list(range(current_season(today), FIRST_SEASON - 1, -1))
+
+
+# Function to format a season for display: 2024 -> '2024-25'
+def season_label(season):
+    return f'{season}-{(season + 1) % 100:02d}'
+
+
+# Function to check from its manifest alone whether a season is stored for good
+def is_stored_final(store, season):
+    manifest = store.latest_manifest(season)
+    if manifest is None:
+        return False
+    snapshot = Snapshot(season, manifest['round_number'], {},
+                        fetched_at=datetime.fromisoformat(manifest['fetched_at']), errors=manifest['errors'])
+    return snapshot.is_final()
+
+
+# Function to fetch and store every season that isn't stored for good yet.
+# Seasons already final in the store are skipped, so an interrupted backfill
+# picks up where it stopped. Returns the stored, skipped and failed seasons.
+def backfill(store, seasons, fetch=fetch_season):
+    result = {'stored': [], 'skipped': [], 'failed': []}
+    for season in seasons:
+        if is_stored_final(store, season):
+            result['skipped'].append(season)
+            continue
+        start = time.perf_counter()
+        try:
+            snapshot = Snapshot.from_season_data(season, fetch(season))
+        except Exception:
+            logger.exception("Could not fetch season %s", season)
+            result['failed'].append(season)
+            continue
+        if snapshot.is_empty():
+            logger.error("euroleague-api returned nothing for season %s: %s", season, snapshot.errors)
+            result['failed'].append(season)
+            continue
+        store.save(snapshot)
+        result['stored'].append(season)
+        logger.info("Stored season %s (round %s) in %.2fs", season, snapshot.round_number,
+                    time.perf_counter() - start)
+    return result
+
+
+# One-off bulk load of the historical store (run again to retry failures):
+#
+#   python history.py                      every season euroleague-api offers
+#   python history.py --from 2015 --to 2020
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the snapshot store with past Euroleague seasons')
+    parser.add_argument('--from', dest='first', type=int, default=FIRST_SEASON)
+    parser.add_argument('--to', dest='last', type=int, default=current_season())
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    result = backfill(SnapshotStore(), range(args.last, args.first - 1, -1))
+    logger.info("Stored %d seasons, %d already stored, failed: %s", len(result['stored']),
+                len(result['skipped']), result['failed'] or 'none')
+
+
+if __name__ == '__main__':
+    main()
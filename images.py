@@ -0,0 +1,173 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image, ImageDraw
+
+from store import DATA_DIR
+from timing import count, timed
+
+logger = logging.getLogger(__name__)
+
+# Where resized headshots are kept; one PNG per image URL
+IMAGE_DIR = os.path.join(DATA_DIR, 'images')
+
+# Display widths used by the dashboard
+HEADSHOT_WIDTH = 130
+LOGO_WIDTH = 150
+
+# Least recently used headshots are deleted beyond this many
+MAX_CACHED_IMAGES = 2000
+
+DOWNLOAD_TIMEOUT = 10
+
+# A URL that failed to download is not retried for this long
+RETRY_FAILED_AFTER = 3600
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='headshots')
+
+
+# Function to resize an image to a display width (keeping its aspect ratio) as PNG bytes
+def resize_png(data, width):
+    image = Image.open(io.BytesIO(data))
+    image = image.convert('RGBA')
+    if image.width != width:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+# Function to draw the grey silhouette shown for players without a headshot
+def placeholder_png(width):
+    height = round(width * 1.25)
+    image = Image.new('RGBA', (width, height), (230, 230, 230, 255))
+    draw = ImageDraw.Draw(image)
+    head = width // 4
+    draw.ellipse([width // 2 - head, height // 4 - head, width // 2 + head, height // 4 + head], fill=(190, 190, 190, 255))
+    draw.ellipse([width // 8, height // 2, width - width // 8, height + height // 2], fill=(190, 190, 190, 255))
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def download_image(url):
+    response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+class ImageCache:
+    # Headshots downloaded once, resized to their display width and kept on
+    # disk as <sha1 of the URL>.png. Serving cached bytes lets Streamlit hand
+    # the browser the same media URL on every rerun instead of a remote one.
+    # A file's modification time is its last use, the oldest ones are evicted.
+
+    def __init__(self, root=IMAGE_DIR, width=HEADSHOT_WIDTH, max_images=MAX_CACHED_IMAGES, download=download_image):
+        self.root = root
+        self.width = width
+        self.max_images = max_images
+        self.download = download
+        self.placeholder = placeholder_png(width)
+        self._failed = {}
+        self._lock = threading.Lock()
+
+    def path(self, url):
+        return os.path.join(self.root, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.png')
+
+    # Function to get the cached PNG of an image URL, downloading it the first time;
+    # missing URLs and failed downloads get the placeholder
+    def get(self, url):
+        if not isinstance(url, str) or not url:
+            return self.placeholder
+        path = self.path(url)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)
+            count('cache_requests', cache='images', result='hit')
+            return data
+        except FileNotFoundError:
+            pass
+
+        count('cache_requests', cache='images', result='miss')
+        failed_at = self._failed.get(url)
+        if failed_at is not None and time.time() - failed_at < RETRY_FAILED_AFTER:
+            return self.placeholder
+        try:
+            with timed('image download'):
+                data = resize_png(self.download(url), self.width)
+        except Exception as exc:
+            logger.warning("Could not cache image %s: %s", url, exc)
+            self._failed[url] = time.time()
+            return self.placeholder
+        self._write(path, data)
+        return data
+
+    # Function to write an image atomically, then evict the least recently used ones
+    def _write(self, path, data):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("Could not store image %s", path)
+            return
+        self.evict()
+
+    def evict(self):
+        with self._lock:
+            entries = [entry for entry in os.scandir(self.root) if entry.name.endswith('.png')]
+            if len(entries) <= self.max_images:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_images]:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    # Function to download images in the background so they are cached before they are shown
+    def prefetch(self, urls):
+        urls = [url for url in set(urls) if isinstance(url, str) and not os.path.exists(self.path(url))]
+        for url in urls:
+            _prefetch_executor.submit(self.get, url)
+        return len(urls)
+
+
+# Function to load every team logo of a folder as PNG bytes resized to the display width.
+# Resized logos are kept under cache_dir (keyed by file, modification time and width),
+# so only a new or changed logo is decoded again after a restart.
+def load_logos(folder_path, width=LOGO_WIDTH, cache_dir=os.path.join(IMAGE_DIR, 'logos')):
+    logos = {}
+    for file_name in os.listdir(folder_path):
+        if not file_name.endswith(".png"):
+            continue
+        path = os.path.join(folder_path, file_name)
+        key = hashlib.sha1(f'{file_name}:{os.path.getmtime(path)}:{width}'.encode('utf-8')).hexdigest()
+        cached_path = os.path.join(cache_dir, f'{key}.png')
+        try:
+            with open(cached_path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            with open(path, 'rb') as file:
+                data = resize_png(file.read(), width)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f'{cached_path}.{uuid.uuid4().hex}.tmp'
+                with open(tmp_path, 'wb') as file:
+                    file.write(data)
+                os.replace(tmp_path, cached_path)
+            except OSError:
+                logger.warning("Could not store the resized logo %s", file_name)
+        logos[file_name.split(".")[0]] = data
+    return logos
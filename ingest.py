@@ -0,0 +1,421 @@
+import json
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from euroleague_api.boxscore_data import BoxScoreData
+from euroleague_api.player_stats import PlayerStats
+from euroleague_api.standings import Standings
+
+from fetcher import dataset_call, fetch_concurrently, fetch_season
+from rounds import find_latest_round
+from store import DATA_DIR, write_frame
+from timing import count, timed
+
+logger = logging.getLogger(__name__)
+
+ROUNDS_DIR = os.path.join(DATA_DIR, 'rounds')
+
+# Boxscore column -> stats API column, for the counting stats we aggregate
+BOXSCORE_COLUMNS = {
+    'Points': 'pointsScored',
+    'FieldGoalsMade2': 'twoPointersMade',
+    'FieldGoalsAttempted2': 'twoPointersAttempted',
+    'FieldGoalsMade3': 'threePointersMade',
+    'FieldGoalsAttempted3': 'threePointersAttempted',
+    'FreeThrowsMade': 'freeThrowsMade',
+    'FreeThrowsAttempted': 'freeThrowsAttempted',
+    'OffensiveRebounds': 'offensiveRebounds',
+    'DefensiveRebounds': 'defensiveRebounds',
+    'TotalRebounds': 'totalRebounds',
+    'Assistances': 'assists',
+    'Steals': 'steals',
+    'Turnovers': 'turnovers',
+    'BlocksFavour': 'blocks',
+    'BlocksAgainst': 'blocksAgainst',
+    'FoulsCommited': 'foulsCommited',
+    'FoulsReceived': 'foulsDrawn',
+    'Valuation': 'pir',
+}
+STAT_COLUMNS = list(BOXSCORE_COLUMNS.values())
+
+# Stats frames rebuilt from boxscores -> their key column. The last full fetch
+# of each is kept to fill in the columns boxscores don't carry.
+API_FRAMES = {
+    'team_stats': 'team.code',
+    'advanced_team_stats': 'team.code',
+    'player_stats': 'player.code',
+    'advanced_player_stats': 'player.code',
+}
+
+
+# Function to turn "MM:SS" boxscore minutes into float minutes (DNP -> 0)
+def parse_minutes(minutes):
+    parts = minutes.astype(str).str.extract(r'^\s*(\d+):(\d+)')
+    return (parts[0].astype(float) + parts[1].astype(float) / 60).fillna(0.0)
+
+
+# Function to match boxscore Player_IDs ("P003469 ") with stats API player codes
+def normalize_player_codes(codes):
+    return codes.astype(str).str.strip().str.upper().str.lstrip('P')
+
+
+# Function to compute ratios as percentages (52.3), the way normalized stats API frames hold them
+def percentages(numerator, denominator):
+    values = np.where(denominator > 0, numerator / denominator.where(denominator > 0, 1) * 100, 0.0)
+    return pd.Series(values.round(1), index=numerator.index, dtype='float32')
+
+
+# Function to clean raw boxscores (with a Round column) into per-player rows plus the team "Total" rows
+def clean_boxscore(boxscore):
+    rows = boxscore.rename(columns=BOXSCORE_COLUMNS)
+    rows['Player_ID'] = rows['Player_ID'].astype(str).str.strip()
+    rows['Team'] = rows['Team'].astype(str).str.strip()
+    rows['minutesPlayed'] = parse_minutes(rows['Minutes'])
+    rows[STAT_COLUMNS] = rows[STAT_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0).astype('float32')
+    keep = ['Season', 'Round', 'Gamecode', 'Home', 'Team', 'Player_ID', 'Player', 'minutesPlayed', *STAT_COLUMNS]
+    return rows[rows['Player_ID'] != 'Team'][keep]
+
+
+# Function to aggregate stored player rows into the traditional and advanced player frames
+def aggregate_players(rows, statistic_mode='PerGame'):
+    players = rows[rows['Player_ID'] != 'Total'].copy()
+    players['code'] = normalize_player_codes(players['Player_ID'])
+    players['played'] = (players['minutesPlayed'] > 0).astype('int16')
+
+    # Latest team and name per player (players can move mid season)
+    last = players.sort_values(['Round', 'Gamecode']).groupby('code').last()
+
+    grouped = players.groupby('code')
+    totals = grouped[STAT_COLUMNS + ['minutesPlayed']].sum().astype('float64')
+    games = grouped['played'].sum()
+
+    traditional = totals.copy()
+    if statistic_mode == 'PerGame':
+        traditional = traditional.div(games.where(games > 0, 1), axis=0).round(2)
+    traditional.insert(0, 'gamesPlayed', games)
+    traditional.insert(0, 'player.team.code', last['Team'])
+    traditional.insert(0, 'player.name', last['Player'])
+    traditional['twoPointersPercentage'] = percentages(totals['twoPointersMade'], totals['twoPointersAttempted'])
+    traditional['threePointersPercentage'] = percentages(totals['threePointersMade'], totals['threePointersAttempted'])
+    traditional['freeThrowsPercentage'] = percentages(totals['freeThrowsMade'], totals['freeThrowsAttempted'])
+
+    field_goals = totals['twoPointersAttempted'] + totals['threePointersAttempted']
+    advanced = pd.DataFrame({
+        'player.name': last['Player'],
+        'player.team.code': last['Team'],
+        'gamesPlayed': games,
+        'twoPointAttemptsRatio': percentages(totals['twoPointersAttempted'], field_goals),
+        'threePointAttemptsRatio': percentages(totals['threePointersAttempted'], field_goals),
+        'freeThrowsRate': percentages(totals['freeThrowsAttempted'], field_goals),
+    })
+    return traditional.rename_axis('player.code').reset_index(), advanced.rename_axis('player.code').reset_index()
+
+
+# Function to estimate possessions from team totals (FGA + 0.44 FTA - ORB + TOV)
+def possessions(totals):
+    return (totals['twoPointersAttempted'] + totals['threePointersAttempted'] + 0.44 * totals['freeThrowsAttempted']
+            - totals['offensiveRebounds'] + totals['turnovers'])
+
+
+# Function to take the per-game team "Total" rows, with possessions and the
+# opponent's points and possessions (pointsScoredAgainst, possessionsAgainst)
+def team_games(rows):
+    games = rows[rows['Player_ID'] == 'Total'].copy()
+    games['possessions'] = possessions(games)
+
+    # Each game's opponent is the other Total row of the same game
+    opponents = games[['Season', 'Gamecode', 'Home', 'pointsScored', 'possessions']].copy()
+    opponents['Home'] = 1 - opponents['Home']
+    return games.merge(opponents, on=['Season', 'Gamecode', 'Home'], suffixes=('', 'Against'))
+
+
+# Function to aggregate the per-game team "Total" rows into the traditional and advanced team frames
+def aggregate_teams(rows, statistic_mode='PerGame'):
+    game_rows = team_games(rows)
+
+    grouped = game_rows.groupby('Team')
+    totals = grouped[STAT_COLUMNS + ['pointsScoredAgainst', 'possessions', 'possessionsAgainst']].sum().astype('float64')
+    games = grouped.size()
+
+    traditional = totals[STAT_COLUMNS].copy()
+    if statistic_mode == 'PerGame':
+        traditional = traditional.div(games, axis=0).round(2)
+    traditional.insert(0, 'gamesPlayed', games)
+    traditional['twoPointersPercentage'] = percentages(totals['twoPointersMade'], totals['twoPointersAttempted'])
+    traditional['threePointersPercentage'] = percentages(totals['threePointersMade'], totals['threePointersAttempted'])
+    traditional['freeThrowsPercentage'] = percentages(totals['freeThrowsMade'], totals['freeThrowsAttempted'])
+
+    points = totals['pointsScored']
+    advanced = pd.DataFrame({
+        'gamesPlayed': games,
+        'pointsFromTwoPointersPercentage': percentages(2 * totals['twoPointersMade'], points),
+        'pointsFromThreePointersPercentage': percentages(3 * totals['threePointersMade'], points),
+        'pointsFromFreeThrowsPercentage': percentages(totals['freeThrowsMade'], points),
+        'possessions': totals['possessions'].round(1),
+        'offensiveRating': (100 * points / totals['possessions']).round(1),
+        'defensiveRating': (100 * totals['pointsScoredAgainst'] / totals['possessionsAgainst']).round(1),
+    })
+    return traditional.rename_axis('team.code').reset_index(), advanced.rename_axis('team.code').reset_index()
+
+
+# Function to add the columns of a full fetch's frame that a locally built frame
+# lacks (matched on key), in the full fetch's column order
+def with_api_columns(frame, api, key):
+    api = api.copy()
+    if key == 'player.code':
+        api[key] = normalize_player_codes(api[key])
+    api = api.drop_duplicates(subset=key).set_index(key)
+    missing = [column for column in api.columns if column not in frame.columns]
+    for column in missing:
+        frame[column] = frame[key].map(api[column])
+    order = [column for column in [key, *api.columns] if column in frame.columns]
+    return frame[order + [column for column in frame.columns if column not in order]]
+
+
+class RoundIngestor:
+    # Stores boxscore rows per season and round and rebuilds the season's
+    # player/team frames from them, fetching only games not ingested yet:
+    #
+    #   rounds/season=2024/round=12/boxscores.parquet
+    #   rounds/season=2024/ingest.json   <- ingested game codes, identities
+    #   rounds/season=2024/api=player_stats.parquet   <- stats API frames
+    #
+    # A season's first ingest backfills every played game; after that each
+    # refresh costs the schedule, the standings and one boxscore per new game.
+    # TV codes come from those standings; players never seen before (mid-season
+    # debuts) bring one player stats call for their names and images.
+
+    def __init__(self, root=ROUNDS_DIR, boxscore_api=None, standings_api=None, player_api=None):
+        self.root = root
+        self.boxscore_api = boxscore_api or BoxScoreData()
+        self.standings_api = standings_api or Standings()
+        self.player_api = player_api or PlayerStats()
+        self._lock = threading.Lock()
+        self._ingest_lock = threading.Lock()
+        self._backfilling = set()
+
+    def season_dir(self, season):
+        return os.path.join(self.root, f'season={season}')
+
+    def round_path(self, season, round_number):
+        return os.path.join(self.season_dir(season), f'round={round_number}', 'boxscores.parquet')
+
+    def manifest(self, season):
+        try:
+            with open(os.path.join(self.season_dir(season), 'ingest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, season, manifest):
+        path = os.path.join(self.season_dir(season), 'ingest.json')
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def has_season(self, season):
+        manifest = self.manifest(season)
+        return manifest is not None and manifest.get('complete_backfill', False)
+
+    def api_path(self, season, name):
+        return os.path.join(self.season_dir(season), f'api={name}.parquet')
+
+    # Function to remember names, images, TV codes and the stats API frames
+    # from a full stats fetch (or just some of them); boxscores don't carry them
+    def remember_identities(self, season, season_data):
+        os.makedirs(self.season_dir(season), exist_ok=True)
+        for name in API_FRAMES:
+            if season_data.get(name) is not None:
+                path = self.api_path(season, name)
+                tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+                write_frame(season_data[name], tmp_path)
+                os.replace(tmp_path, path)
+
+        manifest = self.manifest(season) or {'games': [], 'complete_backfill': False}
+        standings = season_data.get('standings')
+        if standings is not None and 'club.code' in standings:
+            manifest['tv_codes'] = dict(zip(standings['club.code'], standings['club.tvCode']))
+        players = season_data.get('player_stats')
+        if players is not None:
+            identity = players[['player.code', 'player.name', 'player.imageUrl']].copy()
+            identity['player.code'] = normalize_player_codes(identity['player.code'])
+            manifest['players'] = identity.drop_duplicates(subset='player.code').set_index('player.code').to_dict('index')
+        self._write_manifest(season, manifest)
+
+    # Function to find the players of some stored rounds that no identity
+    # call has seen yet (mid-season debuts)
+    def unknown_players(self, season, rounds):
+        rows = self.load_rows(season, rounds)
+        if rows is None:
+            return set()
+        manifest = self.manifest(season) or {}
+        codes = set(normalize_player_codes(rows.loc[~rows['Player_ID'].isin(['Total', 'Team']), 'Player_ID']))
+        return codes - set(manifest.get('players', {})) - set(manifest.get('seen_players', []))
+
+    # Function to fetch the names, images and stats API columns of the season's
+    # players with one player stats call. Codes it doesn't know either are
+    # remembered as seen, so they don't bring the call again.
+    def refresh_players(self, season, codes):
+        with timed('fetch player identities'):
+            players = dataset_call({'player': self.player_api}, 'player_stats', season)()
+        self.remember_identities(season, {'player_stats': players})
+        manifest = self.manifest(season)
+        manifest['seen_players'] = sorted(set(manifest.get('seen_players', [])) | set(codes))
+        self._write_manifest(season, manifest)
+
+    # Function to fetch and store the boxscores of played regular season games not ingested yet
+    def ingest(self, season):
+        with self._ingest_lock:
+            manifest = self.manifest(season) or {'games': [], 'complete_backfill': False}
+            schedule = self.boxscore_api.get_game_metadata_season(season)
+            played = schedule[(schedule['played']) & (schedule['round'] == 'RS')]
+            ingested = set(manifest['games'])
+            new_games = played[~played['gamenumber'].isin(ingested)]
+
+            calls = {
+                int(game.gamenumber): (lambda code=int(game.gamenumber):
+                                       self.boxscore_api.get_player_boxscore_stats_data(season, code))
+                for game in new_games.itertuples()
+            }
+            with timed('fetch boxscores'):
+                boxscores, errors = fetch_concurrently(calls)
+            for code, error in errors.items():
+                count('fetch_errors', endpoint='boxscores')
+                logger.warning("Boxscore of game %s (season %s) not ingested: %s", code, season, error)
+
+            round_of_game = dict(zip(new_games['gamenumber'], new_games['gameday']))
+            if boxscores:
+                new_rows = clean_boxscore(pd.concat(
+                    [boxscore.assign(Round=round_of_game[code]) for code, boxscore in boxscores.items()],
+                    ignore_index=True))
+                for round_number, round_rows in new_rows.groupby('Round'):
+                    self._append_round(season, int(round_number), round_rows)
+
+            manifest['games'] = sorted(ingested | set(boxscores))
+            manifest['complete_backfill'] = manifest['complete_backfill'] or not errors
+            os.makedirs(self.season_dir(season), exist_ok=True)
+            self._write_manifest(season, manifest)
+            return sorted(set(round_of_game[code] for code in boxscores)), errors
+
+    def _append_round(self, season, round_number, rows):
+        path = self.round_path(season, round_number)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            rows = pd.concat([pd.read_parquet(path), rows], ignore_index=True)
+        # A re-ingested game replaces its old rows
+        rows = rows.drop_duplicates(subset=['Gamecode', 'Team', 'Player_ID'], keep='last')
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        write_frame(rows, tmp_path)
+        os.replace(tmp_path, path)
+
+    # Function to read every stored round of a season (optionally only some rounds)
+    def load_rows(self, season, rounds=None):
+        season_dir = self.season_dir(season)
+        if not os.path.isdir(season_dir):
+            return None
+        paths = [os.path.join(season_dir, name, 'boxscores.parquet') for name in sorted(os.listdir(season_dir))
+                 if name.startswith('round=') and (rounds is None or int(name.split('=')[1]) in rounds)]
+        frames = [pd.read_parquet(path) for path in paths if os.path.exists(path)]
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+    # Function to rebuild the season frames (same shape as fetcher.fetch_season) from stored rounds
+    def build_season_data(self, season, round_number, standings, errors=None):
+        manifest = self.manifest(season) or {}
+        rows = self.load_rows(season)
+        season_data = {'round_number': round_number, 'standings': standings, 'errors': dict(errors or {})}
+        if rows is None:
+            for name in ['team_stats', 'advanced_team_stats', 'player_stats', 'advanced_player_stats']:
+                season_data[name] = None
+            return season_data
+
+        tv_codes = manifest.get('tv_codes', {})
+        players = pd.DataFrame.from_dict(manifest.get('players', {}), orient='index')
+
+        player_stats, advanced_player_stats = aggregate_players(rows, 'PerGame')
+        for frame in (player_stats, advanced_player_stats):
+            frame['player.team.tvCodes'] = frame['player.team.code'].map(tv_codes).fillna(frame['player.team.code'])
+            frame['player.imageUrl'] = None
+            if not players.empty:
+                # Official names and headshots from the last full fetch
+                known = frame['player.code'].map(players['player.name'])
+                frame['player.name'] = known.fillna(frame['player.name'])
+                frame['player.imageUrl'] = frame['player.code'].map(players['player.imageUrl'])
+
+        team_stats, advanced_team_stats = aggregate_teams(rows, 'PerGame')
+        for frame in (team_stats, advanced_team_stats):
+            frame['team.tvCodes'] = frame['team.code'].map(tv_codes).fillna(frame['team.code'])
+
+        season_data['team_stats'] = team_stats
+        season_data['advanced_team_stats'] = advanced_team_stats
+        season_data['player_stats'] = player_stats
+        season_data['advanced_player_stats'] = advanced_player_stats
+
+        # Columns only the stats API has, from the last full fetch (players
+        # from their latest identity call)
+        for name, key in API_FRAMES.items():
+            path = self.api_path(season, name)
+            if os.path.exists(path):
+                season_data[name] = with_api_columns(season_data[name], pd.read_parquet(path), key)
+        return season_data
+
+    # Function to refresh a season incrementally: new games only, aggregates rebuilt locally
+    def refresh(self, season):
+        errors = {}
+        round_number, standings = None, None
+        try:
+            round_number, standings = find_latest_round(self.standings_api, season)
+        except Exception as exc:
+            errors['standings'] = exc
+        new_rounds, game_errors = self.ingest(season)
+        errors.update({f'game {code}': error for code, error in game_errors.items()})
+
+        # The standings were fetched anyway: keep the TV codes current with them
+        if standings is not None:
+            self.remember_identities(season, {'standings': standings})
+        unknown = self.unknown_players(season, set(new_rounds)) if new_rounds else set()
+        if unknown:
+            try:
+                self.refresh_players(season, unknown)
+            except Exception as exc:
+                # Their boxscore names are shown until a later refresh gets it
+                count('fetch_errors', endpoint='player identities')
+                logger.warning("Identities of %d new players (season %s) not fetched: %s", len(unknown), season, exc)
+        return self.build_season_data(season, round_number, standings, errors)
+
+    def backfill_async(self, season):
+        with self._lock:
+            if season in self._backfilling:
+                return
+            self._backfilling.add(season)
+
+        def backfill():
+            try:
+                self.ingest(season)
+            except Exception:
+                logger.exception("Backfill of season %s failed", season)
+            finally:
+                with self._lock:
+                    self._backfilling.discard(season)
+
+        threading.Thread(target=backfill, name=f'backfill-{season}', daemon=True).start()
+
+
+# Function to build a refresher fetch that only downloads new games once a
+# season is backfilled. Until then it does a full (fast) fetch and backfills
+# the season's boxscores in the background.
+def make_incremental_fetch(ingestor, full_fetch=fetch_season):
+    def fetch(season):
+        if ingestor.has_season(season):
+            return ingestor.refresh(season)
+        season_data = full_fetch(season)
+        if season_data['player_stats'] is not None:
+            ingestor.remember_identities(season, season_data)
+        ingestor.backfill_async(season)
+        return season_data
+    return fetch
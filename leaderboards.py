@@ -0,0 +1,39 @@
+from partitions import PLAYER_TEAM_COLUMN, TeamIndex
+
+# Leaderboards built for every team, per player frame: stat -> how many players.
+# A stat added here is ready at render time without any extra work per rerun.
+LEADERBOARD_STATS = {
+    'player_stats': {'pointsScored': 5, 'totalRebounds': 5, 'assists': 5, 'steals': 5, 'pir': 3},
+    'advanced_player_stats': {'threePointAttemptsRatio': 7, 'twoPointAttemptsRatio': 7, 'freeThrowsRate': 7},
+}
+
+
+class Leaderboards:
+    # The top players of every team on every configured stat, keyed by
+    # (team, stat). Each stat is one vectorized pass over the whole frame:
+    # sort by team then stat (descending), keep the first N rows per team.
+    # Ties keep the frame's order, like DataFrame.nlargest.
+
+    def __init__(self, players_data, stats, team_column=PLAYER_TEAM_COLUMN):
+        self.stats = {stat: top_n for stat, top_n in stats.items() if stat in players_data}
+        self.boards = {}
+        for stat, top_n in self.stats.items():
+            ranked = players_data.dropna(subset=[stat]).sort_values([team_column, stat], ascending=[True, False],
+                                                                    kind='stable')
+            top = TeamIndex(ranked.groupby(team_column, observed=True, sort=False).head(top_n), team_column)
+            for team in top.teams():
+                self.boards[(team, stat)] = top.rows(team)
+        self._empty = players_data.iloc[0:0]
+
+    # Function to get a team's leaderboard on a stat (best first)
+    def top(self, team, stat):
+        return self.boards.get((team, stat), self._empty)
+
+
+# Function to get (building once) the leaderboards of one of a snapshot's player frames
+def snapshot_leaderboards(snapshot, frame_name='player_stats'):
+    frame = getattr(snapshot, frame_name)
+    if frame is None:
+        return None
+    return snapshot.derive(f'{frame_name}_leaderboards',
+                           lambda s: Leaderboards(frame, LEADERBOARD_STATS[frame_name]))
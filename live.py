@@ -0,0 +1,489 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import requests
+import xmltodict
+
+from ingest import BOXSCORE_COLUMNS, STAT_COLUMNS, clean_boxscore, normalize_player_codes, percentages
+from snapshot import Snapshot
+from timing import count, set_gauge, timed
+
+logger = logging.getLogger(__name__)
+
+# The endpoints euroleague-api's BoxScoreData reads the schedule and boxscores from
+SCHEDULE_URL = 'https://api-live.euroleague.net/v1/results'
+BOXSCORE_URL = 'https://live.euroleague.net/api/Boxscore'
+DOWNLOAD_TIMEOUT = 30
+
+# Live mode is on unless EUROLEAGUE_LIVE=0
+LIVE_MODE = os.environ.get('EUROLEAGUE_LIVE', '1') != '0'
+
+# Seconds between boxscore polls while games are in progress
+LIVE_POLL_SECONDS = 15
+
+# Seconds between schedule checks while games are in progress (to notice
+# postponed or extra games); when nothing is live the monitor sleeps until the
+# next tip-off, checking the schedule at least every IDLE_POLL_SECONDS
+SCHEDULE_POLL_SECONDS = 120
+IDLE_POLL_SECONDS = 15 * 60
+
+# A game is polled from PRE_GAME before its start time until GAME_WINDOW after it
+PRE_GAME = timedelta(minutes=10)
+GAME_WINDOW = timedelta(hours=3)
+
+# Start times in the schedule are local to the league office
+LIVE_TIMEZONE = ZoneInfo('Europe/Madrid')
+
+FORM_GAMES = 5
+
+# Percentage column -> (made, attempted) columns it is computed from
+PERCENT_COLUMNS = {
+    'twoPointersPercentage': ('twoPointersMade', 'twoPointersAttempted'),
+    'threePointersPercentage': ('threePointersMade', 'threePointersAttempted'),
+    'freeThrowsPercentage': ('freeThrowsMade', 'freeThrowsAttempted'),
+}
+
+
+class ConditionalClient:
+    # GETs that send back the ETag and Last-Modified of the previous response
+    # for the same URL, so a resource that hasn't changed costs a 304 and no
+    # body. Servers that send neither still get the body compared by hash, so
+    # an unchanged body is never parsed again.
+
+    def __init__(self, session=None, timeout=DOWNLOAD_TIMEOUT):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        # (url, params) -> validators and hash of the last body
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    # Function to get a resource; returns (body, changed), body is None when not modified
+    def get(self, url, params=None, endpoint='live'):
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            seen = self._seen.get(key)
+        headers = {}
+        if seen is not None:
+            if seen['etag']:
+                headers['If-None-Match'] = seen['etag']
+            if seen['last_modified']:
+                headers['If-Modified-Since'] = seen['last_modified']
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and seen is not None:
+            count('live_requests', endpoint=endpoint, result='not_modified')
+            return None, False
+        response.raise_for_status()
+        body = response.content
+        digest = hashlib.sha1(body).hexdigest()
+        changed = seen is None or seen['digest'] != digest
+        count('live_requests', endpoint=endpoint, result='changed' if changed else 'unchanged')
+        count('live_bytes', len(body), endpoint=endpoint)
+        with self._lock:
+            self._seen[key] = {'etag': response.headers.get('ETag'),
+                               'last_modified': response.headers.get('Last-Modified'), 'digest': digest}
+        return (body if changed else None), changed
+
+
+class LiveSource:
+    # The season schedule and live boxscores, each asked for conditionally;
+    # both return None while the resource hasn't changed since the last call
+
+    def __init__(self, competition='E', client=None):
+        self.competition = competition
+        self.client = client or ConditionalClient()
+
+    def schedule(self, season):
+        body, _ = self.client.get(SCHEDULE_URL, {'seasonCode': f'{self.competition}{season}'}, endpoint='schedule')
+        return None if body is None else parse_schedule(body)
+
+    def boxscore(self, season, gamecode):
+        body, _ = self.client.get(BOXSCORE_URL, {'gamecode': gamecode, 'seasoncode': f'{self.competition}{season}'},
+                                  endpoint='boxscore')
+        return None if body is None else json.loads(body)
+
+
+# Function to parse the results XML into the frame get_game_metadata_season
+# returns, with each game's start time (NaT when it can't be read)
+def parse_schedule(body):
+    games = xmltodict.parse(body)['results']['game']
+    schedule = pd.DataFrame(games if isinstance(games, list) else [games])
+    for column in ['gameday', 'gamenumber', 'homescore', 'awayscore']:
+        schedule[column] = pd.to_numeric(schedule[column], errors='coerce').fillna(0).astype(int)
+    schedule['played'] = schedule['played'].astype(str).str.lower() == 'true'
+    if 'date' in schedule:
+        local = pd.to_datetime(schedule['date'].astype(str) + ' ' + schedule.get('startime', '').fillna(''),
+                               errors='coerce', format='mixed')
+        schedule['start'] = local.dt.tz_localize(LIVE_TIMEZONE, ambiguous='NaT', nonexistent='NaT')
+    else:
+        schedule['start'] = pd.NaT
+    return schedule
+
+
+# Function to read a live Boxscore payload: both teams' codes and scores and whether the game is on
+def game_score(payload):
+    sides = []
+    for side in payload['Stats'][:2]:
+        players = side.get('PlayersStats') or []
+        team = str(players[0]['Team']).strip() if players else None
+        points = (side.get('totr') or {}).get('Points')
+        if points is None:
+            points = sum(player.get('Points') or 0 for player in players)
+        sides.append((team, int(points)))
+    (home, home_score), (away, away_score) = sides
+    return {'home': home, 'away': away, 'home_score': home_score, 'away_score': away_score,
+            'live': bool(payload.get('Live'))}
+
+
+# Function to turn a live Boxscore payload into the rows RoundIngestor stores
+# (the players and each team's Total), like get_player_boxscore_stats_data
+def boxscore_rows(payload, season, gamecode, round_number):
+    sides = []
+    for home, side in zip([1, 0], payload['Stats'][:2]):
+        players = pd.DataFrame(side.get('PlayersStats') or [])
+        if players.empty:
+            continue
+        total = {**(side.get('totr') or {}), 'Player_ID': 'Total', 'Player': 'Total', 'Team': players['Team'].iloc[0]}
+        side_rows = pd.concat([players, pd.DataFrame([total])], ignore_index=True)
+        side_rows['Home'] = home
+        sides.append(side_rows)
+    rows = pd.concat(sides, ignore_index=True)
+    for column in ['Minutes', *BOXSCORE_COLUMNS]:
+        if column not in rows:
+            rows[column] = 0
+    rows['Season'] = season
+    rows['Gamecode'] = gamecode
+    rows['Round'] = round_number
+    return clean_boxscore(rows)
+
+
+# Function to add a result to a "W-L" record
+def add_to_record(record, won):
+    wins, losses = ([int(part) for part in re.findall(r'\d+', str(record))] + [0, 0])[:2]
+    return f"{wins + won}-{losses + (not won)}"
+
+
+# Function to push a result onto a last-5 form, oldest first; kept in the
+# form it came in (a list, or its string like "['W', 'L', ...]")
+def add_to_form(form, won):
+    results = re.findall(r'[WL]', ' '.join(form) if isinstance(form, (list, np.ndarray)) else str(form or ''))
+    results = (results + ['W' if won else 'L'])[-FORM_GAMES:]
+    return results if isinstance(form, (list, np.ndarray)) else str(results)
+
+
+# Function to count a team's regular season games the schedule marks played
+# before a given game (its gamesPlayed in standings that don't have the game yet)
+def games_before(schedule, team, game):
+    games = schedule[((schedule['homecode'] == team) | (schedule['awaycode'] == team))
+                     & schedule['played'] & (schedule['gamenumber'] != game['gamecode'])
+                     & (schedule['gameday'] <= game['round'])]
+    if 'round' in games:
+        games = games[games['round'] == 'RS']
+    return len(games)
+
+
+def team_code_column(standings):
+    return 'club.code' if 'club.code' in standings else 'club.tvCode'
+
+
+# Function to apply a finished game to the standings: games, W/L, points,
+# home/away records and last-5 form of both teams, then the positions. Ties on
+# wins keep their previous order until the next refresh brings the official
+# tie-breaks. Returns None if the game isn't a regular season one, either team
+# already has it (a refresh got there first) or can't be found.
+def apply_standings(standings, game, schedule):
+    if standings is None or game['phase'] != 'RS':
+        return None
+    codes = standings[team_code_column(standings)].astype(str).to_numpy()
+    positions = {}
+    for team in (game['home'], game['away']):
+        found = np.flatnonzero(codes == team)
+        if len(found) != 1 or standings['gamesPlayed'].iat[found[0]] != games_before(schedule, team, game):
+            return None
+        positions[team] = found[0]
+
+    standings = standings.copy()
+    columns = {name: standings.columns.get_loc(name) for name in standings.columns}
+    for team, scored, conceded, record in [(game['home'], game['home_score'], game['away_score'], 'homeRecord'),
+                                           (game['away'], game['away_score'], game['home_score'], 'awayRecord')]:
+        row = positions[team]
+        won = scored > conceded
+        for column, amount in [('gamesPlayed', 1), ('gamesWon', int(won)), ('gamesLost', int(not won)),
+                               ('pointsFor', scored), ('pointsAgainst', conceded)]:
+            standings.iat[row, columns[column]] = standings[column].iat[row] + amount
+        standings.iat[row, columns[record]] = add_to_record(standings[record].iat[row], won)
+        if 'last5Form' in columns:
+            standings.iat[row, columns['last5Form']] = add_to_form(standings['last5Form'].iat[row], won)
+
+    order = np.lexsort((standings['position'].to_numpy(), -standings['gamesWon'].to_numpy()))
+    standings = standings.iloc[order].reset_index(drop=True)
+    standings['position'] = np.arange(1, len(standings) + 1).astype(standings['position'].dtype)
+    return standings
+
+
+# Function to add one game to per-game averages: (average * games + game) / (games + 1)
+# for the rows keys match, with percentages recomputed from the made/attempted
+# averages. Rows the game doesn't match (e.g. a debut) wait for the next refresh.
+def add_game_averages(frame, keys, game):
+    if frame is None or game.empty:
+        return frame
+    positions = pd.Series(np.arange(len(frame)), index=keys.to_numpy())
+    positions = positions[~positions.index.duplicated(keep='last')].reindex(game.index)
+    found = positions.notna().to_numpy()
+    rows = positions[found].astype(int).to_numpy()
+    game = game[found]
+    if not len(rows):
+        return frame
+
+    frame = frame.copy()
+    games = pd.to_numeric(frame['gamesPlayed'], errors='coerce').fillna(0).to_numpy()[rows].astype(float)
+    for column in [column for column in game.columns if column in frame]:
+        old = pd.to_numeric(frame[column], errors='coerce').fillna(0).to_numpy()[rows].astype(float)
+        values = ((old * games + game[column].to_numpy()) / (games + 1)).round(2)
+        frame.iloc[rows, frame.columns.get_loc(column)] = values.astype(frame[column].dtype, copy=False) \
+            if pd.api.types.is_float_dtype(frame[column]) else values
+    frame.iloc[rows, frame.columns.get_loc('gamesPlayed')] = (games + 1).astype(frame['gamesPlayed'].dtype)
+    for column, (made, attempted) in PERCENT_COLUMNS.items():
+        if column in frame and made in frame and attempted in frame:
+            updated = frame.iloc[rows]
+            frame.iloc[rows, frame.columns.get_loc(column)] = percentages(updated[made], updated[attempted]).to_numpy()
+    return frame
+
+
+# Function to add a finished game's boxscore rows to the per-game player and team stats
+def apply_boxscore(player_stats, team_stats, rows):
+    columns = STAT_COLUMNS + ['minutesPlayed']
+    players = rows[(rows['Player_ID'] != 'Total') & (rows['minutesPlayed'] > 0)]
+    if player_stats is not None and 'player.code' in player_stats:
+        player_stats = add_game_averages(player_stats, normalize_player_codes(player_stats['player.code']),
+                                         players.set_index(normalize_player_codes(players['Player_ID']))[columns])
+    totals = rows[rows['Player_ID'] == 'Total'].set_index('Team')[STAT_COLUMNS]
+    if team_stats is not None and 'team.code' in team_stats:
+        team_stats = add_game_averages(team_stats, team_stats['team.code'].astype(str), totals)
+    return player_stats, team_stats
+
+
+# Function to build the snapshot with finished games applied, given as
+# (game, boxscore rows) pairs; returns it (None if the snapshot already has
+# every game) and the codes of the games applied.
+# Advanced stats are left for the next refresh: the snapshot keeps its round
+# and is marked provisional, so that refresh fetches the season again.
+def apply_games(snapshot, finished, schedule):
+    frames = snapshot.frames
+    applied = []
+    for game, rows in finished:
+        standings = apply_standings(frames['standings'], game, schedule)
+        if standings is None:
+            continue
+        frames['standings'] = standings
+        if rows is not None:
+            frames['player_stats'], frames['team_stats'] = apply_boxscore(frames['player_stats'],
+                                                                          frames['team_stats'], rows)
+        applied.append(game['gamecode'])
+    if not applied:
+        return None, applied
+    updated = Snapshot(snapshot.season, snapshot.round_number, frames, errors=snapshot.errors)
+    updated.provisional = True
+    return updated, applied
+
+
+class LiveMonitor:
+    # Follows the games of a season while they are played. Only from just
+    # before a game's start time until it is over, its live boxscore is polled
+    # every LIVE_POLL_SECONDS with conditional requests, so a poll where
+    # nothing happened costs a 304. Live scores are kept here for the page;
+    # when a game ends, its result and boxscore rows are applied to the
+    # season's snapshot in memory (standings, form, per-game player and team
+    # stats), without waiting for the next full refresh. The rest of the
+    # time the thread sleeps until the next tip-off.
+
+    def __init__(self, refresher, season, source=None, poll_seconds=LIVE_POLL_SECONDS):
+        self.refresher = refresher
+        self.season = season
+        self.source = source or LiveSource()
+        self.poll_seconds = poll_seconds
+        self.schedule = None
+        self.applied = 0
+        # gamecode -> the latest score of a game followed tonight
+        self._games = {}
+        self._seen_live = set()
+        self._finished = set()
+        self._schedule_checked = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._thread = threading.Thread(target=self._run, name=f'live-{self.season}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.poll()
+            except Exception as exc:
+                logger.warning("Live poll of season %s failed: %s", self.season, exc)
+                wait = self.poll_seconds if self.is_live() else IDLE_POLL_SECONDS
+            self._stop.wait(wait)
+
+    # Function to check whether any followed game is being played
+    def is_live(self):
+        with self._lock:
+            return any(game['live'] for game in self._games.values())
+
+    # Function to list tonight's followed games for the page: teams, score and status
+    def scoreboard(self):
+        with self._lock:
+            games = sorted(self._games.values(), key=lambda game: game['gamecode'])
+        return [{'gamecode': game['gamecode'], 'home': game['home'], 'away': game['away'],
+                 'score': f"{game['home_score']} - {game['away_score']}",
+                 'status': 'Live' if game['live'] else 'Final' if game['final'] else 'Scheduled'}
+                for game in games]
+
+    def _check_schedule(self, now):
+        schedule = self.source.schedule(self.season)
+        if schedule is not None:
+            self.schedule = schedule
+        self._schedule_checked = now
+
+    # Function to pick the games of tonight: those around their start time or seen live
+    def games_in_window(self, now):
+        if self.schedule is None:
+            return None
+        start = self.schedule['start']
+        window = (start - PRE_GAME <= now) & (now <= start + GAME_WINDOW)
+        return self.schedule[window.fillna(False).astype(bool) | self.schedule['gamenumber'].isin(self._seen_live)]
+
+    # Function to pick the games to poll: tonight's, until they are over
+    def games_to_poll(self, now):
+        games = self.games_in_window(now)
+        if games is None:
+            return []
+        return [game for game in games.itertuples() if int(game.gamenumber) not in self._finished]
+
+    # Function to poll once; returns the seconds to wait before the next poll
+    def poll(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        if (self.schedule is None or not self.is_live()
+                or (now - self._schedule_checked).total_seconds() >= SCHEDULE_POLL_SECONDS):
+            self._check_schedule(now)
+        games = self.games_to_poll(now)
+        with timed('live poll'):
+            finished = [ended for ended in (self._poll_game(game) for game in games) if ended is not None]
+        if finished:
+            # Games ending in the same poll go into one new snapshot (one version)
+            self._apply(finished)
+        # Finished games stay on the scoreboard until their window closes
+        tonight = self.games_in_window(now)
+        tonight = set() if tonight is None else set(tonight['gamenumber'])
+        with self._lock:
+            self._games = {gamecode: game for gamecode, game in self._games.items() if gamecode in tonight}
+        set_gauge('live_games', sum(game['live'] for game in self._games.values()), season=self.season)
+        if self.games_to_poll(now):
+            return self.poll_seconds
+        return self._idle_seconds(now)
+
+    # Function to sleep until just before the next start time, checking the schedule now and then
+    def _idle_seconds(self, now):
+        starts = self.schedule['start'] - PRE_GAME if self.schedule is not None else pd.Series(dtype=object)
+        upcoming = starts[starts > now]
+        if upcoming.empty:
+            return IDLE_POLL_SECONDS
+        return min(max((upcoming.min() - now).total_seconds(), self.poll_seconds), IDLE_POLL_SECONDS)
+
+    # Function to poll one game's boxscore; returns (game, payload) once it has ended
+    def _poll_game(self, game):
+        gamecode = int(game.gamenumber)
+        try:
+            payload = self.source.boxscore(self.season, gamecode)
+            if payload is None:
+                return
+            score = game_score(payload)
+        except (requests.RequestException, ValueError, KeyError, IndexError) as exc:
+            # No boxscore before tip-off
+            logger.debug("Boxscore of game %s not available: %s", gamecode, exc)
+            return
+        if score['live']:
+            self._seen_live.add(gamecode)
+        final = not score['live'] and (bool(game.played) or gamecode in self._seen_live)
+        state = {**score, 'home': score['home'] or game.homecode, 'away': score['away'] or game.awaycode,
+                 'gamecode': gamecode, 'round': int(game.gameday), 'phase': getattr(game, 'round', 'RS'),
+                 'final': final}
+        with self._lock:
+            self._games[gamecode] = state
+        if not final:
+            return None
+        self._finished.add(gamecode)
+        self._seen_live.discard(gamecode)
+        if state['phase'] != 'RS':
+            # Playoff scores are only shown; the standings are the regular season's
+            logger.info("Game %s (%s) ended; not a regular season game", gamecode, state['phase'])
+            return None
+        return state, payload
+
+    def _apply(self, finished):
+        games = []
+        for game, payload in finished:
+            try:
+                rows = boxscore_rows(payload, self.season, game['gamecode'], game['round'])
+            except (KeyError, ValueError) as exc:
+                logger.warning("Boxscore rows of game %s unreadable, applying the score only: %s",
+                               game['gamecode'], exc)
+                rows = None
+            games.append((game, rows))
+        applied = []
+
+        def change(current):
+            snapshot, applied[:] = apply_games(current, games, self.schedule)
+            return snapshot
+        with timed('live apply'):
+            self.refresher.update(self.season, change)
+        for game, _ in games:
+            if game['gamecode'] not in applied:
+                logger.info("Game %s is already in season %s's snapshot", game['gamecode'], self.season)
+                continue
+            self.applied += 1
+            count('live_games_applied', season=self.season)
+            logger.info("Applied game %s %s %s-%s %s to season %s", game['gamecode'], game['home'],
+                        game['home_score'], game['away_score'], game['away'], self.season)
+
+
+# Follows a season's games from the command line, printing the scores:
+#
+#   python live.py --season 2024
+def main():
+    from refresher import SnapshotRefresher
+    from store import SnapshotStore
+
+    parser = argparse.ArgumentParser(description="Follow a Euroleague season's games while they are played")
+    parser.add_argument('--season', type=int, required=True)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    refresher = SnapshotRefresher(store=SnapshotStore())
+    refresher.watch(args.season)
+    monitor = LiveMonitor(refresher, args.season)
+    while True:
+        wait = monitor.poll()
+        for game in monitor.scoreboard():
+            print(f"{game['home']:>5} {game['score']:^9} {game['away']:<5} {game['status']}")
+        time.sleep(wait)
+
+
+if __name__ == '__main__':
+    main()
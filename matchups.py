@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from trends import snapshot_trends, trend_store
+
+# Rounds of opponent adjustment; the ratings settle well within this
+ADJUST_ITERATIONS = 20
+
+TEAM_COLUMN = 'team.tvCodes'
+
+
+class Matchups:
+    # Dense team x team matrices over a set of games (one season or many),
+    # row team against column team, indexed by self.index:
+    #
+    #   games[i, j]       games i played against j
+    #   wins[i, j]        games i won against j
+    #   point_diff[i, j]  points i scored minus points j scored in those games
+    #   net_diff[i, j]    adjusted net rating of i minus that of j (per 100 possessions)
+    #
+    # Ratings come from the advanced team stats when given (the season's
+    # offensiveRating/defensiveRating), otherwise from the games' points and
+    # possessions. They are then adjusted for the opponents each team faced:
+    # an offense is credited for the defenses it met and a defense for the
+    # offenses, solved as a fixed point over the schedule matrix.
+    # Comparing two teams is a handful of array lookups.
+
+    def __init__(self, team_games, advanced_team_stats=None, iterations=ADJUST_ITERATIONS):
+        teams = set()
+        if team_games is not None:
+            teams |= set(team_games[TEAM_COLUMN].dropna())
+        if advanced_team_stats is not None:
+            teams |= set(advanced_team_stats['team.tvCodes'].dropna())
+        self.teams = sorted(teams)
+        self.index = {team: i for i, team in enumerate(self.teams)}
+        n = len(self.teams)
+
+        self.games = np.zeros((n, n), dtype=np.int32)
+        self.wins = np.zeros((n, n), dtype=np.int32)
+        self.point_diff = np.zeros((n, n), dtype=np.float32)
+        points = np.zeros((n, 2))
+        possessions = np.zeros((n, 2))
+        if team_games is not None and not team_games.empty:
+            pairs = self._pairs(team_games)
+            rows = pairs[TEAM_COLUMN].map(self.index).to_numpy()
+            columns = pairs['opponent'].map(self.index).to_numpy()
+            cells = rows * n + columns
+            margin = (pairs['pointsScored'] - pairs['pointsScoredAgainst']).to_numpy(dtype='float64')
+            self.games = np.bincount(cells, minlength=n * n).reshape(n, n).astype(np.int32)
+            self.wins = np.bincount(cells, weights=margin > 0, minlength=n * n).reshape(n, n).astype(np.int32)
+            self.point_diff = np.bincount(cells, weights=margin, minlength=n * n).reshape(n, n).astype(np.float32)
+            for k, (scored, used) in enumerate([('pointsScored', 'possessions'),
+                                                ('pointsScoredAgainst', 'possessionsAgainst')]):
+                points[:, k] = np.bincount(rows, weights=pairs[scored].to_numpy(dtype='float64'), minlength=n)
+                possessions[:, k] = np.bincount(rows, weights=pairs[used].to_numpy(dtype='float64'), minlength=n)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            from_games = 100 * points / possessions
+        self.offensive_rating = from_games[:, 0]
+        self.defensive_rating = from_games[:, 1]
+        if advanced_team_stats is not None and {'offensiveRating', 'defensiveRating'} <= set(advanced_team_stats):
+            ratings = advanced_team_stats.drop_duplicates('team.tvCodes').set_index('team.tvCodes')
+            ratings = ratings.reindex(self.teams)
+            self.offensive_rating = ratings['offensiveRating'].to_numpy(dtype='float64')
+            self.defensive_rating = ratings['defensiveRating'].to_numpy(dtype='float64')
+        self.adjusted_offense, self.adjusted_defense = self._adjust(iterations)
+        net = self.adjusted_offense - self.adjusted_defense
+        self.net_diff = (net[:, None] - net[None, :]).astype(np.float32)
+
+    # Function to pair every team's game row with its opponent's code
+    @staticmethod
+    def _pairs(team_games):
+        games = team_games[['Season', 'Gamecode', TEAM_COLUMN, 'pointsScored', 'pointsScoredAgainst',
+                            'possessions', 'possessionsAgainst']].copy()
+        games[TEAM_COLUMN] = games[TEAM_COLUMN].astype(str)
+        opponents = games[['Season', 'Gamecode', TEAM_COLUMN]].rename(columns={TEAM_COLUMN: 'opponent'})
+        pairs = games.merge(opponents, on=['Season', 'Gamecode'])
+        return pairs[pairs[TEAM_COLUMN] != pairs['opponent']]
+
+    def _adjust(self, iterations):
+        offense, defense = self.offensive_rating, self.defensive_rating
+        known = ~(np.isnan(offense) | np.isnan(defense))
+        if not known.any():
+            return offense, defense
+        league = np.nanmean(offense[known])
+        faced = self.games * known[None, :]
+        totals = faced.sum(axis=1, keepdims=True)
+        # Row i: the share of i's games against each opponent
+        schedule = np.divide(faced, totals, out=np.zeros(faced.shape), where=totals > 0)
+        played = totals[:, 0] > 0
+        offense_known, defense_known = np.nan_to_num(offense, nan=league), np.nan_to_num(defense, nan=league)
+        adjusted_offense, adjusted_defense = offense_known.copy(), defense_known.copy()
+        for _ in range(iterations):
+            defenses_faced = np.where(played, schedule @ adjusted_defense, league)
+            offenses_faced = np.where(played, schedule @ adjusted_offense, league)
+            adjusted_offense = offense_known + (league - defenses_faced)
+            adjusted_defense = defense_known - (offenses_faced - league)
+        return np.where(known, adjusted_offense, np.nan), np.where(known, adjusted_defense, np.nan)
+
+    # Function to compare two teams straight from the matrices
+    def compare(self, team_a, team_b):
+        a, b = self.index.get(team_a), self.index.get(team_b)
+        if a is None or b is None:
+            return None
+        games = int(self.games[a, b])
+        return {
+            'games': games,
+            'wins': (int(self.wins[a, b]), int(self.wins[b, a])),
+            'average_point_diff': float(self.point_diff[a, b] / games) if games else None,
+            'offensive_rating': (float(self.offensive_rating[a]), float(self.offensive_rating[b])),
+            'defensive_rating': (float(self.defensive_rating[a]), float(self.defensive_rating[b])),
+            'adjusted_offense': (float(self.adjusted_offense[a]), float(self.adjusted_offense[b])),
+            'adjusted_defense': (float(self.adjusted_defense[a]), float(self.adjusted_defense[b])),
+            'net_diff': float(self.net_diff[a, b]),
+        }
+
+    # Function to get a matrix as a labelled DataFrame (rows: team, columns: opponent)
+    def frame(self, matrix):
+        return pd.DataFrame(getattr(self, matrix), index=self.teams, columns=self.teams)
+
+
+# Function to get (building once) the matchups of a snapshot's season; not
+# kept while no game is known yet, like the trends they come from
+def snapshot_matchups(snapshot):
+    matchups = snapshot.derive('matchups', lambda s: Matchups(snapshot_trends(s, 'teams'), s.advanced_team_stats))
+    if not matchups.games.any():
+        snapshot.forget('matchups')
+    return matchups
+
+
+# Function to get (building once per snapshot) the matchups over every season with
+# materialized trends; ratings are then the games' own, adjusted over all of them
+def all_seasons_matchups(snapshot, store=None):
+    store = store or trend_store
+
+    def build(snapshot):
+        snapshot_trends(snapshot, 'teams')
+        tables = [store.load(season, 'teams') for season in store.seasons()]
+        tables = [table for table in tables if table is not None]
+        return Matchups(pd.concat(tables, ignore_index=True) if tables else None)
+    matchups = snapshot.derive('matchups_all_seasons', build)
+    if not matchups.games.any():
+        snapshot.forget('matchups_all_seasons')
+    return matchups
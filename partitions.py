@@ -0,0 +1,47 @@
+import numpy as np
+
+# The column player frames are partitioned on
+PLAYER_TEAM_COLUMN = 'player.team.tvCodes'
+
+
+class TeamIndex:
+    # A frame sorted once by team, with the (start, stop) row range of every
+    # team, so a team's rows are a positional slice instead of a boolean scan
+    # and copy of the whole table. Keys can span several columns, e.g.
+    # ['Season', 'player.team.tvCodes'] for a multi-season table, in which
+    # case they are tuples.
+
+    def __init__(self, frame, key_columns=PLAYER_TEAM_COLUMN):
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        self.key_columns = list(key_columns)
+        # Stable sort keeps each team's rows in their original order (and index)
+        self.frame = frame.sort_values(self.key_columns, kind='stable')
+
+        keys = self.frame[self.key_columns]
+        # Row positions where the key changes start a new partition
+        changed = (keys != keys.shift()).any(axis=1).to_numpy()
+        starts = np.flatnonzero(changed)
+        stops = np.append(starts[1:], len(self.frame))
+        first_rows = keys.iloc[starts]
+        if len(self.key_columns) == 1:
+            teams = first_rows.iloc[:, 0].tolist()
+        else:
+            teams = list(first_rows.itertuples(index=False, name=None))
+        self.ranges = {team: (start, stop) for team, start, stop in zip(teams, starts.tolist(), stops.tolist())}
+
+    def teams(self):
+        return list(self.ranges)
+
+    # Function to get the rows of a team (an empty frame for an unknown team)
+    def rows(self, team):
+        start, stop = self.ranges.get(team, (0, 0))
+        return self.frame.iloc[start:stop]
+
+
+# Function to get (building once) the team index of one of a snapshot's player frames
+def snapshot_team_index(snapshot, frame_name):
+    frame = getattr(snapshot, frame_name)
+    if frame is None:
+        return None
+    return snapshot.derive(f'{frame_name}_team_index', lambda s: TeamIndex(frame))
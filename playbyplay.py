@@ -0,0 +1,273 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+import requests
+
+from euroleague_api.boxscore_data import BoxScoreData
+
+from fetcher import fetch_concurrently
+from store import DATA_DIR, write_frame
+
+logger = logging.getLogger(__name__)
+
+PLAY_BY_PLAY_DIR = os.path.join(DATA_DIR, 'playbyplay')
+
+# The endpoint euroleague-api's PlayByPlay client reads
+PLAY_BY_PLAY_URL = 'https://live.euroleague.net/api/PlaybyPlay'
+DOWNLOAD_TIMEOUT = 30
+
+# Quarters in payload order; the position is the period number
+PERIODS = ['FirstQuarter', 'SecondQuarter', 'ThirdQuarter', 'ForthQuarter', 'ExtraTime']
+
+# Games downloaded and parsed at a time; only their raw JSON is in memory at once
+GAMES_PER_BATCH = 16
+
+# Plays buffered before they are written as one part file (a season is ~150k plays)
+ROWS_PER_PART = 50_000
+
+
+class LiveSource:
+    # Played games from the season schedule and raw PlaybyPlay payloads. With
+    # record_dir every payload is also saved as a fixture that RecordedSource
+    # replays without network: record_dir/E2024/123.json
+
+    def __init__(self, competition='E', record_dir=None, boxscore_api=None):
+        self.competition = competition
+        self.record_dir = record_dir
+        self.boxscore_api = boxscore_api or BoxScoreData(competition)
+
+    def games(self, season):
+        schedule = self.boxscore_api.get_game_metadata_season(season)
+        return sorted(int(code) for code in schedule.loc[schedule['played'], 'gamenumber'])
+
+    def payload(self, season, gamecode):
+        response = requests.get(PLAY_BY_PLAY_URL, timeout=DOWNLOAD_TIMEOUT,
+                                params={'gamecode': gamecode, 'seasoncode': f'{self.competition}{season}'})
+        response.raise_for_status()
+        if self.record_dir is not None:
+            path = os.path.join(self.record_dir, f'{self.competition}{season}', f'{gamecode}.json')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(response.content)
+        return response.content
+
+
+class RecordedSource:
+    # Payloads recorded by LiveSource(record_dir=...), one file per game
+
+    def __init__(self, directory, competition='E'):
+        self.directory = directory
+        self.competition = competition
+
+    def season_dir(self, season):
+        return os.path.join(self.directory, f'{self.competition}{season}')
+
+    def games(self, season):
+        if not os.path.isdir(self.season_dir(season)):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(self.season_dir(season)) if name.endswith('.json'))
+
+    def payload(self, season, gamecode):
+        with open(os.path.join(self.season_dir(season), f'{gamecode}.json'), 'rb') as file:
+            return file.read()
+
+
+# Function to turn "MM:SS" game clock strings into seconds left in the period (missing -> NaN)
+def clock_seconds(markers):
+    parts = markers.astype('string').str.extract(r'^\s*(\d+):(\d+)')
+    return (parts[0].astype('float32') * 60 + parts[1].astype('float32')).astype('float32')
+
+
+# Function to parse one game's PlaybyPlay payload into compact rows, one per play.
+# The score is only sent on scoring plays, so it is carried forward to every play.
+def parse_play_by_play(payload, season, gamecode):
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        # The API answers with an empty body for games without play-by-play
+        raise ValueError(f"Game code, {gamecode}, did not return any data.")
+
+    plays = []
+    for period, name in enumerate(PERIODS, start=1):
+        for play in data.get(name) or []:
+            plays.append((period, play.get('NUMBEROFPLAY'), play.get('CODETEAM'), play.get('PLAYER_ID'),
+                          play.get('PLAYER'), play.get('PLAYTYPE'), play.get('MINUTE'), play.get('MARKERTIME'),
+                          play.get('POINTS_A'), play.get('POINTS_B')))
+    if not plays:
+        raise ValueError(f"Game code, {gamecode}, has no plays.")
+
+    raw = pd.DataFrame(plays, columns=['PERIOD', 'NUMBEROFPLAY', 'CODETEAM', 'PLAYER_ID', 'PLAYER', 'PLAYTYPE',
+                                       'MINUTE', 'MARKERTIME', 'POINTS_A', 'POINTS_B'])
+    home_code = str(data.get('CodeTeamA') or '').strip()
+    team = raw['CODETEAM'].astype('string').str.strip()
+    return pd.DataFrame({
+        'Season': np.int16(season),
+        'Gamecode': np.int32(gamecode),
+        'PERIOD': raw['PERIOD'].astype('int8'),
+        'NUMBEROFPLAY': pd.to_numeric(raw['NUMBEROFPLAY'], errors='coerce').fillna(0).astype('int32'),
+        'CODETEAM': team.replace('', pd.NA).astype('category'),
+        'HOME': (team == home_code).fillna(False).astype('int8'),
+        'PLAYER_ID': raw['PLAYER_ID'].astype('string').str.strip().replace('', pd.NA).astype('category'),
+        'PLAYER': raw['PLAYER'].astype('category'),
+        'PLAYTYPE': raw['PLAYTYPE'].astype('string').str.strip().astype('category'),
+        'MINUTE': pd.to_numeric(raw['MINUTE'], errors='coerce').fillna(0).astype('int8'),
+        'CLOCK': clock_seconds(raw['MARKERTIME']),
+        'POINTS_A': pd.to_numeric(raw['POINTS_A'], errors='coerce').ffill().fillna(0).astype('int16'),
+        'POINTS_B': pd.to_numeric(raw['POINTS_B'], errors='coerce').ffill().fillna(0).astype('int16'),
+    })
+
+
+class PlayByPlayIngestor:
+    # Play-by-play of every played game, appended in part files per season:
+    #
+    #   playbyplay/season=2024/part-00000.parquet   <- plays of many games
+    #                          part-00001.parquet
+    #                          ingest.json          <- game code -> part holding it
+    #
+    # Games are downloaded and parsed a batch at a time and buffered until
+    # ROWS_PER_PART plays are ready, so memory stays bounded however long the
+    # season is. A part is complete before the manifest points at it: games of
+    # an interrupted backfill are simply not in the manifest yet and the next
+    # ingest() resumes with them, while ingested game codes are never fetched
+    # or stored twice.
+
+    def __init__(self, root=PLAY_BY_PLAY_DIR, source=None, games_per_batch=GAMES_PER_BATCH,
+                 rows_per_part=ROWS_PER_PART):
+        self.root = root
+        self.source = source or LiveSource()
+        self.games_per_batch = games_per_batch
+        self.rows_per_part = rows_per_part
+        self._lock = threading.Lock()
+
+    def season_dir(self, season):
+        return os.path.join(self.root, f'season={season}')
+
+    def manifest(self, season):
+        try:
+            with open(os.path.join(self.season_dir(season), 'ingest.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, season, manifest):
+        path = os.path.join(self.season_dir(season), 'ingest.json')
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # Function to list the game codes already stored for a season
+    def ingested_games(self, season):
+        manifest = self.manifest(season) or {'games': {}}
+        return sorted(int(code) for code in manifest['games'])
+
+    # Function to download and store the play-by-play of played games not
+    # stored yet (at most max_games of them); returns (games stored, errors by game code)
+    def ingest(self, season, max_games=None):
+        with self._lock:
+            manifest = self.manifest(season) or {'games': {}, 'parts': []}
+            os.makedirs(self.season_dir(season), exist_ok=True)
+            self._remove_orphans(season, manifest)
+
+            pending = [code for code in self.source.games(season) if str(code) not in manifest['games']]
+            if max_games is not None:
+                pending = pending[:max_games]
+
+            stored, errors = 0, {}
+            buffer, buffered_rows = [], 0
+            for start in range(0, len(pending), self.games_per_batch):
+                batch = pending[start:start + self.games_per_batch]
+                calls = {code: (lambda code=code: parse_play_by_play(self.source.payload(season, code), season, code))
+                         for code in batch}
+                parsed, batch_errors = fetch_concurrently(calls)
+                for code, error in batch_errors.items():
+                    logger.warning("Play-by-play of game %s (season %s) not ingested: %s", code, season, error)
+                errors.update(batch_errors)
+
+                for code in batch:
+                    if code in parsed:
+                        buffer.append(parsed.pop(code))
+                        buffered_rows += len(buffer[-1])
+                if buffered_rows >= self.rows_per_part:
+                    stored += self._write_part(season, manifest, buffer)
+                    buffer, buffered_rows = [], 0
+            if buffer:
+                stored += self._write_part(season, manifest, buffer)
+            return stored, errors
+
+    # Function to write buffered games as a new part, then record them in the manifest
+    def _write_part(self, season, manifest, games):
+        plays = pd.concat(games, ignore_index=True)
+        for column in ['CODETEAM', 'PLAYER_ID', 'PLAYER', 'PLAYTYPE']:
+            plays[column] = plays[column].astype('category')
+        name = f'part-{len(manifest["parts"]):05d}.parquet'
+        path = os.path.join(self.season_dir(season), name)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        write_frame(plays, tmp_path)
+        os.replace(tmp_path, path)
+
+        manifest['parts'].append(name)
+        for code in plays['Gamecode'].unique():
+            manifest['games'][str(int(code))] = name
+        self._write_manifest(season, manifest)
+        logger.info("Stored play-by-play of %d games (season %s) in %s", len(games), season, name)
+        return len(games)
+
+    # Function to delete parts (and temporary files) an interrupted ingest left behind
+    def _remove_orphans(self, season, manifest):
+        for name in os.listdir(self.season_dir(season)):
+            if name.startswith('part-') and name not in manifest['parts']:
+                os.remove(os.path.join(self.season_dir(season), name))
+
+    # Function to read a season's plays part by part (one part in memory at a time)
+    def iter_parts(self, season, columns=None):
+        manifest = self.manifest(season) or {'parts': []}
+        for name in manifest['parts']:
+            yield pd.read_parquet(os.path.join(self.season_dir(season), name), columns=columns)
+
+    # Function to read the plays of a season, optionally only some games or columns
+    def load(self, season, games=None, columns=None):
+        manifest = self.manifest(season)
+        if manifest is None:
+            return None
+        parts = manifest['parts']
+        filters = None
+        if games is not None:
+            games = [int(code) for code in games]
+            parts = sorted({manifest['games'][str(code)] for code in games if str(code) in manifest['games']})
+            filters = [('Gamecode', 'in', games)]
+        frames = [pd.read_parquet(os.path.join(self.season_dir(season), name), columns=columns, filters=filters)
+                  for name in parts]
+        return pd.concat(frames, ignore_index=True) if frames else None
+
+
+# Resumable bulk backfill; run it again to continue or retry failed games:
+#
+#   python playbyplay.py --seasons 2023 2024
+#   python playbyplay.py --seasons 2024 --record fixtures/     also keep the raw payloads
+#   python playbyplay.py --seasons 2024 --fixtures fixtures/   replay recorded payloads, no network
+def main():
+    parser = argparse.ArgumentParser(description='Ingest Euroleague play-by-play into the local columnar store')
+    parser.add_argument('--seasons', type=int, nargs='+', required=True)
+    parser.add_argument('--record', help='directory to save the raw payloads in')
+    parser.add_argument('--fixtures', help='directory of recorded payloads to ingest instead of the live API')
+    parser.add_argument('--max-games', type=int, help='stop after this many new games per season')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    source = RecordedSource(args.fixtures) if args.fixtures else LiveSource(record_dir=args.record)
+    ingestor = PlayByPlayIngestor(source=source)
+    for season in args.seasons:
+        stored, errors = ingestor.ingest(season, max_games=args.max_games)
+        logger.info("Season %s: %d games stored, %d failed, %d in the store", season, stored, len(errors),
+                    len(ingestor.ingested_games(season)))
+
+
+if __name__ == '__main__':
+    main()
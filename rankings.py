@@ -0,0 +1,59 @@
+import pandas as pd
+
+# KPIs every team is ranked on (higher is better, so rank 1 = highest value)
+RANKED_KPIS = ['pointsScored', 'twoPointersPercentage', 'threePointersPercentage', 'threePointersMade',
+               'offensiveRebounds', 'defensiveRebounds', 'foulsCommited', 'foulsDrawn']
+
+# Ties share the best rank (1, 1, 3, ...) and the leader of a tie is the first team in the table
+TIE_METHOD = 'min'
+
+
+# Function to get a KPI column as numbers ("52.3%" -> 52.3)
+def numeric_column(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return column
+    return pd.to_numeric(column.astype(str).str.rstrip('%'), errors='coerce')
+
+
+class TeamRankings:
+    # Every team's rank on every KPI plus each KPI's leader, computed once per
+    # data snapshot with vectorized DataFrame.rank. Lookups are dict reads.
+
+    def __init__(self, team_totals_data, kpis=RANKED_KPIS, team_column='team.tvCodes'):
+        kpis = [kpi for kpi in kpis if kpi in team_totals_data]
+        teams = team_totals_data[team_column]
+        values = pd.DataFrame({kpi: numeric_column(team_totals_data[kpi]) for kpi in kpis})
+        values.index = teams
+
+        ranks = values.rank(ascending=False, method=TIE_METHOD, na_option='bottom').astype('int16')
+        self.kpis = kpis
+        self.ranks = ranks
+        self.positions = {team: position for position, team in enumerate(teams)}
+        self._ranks_by_team = ranks.to_dict('index')
+
+        # Leaders keep the value as it appears in the table
+        self.leaders = {}
+        for kpi in kpis:
+            column = values[kpi].reset_index(drop=True)
+            leader = column.idxmax() if column.notna().any() else 0
+            self.leaders[kpi] = (team_totals_data[kpi].iloc[leader], teams.iloc[leader])
+
+    # Function to get the row position of a team in the table the rankings were built from
+    def position(self, team):
+        return self.positions[team]
+
+    def team_ranks(self, team):
+        return self._ranks_by_team[team]
+
+    def rank(self, team, kpi):
+        return self._ranks_by_team[team][kpi]
+
+    def leader(self, kpi):
+        return self.leaders[kpi]
+
+
+# Function to get (building once) the rankings of a snapshot's team stats
+def snapshot_rankings(snapshot):
+    if snapshot.team_stats is None:
+        return None
+    return snapshot.derive('team_rankings', lambda s: TeamRankings(s.team_stats))
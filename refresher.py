@@ -0,0 +1,507 @@
+import argparse
+import logging
+import os
+import threading
+import time
+import types
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import schedule
+
+from fetcher import fetch_season, latest_round
+from history import current_season
+from ingest import RoundIngestor, make_incremental_fetch
+from rounds import round_discovery
+from shared import WAIT_SECONDS, shared_from_url
+from snapshot import Snapshot
+from store import SnapshotStore
+from timing import count, set_gauge, timed
+
+logger = logging.getLogger(__name__)
+
+# How often watched seasons are re-pulled in the background
+REFRESH_INTERVAL_MINUTES = 30
+
+# Memory budget of the snapshots kept in memory, in MB; override with
+# EUROLEAGUE_SNAPSHOT_MEMORY_MB. Beyond it the least recently read seasons are
+# dropped and simply loaded from the store again when asked for.
+SNAPSHOT_MEMORY_MB = float(os.environ.get('EUROLEAGUE_SNAPSHOT_MEMORY_MB', 256))
+
+# How deep the objects derived from a snapshot are walked when measuring it
+MEASURE_DEPTH = 6
+
+
+# Function to get the memory held by a value in bytes: frames, arrays and
+# buffers, walking into containers and the attributes of objects. Objects
+# already in seen are not counted again (shared ones, cycles).
+def value_bytes(value, seen, depth=MEASURE_DEPTH):
+    if value is None or id(value) in seen or depth < 0:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(value_bytes(item, seen, depth - 1) for pair in list(value.items()) for item in pair)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(value_bytes(item, seen, depth - 1) for item in list(value))
+    if hasattr(value, '__dict__') and not isinstance(value, (type, types.ModuleType, types.FunctionType)):
+        return value_bytes(vars(value), seen, depth - 1)
+    return 0
+
+
+# Function to get the memory held by a snapshot: its frames and everything
+# derived from them so far (rankings, leaderboards, team indexes, ...)
+def snapshot_bytes(snapshot, seen=None):
+    seen = set() if seen is None else seen
+    seen.add(id(snapshot))
+    return (sum(value_bytes(frame, seen) for frame in snapshot.frames.values())
+            + sum(value_bytes(value, seen) for value in snapshot.derived_values()))
+
+
+class SnapshotCache:
+    # Snapshots held in memory by season, least recently read first, within a
+    # memory budget. Sizes are measured from the snapshots themselves and
+    # re-measured whenever one is added and before every scheduled refresh,
+    # as the tables derived from them keep growing them.
+    # Pinned seasons (the season being played, watched seasons) are never
+    # dropped, even if they alone go over the budget.
+
+    def __init__(self, max_bytes=SNAPSHOT_MEMORY_MB * 1e6):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._snapshots = OrderedDict()
+        self._bytes = {}
+        # season -> (snapshot, derived values, bytes) when last measured
+        self._measured = {}
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def __contains__(self, season):
+        return season in self._snapshots
+
+    def seasons(self):
+        with self._lock:
+            return list(self._snapshots)
+
+    # Function to get a season's snapshot, counting the hit or miss and marking it as recently read
+    def get(self, season):
+        with self._lock:
+            snapshot = self._snapshots.get(season)
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._snapshots.move_to_end(season)
+        count('cache_requests', cache='snapshots', result='miss' if snapshot is None else 'hit')
+        return snapshot
+
+    # Function to get a season's snapshot without counting it as read
+    def peek(self, season):
+        return self._snapshots.get(season)
+
+    def pin(self, season):
+        with self._lock:
+            self._pinned.add(season)
+
+    def unpin(self, season):
+        with self._lock:
+            self._pinned.discard(season)
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(self._bytes.values())
+
+    # Function to add (or replace) a season's snapshot, then drop the least
+    # recently read unpinned seasons until the budget holds; returns the dropped seasons
+    def put(self, snapshot):
+        with self._lock:
+            self._snapshots[snapshot.season] = snapshot
+            self._snapshots.move_to_end(snapshot.season)
+        return self.measure(keep=snapshot.season)
+
+    # Function to re-measure every snapshot (derived tables keep growing them)
+    # and drop seasons until the budget holds; returns the dropped seasons
+    def measure(self, keep=None):
+        with self._lock:
+            # Most recently read first, so an object shared by several snapshots
+            # (e.g. an index over every season) counts towards the one dropped last
+            snapshots = list(reversed(self._snapshots.items()))
+        # Measured outside the lock: a builder deriving from a snapshot may be
+        # reading the cache. Snapshots and what's derived from them never change,
+        # so only snapshots with something newly derived are measured again.
+        seen = set()
+        sizes = {}
+        for season, held in snapshots:
+            derived = len(held.derived_values())
+            measured = self._measured.get(season)
+            if measured is None or measured[0] is not held or measured[1] != derived:
+                measured = (held, derived, snapshot_bytes(held, seen))
+                self._measured[season] = measured
+            sizes[season] = measured[2]
+        with self._lock:
+            self._bytes = {season: sizes.get(season, 0) for season in self._snapshots}
+            for season in set(self._measured) - set(self._snapshots):
+                del self._measured[season]
+            dropped = []
+            for season in list(self._snapshots):
+                if sum(self._bytes.values()) <= self.max_bytes:
+                    break
+                if season in self._pinned or season == keep:
+                    continue
+                del self._snapshots[season]
+                del self._bytes[season]
+                del self._measured[season]
+                self.evictions += 1
+                dropped.append(season)
+            sizes = dict(self._bytes)
+        total = sum(sizes.values())
+        for season in dropped:
+            count('cache_evictions', cache='snapshots')
+            set_gauge('snapshot_bytes', None, season=season)
+        for season, size in sizes.items():
+            set_gauge('snapshot_bytes', size, season=season)
+        set_gauge('snapshots_in_memory', len(sizes))
+        set_gauge('snapshot_memory_bytes', total)
+        set_gauge('snapshot_memory_budget_bytes', self.max_bytes)
+        if total > self.max_bytes:
+            logger.warning("Pinned snapshots take %.1f MB, over the %.1f MB budget", total / 1e6, self.max_bytes / 1e6)
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            return {'seasons': len(self._snapshots), 'bytes': sum(self._bytes.values()),
+                    'budget_bytes': self.max_bytes, 'pinned': sorted(self._pinned),
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class SnapshotRefresher:
+    # Keeps the latest Snapshot of every season that has been asked for and
+    # re-pulls them on a schedule from a daemon thread. Readers always get the
+    # current snapshot straight away (stale-while-revalidate).
+    #
+    # With a store, snapshots are loaded from disk on startup and saved after
+    # every refresh, so only a season that was never stored waits for the
+    # network, and finished seasons are served without any network at all.
+    # columns limits which columns of each frame are loaded from the store, and
+    # the snapshots in memory are kept within the cache's memory budget, so
+    # browsing every stored season doesn't grow the process.
+    #
+    # With a shared tier, replicas share their snapshots: the replica that
+    # takes a season's lease is the only one asking euroleague-api about it
+    # and publishes what it got; the others pick that version up from the
+    # shared tier, so upstream calls don't grow with the number of replicas.
+
+    def __init__(self, fetch=fetch_season, store=None, check_round=latest_round,
+                 interval_minutes=REFRESH_INTERVAL_MINUTES, columns=None,
+                 cache=None, shared=None):
+        self.fetch = fetch
+        self.store = store
+        self.shared = shared
+        self.check_round = check_round
+        self.interval_minutes = interval_minutes
+        self.columns = columns
+        self.cache = SnapshotCache() if cache is None else cache
+        # The season being played stays in memory whatever else is browsed
+        self.cache.pin(current_season())
+        self.scheduler = schedule.Scheduler()
+        self._seasons = set()
+        self._season_locks = {}
+        # Seasons being refreshed, season -> Event set when that refresh ends
+        self._refreshing = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._listeners = []
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.scheduler.every(self.interval_minutes).minutes.do(self.refresh_all)
+        self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.scheduler.run_pending()
+            self._stop.wait(1)
+
+    def _season_lock(self, season):
+        with self._lock:
+            return self._season_locks.setdefault(season, threading.Lock())
+
+    def seasons(self):
+        with self._lock:
+            return sorted(self._seasons)
+
+    def peek(self, season):
+        return self.cache.peek(season)
+
+    # Function to call back with every snapshot that gets published (e.g. to warm caches)
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def _publish(self, snapshot, remember_round=True):
+        self._dropped(self.cache.put(snapshot))
+        # Round discovery can start from the round we already have
+        if remember_round and snapshot.standings is not None:
+            round_discovery.remember(snapshot.season, snapshot.round_number, snapshot.standings)
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                logger.exception("Snapshot listener %r failed", listener)
+
+    # Function to stop refreshing seasons the cache dropped; they are loaded again when asked for
+    def _dropped(self, seasons):
+        for season in seasons:
+            with self._lock:
+                self._seasons.discard(season)
+            logger.info("Dropped season %s from memory", season)
+
+    # Function to load a season's newest stored snapshot into memory
+    def _load_stored(self, season):
+        if self.store is None:
+            return None
+        start = time.perf_counter()
+        with timed('load stored'):
+            snapshot = self.store.load(season, columns=self.columns)
+        if snapshot is not None:
+            self._publish(snapshot)
+            logger.info("Loaded stored season %s (round %s) in %.0f ms", season, snapshot.round_number,
+                        (time.perf_counter() - start) * 1000)
+        return snapshot
+
+    # Function to load a season's newest shared snapshot (or a given version) into memory
+    def _load_shared(self, season, version=None):
+        if self.shared is None:
+            return None
+        snapshot = self.shared.load(season, version, columns=self.columns)
+        if snapshot is not None:
+            self._publish(snapshot)
+            logger.info("Loaded shared season %s version %s", season, snapshot.version)
+        return snapshot
+
+    # Function to add a season to the scheduled refreshes, loading its stored snapshot
+    def watch(self, season):
+        with self._lock:
+            self._seasons.add(season)
+        self.cache.pin(season)
+        with self._season_lock(season):
+            if self.cache.peek(season) is None:
+                if self._load_shared(season) is None:
+                    self._load_stored(season)
+
+    # Function to get the current snapshot of a season, never waiting on a
+    # refresh once a first snapshot exists (in memory or on disk)
+    def get(self, season):
+        with self._lock:
+            self._seasons.add(season)
+        snapshot = self.cache.get(season)
+        if snapshot is None:
+            # Cold season: one caller loads it, concurrent callers wait for it
+            with self._season_lock(season):
+                snapshot = self.cache.peek(season)
+                if snapshot is None:
+                    snapshot = self._load_shared(season) or self._load_stored(season)
+                    if snapshot is None:
+                        snapshot = self.refresh(season, raise_errors=True)
+                    elif not snapshot.is_final():
+                        # Only go back to euroleague-api if a newer round was played
+                        self.refresh_async(season, only_if_new_round=True)
+        elif snapshot.age_seconds() > self.interval_minutes * 60 and not snapshot.is_final():
+            # The scheduler is behind (e.g. the thread was just started): serve
+            # the stale snapshot and revalidate in the background
+            self.refresh_async(season)
+        return snapshot
+
+    # Function to pick up a newer snapshot another process (e.g. the worker) saved
+    def _newer_stored(self, season, current):
+        if self.store is None:
+            return None
+        manifest = self.store.latest_manifest(season)
+        if manifest is None or current is None:
+            return None
+        if (manifest['round_number'], manifest['fetched_at']) <= (current.round_number, current.fetched_at.isoformat()):
+            return None
+        return self._load_stored(season)
+
+    # Function to pick up a newer snapshot another replica published to the shared tier
+    def _newer_shared(self, season, current):
+        if self.shared is None:
+            return None
+        manifest = self.shared.manifest(season)
+        if manifest is None:
+            return None
+        if current is not None and (manifest['round_number'], manifest['fetched_at']) <= (
+                current.round_number, current.fetched_at.isoformat()):
+            return None
+        return self._load_shared(season, manifest['version'])
+
+    # Function to pull a season and atomically swap in the new snapshot
+    def refresh(self, season, raise_errors=False, only_if_new_round=False):
+        with self._lock:
+            running = self._refreshing.get(season)
+            if running is None:
+                self._refreshing[season] = threading.Event()
+        if running is not None:
+            if not raise_errors:
+                return self.cache.peek(season)
+            # A caller that needs the season waits for the refresh in progress
+            running.wait()
+            snapshot = self.cache.peek(season)
+            if snapshot is None:
+                raise RuntimeError(f"Season {season} could not be refreshed")
+            return snapshot
+        leased = False
+        try:
+            current = self.cache.peek(season)
+            stored = self._newer_stored(season, current)
+            if stored is not None and stored.age_seconds() < self.interval_minutes * 60:
+                return stored
+
+            if self.shared is not None:
+                current = self._newer_shared(season, current) or current
+                checked = self.shared.seconds_since_checked(season)
+                if current is not None and checked is not None and checked < self.interval_minutes * 60:
+                    # Another replica asked euroleague-api recently
+                    return current
+                leased = self.shared.acquire(season)
+                if not leased:
+                    # Another replica is refreshing: wait for what it publishes
+                    after = None if current is None else (current.round_number, current.fetched_at.isoformat())
+                    manifest = self.shared.wait_for_newer(season, after, WAIT_SECONDS)
+                    if manifest is not None:
+                        return self._load_shared(season, manifest['version']) or current
+                    if current is not None or not raise_errors:
+                        return current
+                    raise RuntimeError(f"Season {season} was not published by the replica refreshing it")
+                # It may have been published while we waited for the lease
+                current = self._newer_shared(season, current) or current
+                checked = self.shared.seconds_since_checked(season)
+                if current is not None and checked is not None and checked < self.interval_minutes * 60:
+                    return current
+
+            if only_if_new_round and current is not None and not current.provisional:
+                new_round = self.check_round(season) > current.round_number
+                if self.shared is not None:
+                    self.shared.mark_checked(season)
+                if not new_round:
+                    return current
+
+            start = time.perf_counter()
+            snapshot = Snapshot.from_season_data(season, self.fetch(season))
+            if snapshot.is_empty():
+                raise RuntimeError(f"euroleague-api is unavailable: {snapshot.errors}")
+            # Keep serving the last good frame of any endpoint that failed this time
+            snapshot.fill_missing_from(self.cache.peek(season))
+            self._publish(snapshot)
+            logger.info("Refreshed season %s (round %s) in %.2fs", season, snapshot.round_number,
+                        time.perf_counter() - start)
+            if self.store is not None:
+                try:
+                    self.store.save(snapshot)
+                except OSError:
+                    logger.exception("Could not store season %s", season)
+            if self.shared is not None:
+                try:
+                    self.shared.publish(snapshot)
+                    self.shared.mark_checked(season)
+                except Exception:
+                    logger.exception("Could not share season %s", season)
+            return snapshot
+        except Exception:
+            if raise_errors:
+                raise
+            logger.exception("Background refresh of season %s failed", season)
+            return self.cache.peek(season)
+        finally:
+            if leased:
+                self.shared.release(season)
+            with self._lock:
+                self._refreshing.pop(season).set()
+
+    # Function to swap in a snapshot changed in memory (e.g. a game that just
+    # ended, see live.py) without asking euroleague-api; change gets the current
+    # snapshot and returns the new one, or None to keep it. Returns the new snapshot.
+    def update(self, season, change):
+        with self._season_lock(season):
+            current = self.cache.peek(season)
+            if current is None:
+                return None
+            snapshot = change(current)
+            if snapshot is None:
+                return None
+            # Standings computed here aren't euroleague-api's, so round discovery doesn't start from them
+            self._publish(snapshot, remember_round=False)
+        return snapshot
+
+    def refresh_async(self, season, only_if_new_round=False):
+        with self._lock:
+            if season in self._refreshing:
+                return
+        threading.Thread(target=self.refresh, args=(season,), kwargs={'only_if_new_round': only_if_new_round},
+                         name=f'refresh-{season}', daemon=True).start()
+
+    def refresh_all(self):
+        self._dropped(self.cache.measure())
+        for season in self.seasons():
+            snapshot = self.cache.peek(season)
+            if snapshot is None or not snapshot.is_final():
+                self.refresh(season)
+
+
+# Function to build the refresher of a process (dashboard, API server or
+# standalone worker), so every one of them fetches and stores snapshots the
+# same way: incremental boxscore ingestion, the snapshot store and the shared
+# tier of $EUROLEAGUE_SHARED_URL (or shared_url). columns only limits what is
+# loaded back into memory (see SnapshotRefresher).
+def make_refresher(columns=None, shared_url=None, **kwargs):
+    shared = shared_from_url() if shared_url is None else shared_from_url(shared_url)
+    return SnapshotRefresher(fetch=make_incremental_fetch(RoundIngestor()), store=SnapshotStore(),
+                             columns=columns, shared=shared, **kwargs)
+
+
+# Standalone worker: keeps the store fresh so dashboard processes only read it
+#
+#   python refresher.py --seasons 2023 2024
+def main():
+    parser = argparse.ArgumentParser(description='Refresh Euroleague season snapshots into the snapshot store')
+    parser.add_argument('--seasons', type=int, nargs='+', required=True)
+    parser.add_argument('--interval', type=float, default=REFRESH_INTERVAL_MINUTES, help='minutes between refreshes')
+    parser.add_argument('--once', action='store_true', help='refresh once and exit')
+    parser.add_argument('--shared', default=None, help='shared tier URL (default: $EUROLEAGUE_SHARED_URL)')
+    args = parser.parse_args()
+
+    refresher = make_refresher(shared_url=args.shared, interval_minutes=args.interval)
+    for season in args.seasons:
+        refresher.watch(season)
+    refresher.refresh_all()
+    if args.once:
+        return
+
+    refresher.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        refresher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import threading
+
+# Euroleague regular season length (the old linear probe assumed the same)
+MAX_ROUNDS = 34
+
+
+# Function to check whether a standings response actually holds a played round
+def has_standings(standings):
+    if standings is None:
+        return False
+    return not getattr(standings, 'empty', False)
+
+
+class RoundDiscovery:
+    # Remembers the latest round found for each season (and the standings
+    # payload of that round) so reruns and refreshes don't start from round 1.
+    # The remembered payload only seeds the search; the round found is always
+    # fetched again, since its standings change while its games are played.
+
+    def __init__(self, max_rounds=MAX_ROUNDS):
+        self.max_rounds = max_rounds
+        self._known = {}
+        self._lock = threading.Lock()
+
+    def known_round(self, season):
+        with self._lock:
+            known = self._known.get(season)
+        return known[0] if known else None
+
+    # Function to seed the search with a round known from elsewhere (e.g. a stored snapshot)
+    def remember(self, season, round_number, standings):
+        with self._lock:
+            known = self._known.get(season)
+            if known is None or known[0] < round_number:
+                self._known[season] = (round_number, standings)
+
+    def forget(self, season=None):
+        with self._lock:
+            if season is None:
+                self._known.clear()
+            else:
+                self._known.pop(season, None)
+
+    # Function to fetch one round, treating errors and empty payloads as "not played yet"
+    def _probe(self, standings_api, season, round_number):
+        try:
+            standings = standings_api.get_standings(season=season, round_number=round_number)
+        except Exception:
+            return None
+        return standings if has_standings(standings) else None
+
+    # Function to find the latest played round and its standings.
+    # Played rounds are always a prefix 1..N, so we gallop upwards from the
+    # newest known round and then binary search the gap:
+    #  - known round, nothing new: 2 requests (the next round, then the known one again)
+    #  - cold start: O(log max_rounds) requests
+    # Callers that only need the round number pass refetch=False (1 request when nothing new).
+    def find_latest_round(self, standings_api, season, refetch=True):
+        with self._lock:
+            known = self._known.get(season)
+
+        # lo is always a round with data (0 = none yet), hi a round without
+        lo, lo_standings = known if known else (0, None)
+        hi = self.max_rounds + 1
+
+        if known:
+            step = 1
+            while lo + step < hi:
+                probe_round = lo + step
+                standings = self._probe(standings_api, season, probe_round)
+                if standings is None:
+                    hi = probe_round
+                    break
+                lo, lo_standings = probe_round, standings
+                step *= 2
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            standings = self._probe(standings_api, season, mid)
+            if standings is None:
+                hi = mid
+            else:
+                lo, lo_standings = mid, standings
+
+        if lo == 0:
+            # Nothing played yet (or the API is down): fall back to round 1
+            # like before, and don't remember anything
+            return 1, standings_api.get_standings(season=season, round_number=1)
+
+        if refetch and known and lo == known[0]:
+            # Nothing newer: refetch the known round, keeping the remembered
+            # payload only if that fails
+            standings = self._probe(standings_api, season, lo)
+            if standings is not None:
+                lo_standings = standings
+
+        with self._lock:
+            self._known[season] = (lo, lo_standings)
+        return lo, lo_standings
+
+
+# Shared instance; module state survives Streamlit reruns
+round_discovery = RoundDiscovery()
+
+
+def find_latest_round(standings_api, season, refetch=True):
+    return round_discovery.find_latest_round(standings_api, season, refetch)
@@ -0,0 +1,168 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from timing import timed
+
+logger = logging.getLogger(__name__)
+
+# Column kinds
+PERCENT = 'percent'    # "52.3%" (or a number) -> float32 52.3
+FLOAT = 'float'        # -> float32
+INT = 'int'            # -> smallest of int16/int32 that fits
+CATEGORY = 'category'  # team codes
+TEXT = 'text'          # left as strings
+
+# The columns the dashboard relies on, per frame. They must be present;
+# every other numeric or percent column is compacted the same way.
+SCHEMAS = {
+    'standings': {
+        'club.tvCode': CATEGORY,
+        'club.abbreviatedName': TEXT,
+        'position': INT,
+        'gamesPlayed': INT,
+        'gamesWon': INT,
+        'gamesLost': INT,
+        'pointsFor': INT,
+        'pointsAgainst': INT,
+        'homeRecord': TEXT,
+        'awayRecord': TEXT,
+    },
+    'team_stats': {
+        'team.tvCodes': CATEGORY,
+        'pointsScored': FLOAT,
+        'twoPointersPercentage': PERCENT,
+        'threePointersPercentage': PERCENT,
+        'threePointersMade': FLOAT,
+        'offensiveRebounds': FLOAT,
+        'defensiveRebounds': FLOAT,
+        'foulsCommited': FLOAT,
+        'foulsDrawn': FLOAT,
+        'assists': FLOAT,
+        'turnovers': FLOAT,
+    },
+    'advanced_team_stats': {
+        'team.tvCodes': CATEGORY,
+        'pointsFromTwoPointersPercentage': PERCENT,
+        'pointsFromThreePointersPercentage': PERCENT,
+        'pointsFromFreeThrowsPercentage': PERCENT,
+    },
+    'player_stats': {
+        'player.name': TEXT,
+        'player.team.tvCodes': CATEGORY,
+        'player.imageUrl': TEXT,
+        'pointsScored': FLOAT,
+        'totalRebounds': FLOAT,
+        'assists': FLOAT,
+        'steals': FLOAT,
+        'pir': FLOAT,
+    },
+    'advanced_player_stats': {
+        'player.name': TEXT,
+        'player.team.tvCodes': CATEGORY,
+        'threePointAttemptsRatio': PERCENT,
+        'twoPointAttemptsRatio': PERCENT,
+        'freeThrowsRate': PERCENT,
+    },
+}
+
+# Columns the dashboard reads from each frame; stored seasons are loaded with
+# only these, the API payloads carry several times as many
+DISPLAY_COLUMNS = {name: list(schema) for name, schema in SCHEMAS.items()}
+DISPLAY_COLUMNS['standings'] += ['last5Form']
+DISPLAY_COLUMNS['advanced_team_stats'] += ['offensiveRating', 'defensiveRating']
+# Boxscore codes and games played, so finished live games can be added to the
+# standings and per-game stats (live.py)
+DISPLAY_COLUMNS['standings'] += ['club.code']
+DISPLAY_COLUMNS['team_stats'] += ['team.code', 'gamesPlayed']
+DISPLAY_COLUMNS['player_stats'] += ['player.code', 'gamesPlayed']
+
+# Other team code columns that are worth storing as categories
+CODE_COLUMNS = ['club.code', 'team.code', 'player.team.code']
+
+PERCENT_PATTERN = r'-?\d+(?:\.\d+)?%'
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def to_percent(column):
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype('float32')
+    return pd.to_numeric(column.astype('string').str.rstrip('%'), errors='coerce').astype('float32')
+
+
+def to_int(column):
+    values = pd.to_numeric(column, errors='coerce')
+    if values.isna().any():
+        # Missing values can't live in a plain int column
+        return values.astype('float32')
+    if values.empty or (values.min() >= np.iinfo(np.int16).min and values.max() <= np.iinfo(np.int16).max):
+        return values.astype('int16')
+    return values.astype('int32')
+
+
+def is_percent_column(column):
+    if column.dtype != object and not pd.api.types.is_string_dtype(column):
+        return False
+    values = column.dropna()
+    return not values.empty and values.astype(str).str.fullmatch(PERCENT_PATTERN).all()
+
+
+COERCE = {
+    PERCENT: to_percent,
+    FLOAT: lambda column: pd.to_numeric(column, errors='coerce').astype('float32'),
+    INT: to_int,
+    CATEGORY: lambda column: column.astype('category'),
+    TEXT: lambda column: column,
+}
+
+
+# Function to check a frame against its schema and compact its dtypes.
+# Running it on an already normalized frame is a no-op, so stored snapshots
+# can go through it again.
+def normalize_frame(name, frame):
+    schema = SCHEMAS.get(name, {})
+    missing = [column for column in schema if column not in frame]
+    if missing:
+        raise SchemaError(f"{name} is missing columns {missing}")
+
+    frame = frame.copy()
+    for column in frame.columns:
+        kind = schema.get(column)
+        if kind is None:
+            values = frame[column]
+            if column in CODE_COLUMNS:
+                kind = CATEGORY
+            elif pd.api.types.is_bool_dtype(values):
+                continue
+            elif pd.api.types.is_integer_dtype(values):
+                kind = INT
+            elif pd.api.types.is_float_dtype(values):
+                kind = FLOAT
+            elif is_percent_column(values):
+                kind = PERCENT
+            else:
+                continue
+        frame[column] = COERCE[kind](frame[column])
+    return frame
+
+
+# Function to normalize every frame of a season; a frame that doesn't match
+# its schema is dropped (None) and reported in errors like a failed fetch
+@timed('normalize')
+def normalize_frames(frames, errors):
+    normalized = {}
+    for name, frame in frames.items():
+        if frame is None:
+            normalized[name] = None
+            continue
+        try:
+            normalized[name] = normalize_frame(name, frame)
+        except SchemaError as exc:
+            logger.error("Dropping %s: %s", name, exc)
+            errors[name] = exc
+            normalized[name] = None
+    return normalized
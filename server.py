@@ -0,0 +1,376 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+import pyarrow as pa
+
+from analytics import (get_scoring_distribution, get_shot_distribution, get_team_kpis, get_team_name, get_teams,
+                       get_top_teams)
+from exports import CONTENT_TYPES, EXPORT_TABLES, STREAM_BYTES, ExportCache, ExportUnavailable, file_name
+from leaderboards import LEADERBOARD_STATS, snapshot_leaderboards
+from partitions import snapshot_team_index
+from rankings import snapshot_rankings
+from refresher import make_refresher
+from timing import prometheus_text
+
+logger = logging.getLogger(__name__)
+
+JSON_TYPE = 'application/json'
+METRICS_TYPE = 'text/plain; version=0.0.4'
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+# Clients keep responses but revalidate them (If-None-Match) before reuse
+CACHE_CONTROL = 'no-cache'
+
+
+class NotFound(Exception):
+    pass
+
+
+class Unavailable(Exception):
+    pass
+
+
+class Response:
+    # One encoded result: the body, its gzipped copy and an ETag that changes
+    # with the snapshot, built once and served to every request after that.
+    # The gzipped copy is other bytes, so it has its own ETag ("...-gzip").
+
+    def __init__(self, body, content_type, etag):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+        self.gzipped_etag = f'{etag[:-1]}-gzip"'
+
+
+# Function to require one of a snapshot's frames
+def frame(snapshot, name):
+    data = getattr(snapshot, name)
+    if data is None:
+        raise Unavailable(f"{name} of season {snapshot.season} could not be fetched")
+    return data
+
+
+def standings_table(snapshot):
+    return frame(snapshot, 'standings')[['position', 'club.tvCode', 'club.abbreviatedName', 'gamesPlayed',
+                                         'gamesWon', 'gamesLost', 'pointsFor', 'pointsAgainst']]
+
+
+def teams_table(snapshot):
+    standings = snapshot.standings
+    if standings is None and snapshot.team_stats is None:
+        frame(snapshot, 'player_stats')
+    codes = get_teams(standings, snapshot.team_stats, snapshot.player_stats)
+    return pd.DataFrame({'team': list(codes), 'name': [get_team_name(standings, code) for code in codes]})
+
+
+def top_teams_table(snapshot):
+    top_teams = get_top_teams(frame(snapshot, 'team_stats'), snapshot_rankings(snapshot))
+    return pd.DataFrame([{'metric': metric, 'value': float(value), 'team': team}
+                         for metric, (value, team) in top_teams.items()])
+
+
+def kpis_table(snapshot, team):
+    team_stats = frame(snapshot, 'team_stats')
+    rankings = snapshot_rankings(snapshot)
+    if team not in rankings.positions:
+        raise NotFound(f"unknown team {team}")
+    return get_team_kpis(team_stats, team, rankings).to_frame().T.reset_index(drop=True).infer_objects()
+
+
+# Every configured leaderboard of a team, best first: stat, rank, player, value
+def top_players_table(snapshot, team):
+    rows = []
+    for frame_name, stats in LEADERBOARD_STATS.items():
+        if getattr(snapshot, frame_name) is None:
+            continue
+        leaderboards = snapshot_leaderboards(snapshot, frame_name)
+        for stat in stats:
+            players = leaderboards.top(team, stat)
+            rows.append(pd.DataFrame({'stat': stat, 'rank': range(1, len(players) + 1),
+                                      'player': players['player.name'].to_numpy(),
+                                      'value': players[stat].astype('float64').to_numpy()}))
+    if not rows:
+        raise Unavailable(f"player stats of season {snapshot.season} could not be fetched")
+    return pd.concat(rows, ignore_index=True)
+
+
+def scoring_distribution_table(snapshot, team):
+    players_data = frame(snapshot, 'player_stats')
+    team_index = snapshot_team_index(snapshot, 'player_stats')
+    return get_scoring_distribution(players_data, team, team_index).rename(columns={'player.name': 'player'})
+
+
+def shot_distribution_table(snapshot, team):
+    advanced_team_stats = frame(snapshot, 'advanced_team_stats')
+    # Teams come from the standings; one can be missing from the advanced stats
+    if not (advanced_team_stats['team.tvCodes'] == team).any():
+        raise NotFound(f"no advanced stats of team {team}")
+    distribution = get_shot_distribution(advanced_team_stats, team)
+    return pd.DataFrame({'shot': list(distribution), 'percentage': list(distribution.values())})
+
+
+# path pattern -> function of (snapshot, **path parameters) returning a DataFrame
+ROUTES = [
+    (r'/seasons/(?P<season>\d{4})/standings', standings_table),
+    (r'/seasons/(?P<season>\d{4})/teams', teams_table),
+    (r'/seasons/(?P<season>\d{4})/top-teams', top_teams_table),
+    (r'/seasons/(?P<season>\d{4})/teams/(?P<team>[\w-]+)/kpis', kpis_table),
+    (r'/seasons/(?P<season>\d{4})/teams/(?P<team>[\w-]+)/top-players', top_players_table),
+    (r'/seasons/(?P<season>\d{4})/teams/(?P<team>[\w-]+)/scoring-distribution', scoring_distribution_table),
+    (r'/seasons/(?P<season>\d{4})/teams/(?P<team>[\w-]+)/shot-distribution', shot_distribution_table),
+]
+ROUTES = [(re.compile(pattern), builder) for pattern, builder in ROUTES]
+
+
+def to_json(snapshot, table):
+    # float32 columns would otherwise print as 52.2999992371
+    records = json.loads(table.to_json(orient='records', double_precision=4))
+    return json.dumps({'season': snapshot.season, 'round_number': snapshot.round_number,
+                       'version': snapshot.version, 'data': records}).encode('utf-8')
+
+
+def to_arrow(snapshot, table):
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    arrow_table = arrow_table.replace_schema_metadata({'season': str(snapshot.season),
+                                                       'round_number': str(snapshot.round_number),
+                                                       'version': snapshot.version})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {'json': (to_json, JSON_TYPE), 'arrow': (to_arrow, ARROW_TYPE)}
+
+# Whole tables of a stored season as files: /seasons/2024/exports/players.xlsx
+EXPORT_ROUTE = re.compile(r'/seasons/(?P<season>\d{4})/exports/(?P<table>\w+)\.(?P<fmt>csv|parquet|xlsx)')
+
+
+class AnalyticsService:
+    # Resolves API paths to encoded responses. Every response is built once per
+    # snapshot (memoized with Snapshot.derive) and its ETag is the snapshot
+    # version, so after a refresh clients get the new numbers and until then a
+    # 304. The first request that sees a new snapshot warms all its responses
+    # in the background.
+
+    def __init__(self, refresher, seasons=None, exports=None):
+        self.refresher = refresher
+        self.seasons = set(seasons) if seasons else None
+        if exports is None and refresher.store is not None:
+            exports = ExportCache(refresher.store)
+        self.exports = exports
+
+    def snapshot(self, season):
+        if self.seasons is not None and season not in self.seasons:
+            raise NotFound(f"season {season} is not served")
+        try:
+            snapshot = self.refresher.get(season)
+        except RuntimeError as exc:
+            raise Unavailable(str(exc)) from exc
+        snapshot.derive('api_warmed', lambda s: threading.Thread(target=self.warm, args=(s,), daemon=True,
+                                                                  name=f'warm-api-{s.season}').start())
+        return snapshot
+
+    # Function to get the response of a path in a format ('json' or 'arrow')
+    def response(self, path, fmt='json'):
+        if fmt not in ENCODERS:
+            raise NotFound(f"unknown format {fmt}")
+        for pattern, builder in ROUTES:
+            match = pattern.fullmatch(path.rstrip('/'))
+            if match is not None:
+                params = match.groupdict()
+                snapshot = self.snapshot(int(params.pop('season')))
+                if 'team' in params and params['team'] not in self.teams(snapshot):
+                    raise NotFound(f"unknown team {params['team']}")
+                return snapshot.derive(('api', path.rstrip('/'), fmt),
+                                       lambda s: self.encode(s, builder(s, **params), fmt))
+        raise NotFound(f"no route for {path}")
+
+    # Function to get the file of an export path and its snapshot version, written once per version
+    def export(self, season, table, fmt):
+        if table not in EXPORT_TABLES or (self.seasons is not None and season not in self.seasons):
+            raise NotFound(f"no export {table} of season {season}")
+        if self.exports is None:
+            raise Unavailable("exports need a snapshot store")
+        try:
+            export_path = self.exports.get(season, table, fmt)
+        except ExportUnavailable as exc:
+            raise Unavailable(str(exc)) from exc
+        return export_path, os.path.basename(os.path.dirname(export_path))
+
+    def teams(self, snapshot):
+        return snapshot.derive('api_teams', lambda s: set(teams_table(s)['team']))
+
+    def encode(self, snapshot, table, fmt):
+        encoder, content_type = ENCODERS[fmt]
+        return Response(encoder(snapshot, table), content_type, f'"{snapshot.version}-{fmt}"')
+
+    # Function to build every response of a snapshot ahead of the first requests for them
+    def warm(self, snapshot):
+        paths = [f'/seasons/{snapshot.season}/{name}' for name in ['standings', 'teams', 'top-teams']]
+        try:
+            teams = self.teams(snapshot)
+        except Unavailable:
+            teams = []
+        for team in teams:
+            paths += [f'/seasons/{snapshot.season}/teams/{team}/{name}'
+                      for name in ['kpis', 'top-players', 'scoring-distribution', 'shot-distribution']]
+        for path in paths:
+            for fmt in ENCODERS:
+                try:
+                    self.response(path, fmt)
+                except (NotFound, Unavailable):
+                    pass
+                except Exception:
+                    logger.exception("Could not build %s (%s)", path, fmt)
+
+
+class AnalyticsHandler(BaseHTTPRequestHandler):
+    # GET /seasons/2024/teams/PAN/kpis?format=arrow (or Accept: application/vnd.apache.arrow.stream)
+    # GET /metrics for stage timings, cache counters and snapshot memory (Prometheus text)
+    # GET /seasons/2024/exports/players.xlsx (standings, team_kpis or players as csv, parquet or xlsx)
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, keep-alive
+    # clients wait ~40 ms on delayed ACKs for every response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') == '/metrics':
+            return self.send_metrics()
+        export = EXPORT_ROUTE.fullmatch(url.path.rstrip('/'))
+        if export is not None:
+            return self.send_export(int(export['season']), export['table'], export['fmt'])
+        fmt = parse_qs(url.query).get('format', [None])[0]
+        if fmt is None:
+            fmt = 'arrow' if ARROW_TYPE in self.headers.get('Accept', '') else 'json'
+        try:
+            response = self.server.service.response(url.path, fmt)
+        except NotFound as exc:
+            return self.send_error_json(404, str(exc))
+        except Unavailable as exc:
+            return self.send_error_json(503, str(exc))
+        except Exception:
+            logger.exception("Could not serve %s", self.path)
+            return self.send_error_json(500, 'internal error')
+
+        gzipped = response.gzipped is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        body, etag = (response.gzipped, response.gzipped_etag) if gzipped else (response.body, response.etag)
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', CACHE_CONTROL)
+            self.send_header('Vary', 'Accept, Accept-Encoding')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Type', response.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', CACHE_CONTROL)
+        self.send_header('Vary', 'Accept, Accept-Encoding')
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Exports are streamed from their file in blocks, never read into memory whole
+    def send_export(self, season, table, fmt):
+        try:
+            export_path, version = self.server.service.export(season, table, fmt)
+        except NotFound as exc:
+            return self.send_error_json(404, str(exc))
+        except Unavailable as exc:
+            return self.send_error_json(503, str(exc))
+        except Exception:
+            logger.exception("Could not export %s", self.path)
+            return self.send_error_json(500, 'internal error')
+
+        etag = f'"{version}"'
+        if etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        with open(export_path, 'rb') as file:
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPES[fmt])
+            self.send_header('Content-Length', str(os.fstat(file.fileno()).st_size))
+            self.send_header('Content-Disposition', f'attachment; filename="{file_name(season, table, fmt, version)}"')
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', CACHE_CONTROL)
+            self.end_headers()
+            shutil.copyfileobj(file, self.wfile, STREAM_BYTES)
+
+    def send_metrics(self):
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', METRICS_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', JSON_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+# Function to create (without starting) the API server for a service
+def make_server(service, host='127.0.0.1', port=8000):
+    server = ThreadingHTTPServer((host, port), AnalyticsHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+# Serves the dashboard's numbers without a browser session:
+#
+#   python server.py --seasons 2023 2024 --port 8000
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Euroleague dashboard analytics as JSON and Arrow')
+    parser.add_argument('--seasons', type=int, nargs='+', required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    refresher = make_refresher()
+    for season in args.seasons:
+        refresher.watch(season)
+    refresher.start()
+
+    server = make_server(AnalyticsService(refresher, args.seasons), args.host, args.port)
+    logger.info("Serving seasons %s on http://%s:%s", args.seasons, args.host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        refresher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pyarrow as pa
+
+from snapshot import Snapshot
+from timing import count, timed
+
+logger = logging.getLogger(__name__)
+
+# Where replicas share snapshots: a directory every replica mounts, or
+# redis://host:port/db for any Redis-compatible server. Unset: every replica
+# refreshes from euroleague-api on its own.
+SHARED_URL = os.environ.get('EUROLEAGUE_SHARED_URL', '')
+
+# Seconds a refresh lease is held before another replica may take it over
+# (a replica that died mid-refresh only blocks the others this long)
+LEASE_SECONDS = 120
+
+# Seconds a replica that didn't get the lease waits for the holder's snapshot
+WAIT_SECONDS = 60
+POLL_SECONDS = 0.25
+
+# Versions kept per season; older ones are deleted after each publish
+KEEP_VERSIONS = 3
+
+
+class DirectoryBackend:
+    # Keys are files under root, e.g. a volume every replica mounts. Values
+    # are written to a temporary file and renamed into place, and read back as
+    # memory maps, so readers share the page cache instead of copying.
+    # A lease is a file created with O_EXCL holding its owner and expiry.
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def get(self, key):
+        try:
+            with pa.memory_map(self._path(key)) as source:
+                return source.read_buffer()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _read_lease(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Being written right now
+            return {'owner': None, 'expires': time.time() + LEASE_SECONDS}
+
+    def acquire(self, key, owner, seconds):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                lease = self._read_lease(path)
+                if lease is not None and lease['expires'] > time.time():
+                    return False
+                # Expired: move it aside (only one replica's rename succeeds)
+                # and try again. If someone took it over in between, their
+                # fresh lease is put back.
+                stale_path = f'{path}.{uuid.uuid4().hex}.stale'
+                try:
+                    os.rename(path, stale_path)
+                except FileNotFoundError:
+                    continue
+                lease = self._read_lease(stale_path)
+                if lease is not None and lease['expires'] > time.time():
+                    try:
+                        os.link(stale_path, path)
+                    except FileExistsError:
+                        pass
+                    os.remove(stale_path)
+                    return False
+                os.remove(stale_path)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'owner': owner, 'expires': time.time() + seconds}, f)
+            return True
+        return False
+
+    def holder(self, key):
+        lease = self._read_lease(self._path(key))
+        if lease is None or lease['expires'] <= time.time():
+            return None
+        return lease['owner']
+
+    def release(self, key, owner):
+        lease = self._read_lease(self._path(key))
+        if lease is not None and lease['owner'] == owner:
+            self.delete(key)
+
+
+# Deletes the lease only if this replica still holds it, in one step
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    # Keys in any Redis-compatible server (Redis, Valkey, KeyDB, ...). Values
+    # come back as bytes and are wrapped, not copied, into Arrow buffers.
+    # A lease is SET NX with an expiry.
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(f"{url} needs the redis package (pip install redis)") from None
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        data = self.client.get(key)
+        return None if data is None else pa.py_buffer(data)
+
+    def put(self, key, data):
+        self.client.set(key, data)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def acquire(self, key, owner, seconds):
+        return bool(self.client.set(key, owner, nx=True, ex=seconds))
+
+    def holder(self, key):
+        owner = self.client.get(key)
+        return None if owner is None else owner.decode()
+
+    def release(self, key, owner):
+        self.client.eval(RELEASE_SCRIPT, 1, key, owner)
+
+
+class MemoryBackend:
+    # In-process stand-in for the shared backends: replicas sharing one
+    # MemoryBackend (threads of a benchmark or a test) behave like replicas
+    # sharing a directory or a Redis server.
+
+    def __init__(self):
+        self._values = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._values.get(key)
+        return None if data is None else pa.py_buffer(data)
+
+    def put(self, key, data):
+        with self._lock:
+            self._values[key] = bytes(data)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def acquire(self, key, owner, seconds):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] > time.monotonic():
+                return False
+            self._leases[key] = (owner, time.monotonic() + seconds)
+            return True
+
+    def holder(self, key):
+        with self._lock:
+            lease = self._leases.get(key)
+        if lease is None or lease[1] <= time.monotonic():
+            return None
+        return lease[0]
+
+    def release(self, key, owner):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == owner:
+                del self._leases[key]
+
+
+# Function to pick the backend of a shared URL: redis:// (or rediss://), memory://, or a directory
+def make_backend(url):
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    if url == 'memory://':
+        return MemoryBackend()
+    return DirectoryBackend(url[len('file://'):] if url.startswith('file://') else url)
+
+
+# Function to serialize a frame as an Arrow IPC file. Object columns pyarrow
+# can't type (mixed values from the JSON payloads) are stored as strings.
+def frame_to_arrow(frame):
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+    except (TypeError, ValueError) as exc:
+        logger.warning("Sharing mixed-type columns as strings (%s)", exc)
+        frame = frame.copy()
+        for column in frame.columns[frame.dtypes == object]:
+            frame[column] = frame[column].map(lambda value: value if value is None else str(value))
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+# Function to read a frame back from an Arrow IPC buffer; the Arrow table
+# points into the buffer (no copy), and only the wanted columns are converted
+def arrow_to_frame(buffer, columns=None):
+    table = pa.ipc.open_file(buffer).read_all()
+    if columns is not None:
+        table = table.select([column for column in columns if column in table.column_names])
+    return table.to_pandas(split_blocks=True)
+
+
+class SharedSnapshots:
+    # The snapshot tier shared by every replica. Keys:
+    #
+    #   season=2024/2024-r20-20250301120000/standings.arrow   <- one per frame
+    #   season=2024/2024-r20-20250301120000/manifest
+    #   season=2024/latest      <- manifest of the newest version
+    #   season=2024/checked     <- when euroleague-api was last asked about the season
+    #   season=2024/lease       <- held by the replica refreshing the season
+    #
+    # A version's frames and manifest are written before latest points at it,
+    # so readers never see half a snapshot. A version is never modified, so
+    # any of the last keep_versions can be fetched by version.
+
+    def __init__(self, backend, lease_seconds=LEASE_SECONDS, keep_versions=KEEP_VERSIONS):
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self.keep_versions = keep_versions
+        self.owner = f'{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+    def _key(self, season, *parts):
+        return '/'.join([f'season={season}', *parts])
+
+    def _read_json(self, key):
+        data = self.backend.get(key)
+        return None if data is None else json.loads(data.to_pybytes())
+
+    def _write_json(self, key, data):
+        self.backend.put(key, json.dumps(data).encode('utf-8'))
+
+    # Function to get the manifest of a season's newest version, or of a given version
+    def manifest(self, season, version=None):
+        if version is None:
+            return self._read_json(self._key(season, 'latest'))
+        return self._read_json(self._key(season, version, 'manifest'))
+
+    # Function to compare manifests by (round, fetched_at): is `manifest` at least as new as `latest`
+    def _not_older(self, manifest, latest):
+        return latest is None or (latest['round_number'], latest['fetched_at']) <= (
+            manifest['round_number'], manifest['fetched_at'])
+
+    # Function to publish a snapshot as the season's newest version; None (and
+    # nothing written) when the season already has a newer one
+    def publish(self, snapshot):
+        version = snapshot.version
+        ordering = {'round_number': snapshot.round_number, 'fetched_at': snapshot.fetched_at.isoformat()}
+        if not self._not_older(ordering, self.manifest(snapshot.season)):
+            logger.info("Season %s version %s not published, the shared tier has a newer one",
+                        snapshot.season, version)
+            return None
+        frames = {}
+        with timed('shared publish'):
+            for name, frame in snapshot.frames.items():
+                if frame is None:
+                    continue
+                frames[name] = self._key(snapshot.season, version, f'{name}.arrow')
+                self.backend.put(frames[name], frame_to_arrow(frame))
+            latest = self.manifest(snapshot.season)
+            versions = [] if latest is None else [old for old in latest['versions'] if old != version]
+            kept = (versions + [version])[-self.keep_versions:]
+            manifest = {
+                'season': snapshot.season,
+                'round_number': snapshot.round_number,
+                'fetched_at': ordering['fetched_at'],
+                'version': version,
+                'frames': frames,
+                'errors': {name: str(error) for name, error in snapshot.errors.items()},
+                'versions': kept,
+            }
+            self._write_json(self._key(snapshot.season, version, 'manifest'), manifest)
+            # Only move the season pointer forwards; a version another replica
+            # overtook while it was written would never be read, so it goes
+            if not self._not_older(manifest, latest):
+                self._delete_version(snapshot.season, version)
+                logger.info("Season %s version %s not published, the shared tier got a newer one",
+                            snapshot.season, version)
+                return None
+            self._write_json(self._key(snapshot.season, 'latest'), manifest)
+            for old in versions:
+                if old not in kept:
+                    self._delete_version(snapshot.season, old)
+        logger.info("Published season %s version %s to the shared tier", snapshot.season, version)
+        return manifest
+
+    def _delete_version(self, season, version):
+        manifest = self.manifest(season, version)
+        if manifest is None:
+            return
+        self.backend.delete(self._key(season, version, 'manifest'))
+        for key in manifest['frames'].values():
+            self.backend.delete(key)
+
+    # Function to load a season's newest snapshot, or a given version; columns
+    # optionally limits each frame to the listed columns
+    def load(self, season, version=None, columns=None):
+        manifest = self.manifest(season, version)
+        if manifest is None:
+            return None
+        frames = {}
+        with timed('shared load'):
+            for name, key in manifest['frames'].items():
+                buffer = self.backend.get(key)
+                if buffer is None:
+                    # Deleted between reading the manifest and the frames
+                    logger.warning("Shared version %s of season %s disappeared while loading",
+                                   manifest['version'], season)
+                    return None
+                frames[name] = arrow_to_frame(buffer, None if columns is None else columns.get(name))
+        count('cache_requests', cache='shared', result='hit')
+        return Snapshot(manifest['season'], manifest['round_number'], frames,
+                        fetched_at=datetime.fromisoformat(manifest['fetched_at']),
+                        errors=dict(manifest['errors']))
+
+    # Function to take the season's refresh lease; True if this replica got it
+    def acquire(self, season):
+        return self.backend.acquire(self._key(season, 'lease'), self.owner, self.lease_seconds)
+
+    def release(self, season):
+        self.backend.release(self._key(season, 'lease'), self.owner)
+
+    def is_leased(self, season):
+        return self.backend.holder(self._key(season, 'lease')) is not None
+
+    # Function to record that euroleague-api was just asked about a season
+    # (whether or not there was anything new to publish)
+    def mark_checked(self, season):
+        self._write_json(self._key(season, 'checked'), {'at': datetime.now(timezone.utc).isoformat(),
+                                                        'by': self.owner})
+
+    def seconds_since_checked(self, season):
+        checked = self._read_json(self._key(season, 'checked'))
+        if checked is None:
+            return None
+        return (datetime.now(timezone.utc) - datetime.fromisoformat(checked['at'])).total_seconds()
+
+    # Function to wait while another replica holds the lease for a manifest
+    # newer than (round, fetched_at) `after`; None if the holder published nothing
+    def wait_for_newer(self, season, after, timeout=WAIT_SECONDS):
+        deadline = time.monotonic() + timeout
+        while True:
+            manifest = self.manifest(season)
+            if manifest is not None and (after is None or (manifest['round_number'], manifest['fetched_at']) > after):
+                return manifest
+            if not self.is_leased(season) or time.monotonic() > deadline:
+                return None
+            time.sleep(POLL_SECONDS)
+
+
+# Function to get the shared tier configured by EUROLEAGUE_SHARED_URL (None when unset)
+def shared_from_url(url=SHARED_URL):
+    if not url:
+        return None
+    return SharedSnapshots(make_backend(url))
@@ -0,0 +1,217 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from schema import DISPLAY_COLUMNS
+from store import SnapshotStore
+
+# Per-game numbers the vectors are built from, per frame. Columns a season
+# doesn't have count as league average for everyone, so older seasons stay comparable.
+SIMILARITY_FEATURES = {
+    'player_stats': ['minutesPlayed', 'pointsScored', 'offensiveRebounds', 'defensiveRebounds', 'assists',
+                     'steals', 'turnovers', 'blocks', 'pir'],
+    'advanced_player_stats': ['trueShootingPercentage', 'usage', 'assistsRatio', 'turnoversRatio',
+                              'offensiveReboundsPercentage', 'defensiveReboundsPercentage',
+                              'threePointAttemptsRatio', 'twoPointAttemptsRatio', 'freeThrowsRate'],
+}
+
+# How a player row is matched between the two frames and named in results
+KEY_COLUMNS = ['player.name', 'player.team.tvCodes']
+
+# Players with fewer games are left out; their averages are mostly noise
+MIN_GAMES = 3
+
+# The columns stored seasons are read with: what the dashboard shows (loading
+# validates it) plus the features, nothing else is loaded
+SIMILARITY_COLUMNS = {name: columns + [column for column in ['gamesPlayed'] + SIMILARITY_FEATURES.get(name, [])
+                                       if column not in columns]
+                      for name, columns in DISPLAY_COLUMNS.items()}
+
+FEATURE_NAMES = [feature for features in SIMILARITY_FEATURES.values() for feature in features]
+
+
+# Function to build a season's unit-length feature vectors: every feature is
+# standardized within the season (so eras with other scoring levels compare),
+# then each row is scaled to length 1 so a dot product is the cosine similarity.
+# Returns (labels, vectors) or None when the season has no player frames.
+def season_vectors(season, player_stats, advanced_player_stats):
+    if player_stats is None or advanced_player_stats is None:
+        return None
+    traditional = player_stats.drop_duplicates(KEY_COLUMNS)
+    advanced = advanced_player_stats.drop_duplicates(KEY_COLUMNS)
+    advanced = advanced[[column for column in advanced.columns
+                         if column in KEY_COLUMNS or column in SIMILARITY_FEATURES['advanced_player_stats']]]
+    players = traditional.merge(advanced, on=KEY_COLUMNS, how='inner', suffixes=('', '.advanced'))
+    if 'gamesPlayed' in players:
+        players = players[pd.to_numeric(players['gamesPlayed'], errors='coerce').fillna(0) >= MIN_GAMES]
+    if players.empty:
+        return None
+
+    values = np.full((len(players), len(FEATURE_NAMES)), np.nan)
+    for i, feature in enumerate(FEATURE_NAMES):
+        if feature in players:
+            values[:, i] = pd.to_numeric(players[feature], errors='coerce').to_numpy(dtype='float64')
+    known = ~np.isnan(values).all(axis=0)
+    mean = np.zeros(len(FEATURE_NAMES))
+    std = np.ones(len(FEATURE_NAMES))
+    mean[known] = np.nanmean(values[:, known], axis=0)
+    std[known] = np.nanstd(values[:, known], axis=0)
+    std[std == 0] = 1
+    vectors = np.nan_to_num((values - mean) / std)
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = np.divide(vectors, lengths, out=np.zeros_like(vectors), where=lengths > 0)
+
+    labels = pd.DataFrame({
+        'Season': np.full(len(players), season, dtype=np.int16),
+        'player.name': players['player.name'].astype(str).to_numpy(),
+        'player.team.tvCodes': players['player.team.tvCodes'].astype(str).to_numpy(),
+    })
+    return labels, vectors.astype(np.float32)
+
+
+class SimilarityIndex:
+    # Unit-length feature vectors of every player of every indexed season,
+    # stacked into one float32 matrix. The most similar players to one are a
+    # single matrix-vector product (cosine similarity) and an argpartition,
+    # milliseconds even over every stored season.
+    #
+    # Each season is a block tagged with the snapshot version it was built
+    # from; update() only rebuilds the blocks whose season got a new
+    # snapshot (a new round), the other seasons are reused as they are.
+    # Blocks are views into the matrix, so vectors are held once.
+
+    def __init__(self):
+        self.blocks = {}  # season -> {'version', 'labels', 'vectors'}
+        # (labels, matrix, positions): player rows, their vectors, and
+        # (season, name, team) -> row; replaced as a whole so readers need no lock
+        self._view = (pd.DataFrame(columns=['Season'] + KEY_COLUMNS),
+                      np.zeros((0, len(FEATURE_NAMES)), dtype=np.float32), {})
+        self._lock = threading.Lock()
+
+    # Function to replace a season's block with the vectors of a snapshot, unless
+    # it was built from this very snapshot; returns whether the index changed
+    def update(self, snapshot):
+        with self._lock:
+            block = self.blocks.get(snapshot.season)
+            if block is not None and block['version'] == snapshot.version:
+                return False
+            built = season_vectors(snapshot.season, snapshot.player_stats, snapshot.advanced_player_stats)
+            if built is None:
+                return False
+            labels, vectors = built
+            self.blocks[snapshot.season] = {'version': snapshot.version, 'labels': labels, 'vectors': vectors}
+            self._assemble()
+            return True
+
+    # Function to bring the index up to date with every season in a snapshot store:
+    # only seasons whose newest stored snapshot isn't indexed yet are read, and only
+    # the feature columns of those
+    def sync(self, store):
+        changed = 0
+        for season in store.seasons():
+            manifest = store.latest_manifest(season)
+            block = self.blocks.get(season)
+            if manifest is None or (block is not None and block['version'] == stored_version(manifest)):
+                continue
+            snapshot = store.load(season, columns=SIMILARITY_COLUMNS)
+            if snapshot is not None:
+                changed += self.update(snapshot)
+        return changed
+
+    # Function to stack the blocks (newest season first) into the matrix and
+    # point the blocks at their rows of it
+    def _assemble(self):
+        seasons = sorted(self.blocks, reverse=True)
+        labels = [self.blocks[season]['labels'] for season in seasons]
+        matrix = np.concatenate([self.blocks[season]['vectors'] for season in seasons])
+        start = 0
+        for season in seasons:
+            stop = start + len(self.blocks[season]['labels'])
+            self.blocks[season]['vectors'] = matrix[start:stop]
+            start = stop
+        labels = pd.concat(labels, ignore_index=True)
+        positions = {key: row for row, key in enumerate(zip(labels['Season'].tolist(), labels['player.name'],
+                                                            labels['player.team.tvCodes']))}
+        self._view = (labels, matrix, positions)
+
+    @property
+    def labels(self):
+        return self._view[0]
+
+    @property
+    def matrix(self):
+        return self._view[1]
+
+    def players(self, season, team=None):
+        labels = self.labels
+        rows = labels[labels['Season'] == season]
+        if team is not None:
+            rows = rows[rows['player.team.tvCodes'] == team]
+        return sorted(rows['player.name'])
+
+    # Function to find the k players most similar to one (excluding themselves),
+    # in the given seasons or all of them; None if the player isn't indexed
+    def most_similar(self, season, name, team, k=10, seasons=None):
+        labels, matrix, positions = self._view
+        row = positions.get((season, name, team))
+        if row is None:
+            return None
+        scores = matrix @ matrix[row]
+        scores[row] = -np.inf
+        if seasons is not None:
+            scores[~labels['Season'].isin(seasons).to_numpy()] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return labels.iloc[:0].assign(similarity=np.float32())
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return labels.iloc[top].assign(similarity=scores[top]).reset_index(drop=True)
+
+    # Function to report what the index holds and its memory footprint in bytes
+    def memory_usage(self):
+        return {
+            'seasons': len(self.blocks),
+            'players': len(self.labels),
+            'features': self.matrix.shape[1],
+            'vectors_bytes': self.matrix.nbytes,
+            'labels_bytes': int(self.labels.memory_usage(deep=True).sum()),
+        }
+
+
+# Function to check whether a snapshot holds every column the vectors are built
+# from; snapshots loaded for display only have the dashboard's columns
+def has_similarity_columns(snapshot):
+    for name in SIMILARITY_FEATURES:
+        frame = getattr(snapshot, name)
+        if frame is None or not set(SIMILARITY_COLUMNS[name]) <= set(frame.columns):
+            return False
+    return True
+
+
+# Function to get the version of a stored snapshot without loading it (same as Snapshot.version)
+def stored_version(manifest):
+    return f"{manifest['season']}-r{manifest['round_number']}-{manifest['version']}"
+
+
+# Module-level index shared by every session of the server process
+similarity_index = SimilarityIndex()
+
+
+# Function to get the index up to date with a snapshot and every stored season,
+# checked once per snapshot
+def snapshot_similarity(snapshot, store=None, index=None):
+    index = index or similarity_index
+
+    def build(snapshot):
+        snapshot_store = store or SnapshotStore()
+        index.sync(snapshot_store)
+        if has_similarity_columns(snapshot):
+            index.update(snapshot)
+        else:
+            # Read the feature columns of this very version from the store instead
+            stored = snapshot_store.load(snapshot.season, snapshot.round_number, columns=SIMILARITY_COLUMNS)
+            if stored is not None and stored.version == snapshot.version:
+                index.update(stored)
+        return index
+    return snapshot.derive('similarity', build)
@@ -0,0 +1,217 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from matchups import snapshot_matchups
+
+logger = logging.getLogger(__name__)
+
+# Seasons simulated for the page
+SIMULATION_TRIALS = 100_000
+
+# Seasons simulated at a time; bounds memory to CHUNK_TRIALS x remaining games
+CHUNK_TRIALS = 10_000
+
+# Worker processes for the simulation (0: run in the calling process)
+SIMULATION_WORKERS = 0
+
+# Finishing positions reported: top 4 (home court), top 6 (playoffs), top 10 (play-in)
+CUTOFFS = [4, 6, 10]
+
+# Possessions per game, to turn net ratings (per 100 possessions) into points
+PACE = 72
+
+# Standard deviation of a game's final margin around its expected margin
+MARGIN_SD = 12.0
+
+# Early in the season ratings are shrunk towards average as if every team had
+# also played this many average games
+PRIOR_GAMES = 5
+
+# Simulated rounds kept, one entry per season, round and games played
+ODDS_CACHE_SIZE = 16
+
+
+# Function to build a double round robin with the circle method: [(round, home, away)] of team positions
+def double_round_robin(n_teams):
+    rotation = list(range(n_teams + n_teams % 2))
+    first_half = []
+    for round_index in range(len(rotation) - 1):
+        for k in range(len(rotation) // 2):
+            home, away = rotation[k], rotation[-1 - k]
+            if round_index % 2:
+                home, away = away, home
+            if max(home, away) < n_teams:
+                first_half.append((round_index + 1, home, away))
+        rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
+    rounds = len(rotation) - 1
+    return first_half + [(round_number + rounds, away, home) for round_number, home, away in first_half]
+
+
+# Function to get the regular season games still to play as (home, away) index arrays.
+# With the season's games ingested, every pair of teams meets twice and the
+# head-to-head matrix says which meetings are left; otherwise the remaining
+# rounds of a round robin over the standings stand in for the real schedule.
+def remaining_games(standings, round_number, matchups=None):
+    codes = standings['club.tvCode'].astype(str).tolist()
+    played = standings['gamesPlayed'].to_numpy(dtype='int64')
+    if matchups is not None and all(code in matchups.index for code in codes):
+        rows = [matchups.index[code] for code in codes]
+        head_to_head = matchups.games[np.ix_(rows, rows)]
+        if np.array_equal(head_to_head.sum(axis=1), played):
+            left = np.triu(np.clip(2 - head_to_head, 0, 2), k=1)
+            home, away = np.nonzero(left)
+            counts = left[home, away]
+            return np.repeat(home, counts), np.repeat(away, counts), True
+    games = [(home, away) for round_index, home, away in double_round_robin(len(codes)) if round_index > round_number]
+    games = np.array(games, dtype=np.int64).reshape(-1, 2)
+    return games[:, 0], games[:, 1], False
+
+
+# Function to get each team's strength as its expected point margin against an
+# average team: the adjusted net rating from the advanced team stats, or the
+# standings' points difference per game when those are missing
+def team_strengths(standings, advanced_team_stats=None):
+    played = standings['gamesPlayed'].to_numpy(dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strength = (standings['pointsFor'].to_numpy(dtype='float64')
+                    - standings['pointsAgainst'].to_numpy(dtype='float64')) / played
+    if advanced_team_stats is not None and {'offensiveRating', 'defensiveRating'} <= set(advanced_team_stats):
+        ratings = advanced_team_stats.drop_duplicates('team.tvCodes').set_index('team.tvCodes')
+        ratings = ratings.reindex(standings['club.tvCode'].astype(str))
+        net = (ratings['offensiveRating'] - ratings['defensiveRating']).to_numpy(dtype='float64') * PACE / 100
+        strength = np.where(np.isnan(net), strength, net)
+    strength = np.nan_to_num(strength)
+    return strength * played / (played + PRIOR_GAMES)
+
+
+def normal_cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+# Function to simulate one chunk of seasons; returns how often each team
+# finished within each cutoff and the sum of its final wins over the chunk
+def simulate_chunk(wins, tiebreak, home, away, home_win_probability, trials, seed, cutoffs):
+    rng = np.random.default_rng(seed)
+    n_teams = len(wins)
+    # trials x games: 1 where the home team won; games x teams: who plays each game
+    home_won = (rng.random((trials, len(home)), dtype=np.float32) < home_win_probability).astype(np.float32)
+    home_team = np.zeros((len(home), n_teams), dtype=np.float32)
+    away_team = np.zeros((len(away), n_teams), dtype=np.float32)
+    home_team[np.arange(len(home)), home] = 1
+    away_team[np.arange(len(away)), away] = 1
+    final = wins[None, :] + home_won @ home_team + (1 - home_won) @ away_team
+    # Ties on wins are broken by the current points difference, then at random
+    score = final * 1e6 + tiebreak + rng.random((trials, n_teams))
+    order = np.argsort(-score, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+    counts = np.stack([(positions < cutoff).sum(axis=0) for cutoff in cutoffs], axis=1)
+    return counts, final.sum(axis=0)
+
+
+# Function to simulate the rest of the regular season `trials` times, in chunks
+# of CHUNK_TRIALS seasons (spread over `workers` processes when > 0). The seed
+# fixes every chunk's stream, so the odds don't depend on the number of workers.
+# Returns a frame per team: current record, projected wins and the odds of each cutoff.
+def simulate_season(standings, advanced_team_stats=None, matchups=None, round_number=None,
+                    trials=SIMULATION_TRIALS, workers=SIMULATION_WORKERS, seed=0, cutoffs=CUTOFFS):
+    standings = standings.sort_values('position')
+    if round_number is None:
+        round_number = int(standings['gamesPlayed'].max())
+    home, away, from_schedule = remaining_games(standings, round_number, matchups)
+    strength = team_strengths(standings, advanced_team_stats)
+    home_win_probability = np.array([normal_cdf(margin / MARGIN_SD) for margin in strength[home] - strength[away]],
+                                    dtype=np.float32)
+    wins = standings['gamesWon'].to_numpy(dtype='int64')
+    points_difference = (standings['pointsFor'] - standings['pointsAgainst']).to_numpy(dtype='float64')
+    # Scaled into [0, 1e5) so it only orders teams level on wins
+    tiebreak = 1e5 * (points_difference - points_difference.min() + 1) / (np.ptp(points_difference) + 2)
+
+    sizes = [min(CHUNK_TRIALS, trials - start) for start in range(0, trials, CHUNK_TRIALS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(wins, tiebreak, home, away, home_win_probability, size, chunk_seed, cutoffs)
+            for size, chunk_seed in zip(sizes, seeds)]
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(simulate_chunk, *zip(*args)))
+    else:
+        results = [simulate_chunk(*chunk_args) for chunk_args in args]
+    counts = sum(result[0] for result in results)
+    total_wins = sum(result[1] for result in results)
+
+    odds = pd.DataFrame({
+        'team': standings['club.tvCode'].astype(str).to_numpy(),
+        'name': standings['club.abbreviatedName'].to_numpy(),
+        'wins': wins,
+        'losses': standings['gamesLost'].to_numpy(dtype='int64'),
+        'projected_wins': total_wins / trials,
+    })
+    for k, cutoff in enumerate(cutoffs):
+        odds[f'top{cutoff}'] = counts[:, k] / trials
+    odds.attrs['remaining_games'] = len(home)
+    odds.attrs['from_schedule'] = from_schedule
+    odds.attrs['trials'] = trials
+    return odds.sort_values(['projected_wins', f'top{cutoffs[0]}'], ascending=False, ignore_index=True)
+
+
+_odds_cache = OrderedDict()
+# Simulations running, key -> Event set when it ends; callers asking for the
+# same key wait for that run, other keys simulate alongside it
+_odds_running = {}
+_odds_lock = threading.Lock()
+
+
+# Function to get (simulating once per round) the season odds of a snapshot. Refreshes
+# within a round reuse them until the standings count another game played.
+def season_odds(snapshot, trials=SIMULATION_TRIALS, workers=SIMULATION_WORKERS):
+    standings = snapshot.standings
+    if standings is None or standings.empty:
+        return None
+    key = (snapshot.season, snapshot.round_number, int(standings['gamesPlayed'].sum()), trials)
+    while True:
+        with _odds_lock:
+            if key in _odds_cache:
+                _odds_cache.move_to_end(key)
+                return _odds_cache[key]
+            running = _odds_running.get(key)
+            if running is None:
+                running = _odds_running[key] = threading.Event()
+                break
+        # Simulated by someone else meanwhile; if that run failed, try again here
+        running.wait()
+
+    try:
+        odds = simulate_season(standings, snapshot.advanced_team_stats, snapshot_matchups(snapshot),
+                               snapshot.round_number, trials=trials, workers=workers)
+        with _odds_lock:
+            _odds_cache[key] = odds
+            if len(_odds_cache) > ODDS_CACHE_SIZE:
+                _odds_cache.popitem(last=False)
+        return odds
+    finally:
+        with _odds_lock:
+            del _odds_running[key]
+        running.set()
+
+
+# Function to get the season odds of a snapshot, looked up once per snapshot
+def snapshot_odds(snapshot, trials=SIMULATION_TRIALS, workers=SIMULATION_WORKERS):
+    return snapshot.derive(('odds', trials), lambda snapshot: season_odds(snapshot, trials, workers))
+
+
+# Function to simulate a new snapshot's odds in a background thread, so the
+# first page showing them finds them ready (or waits for that run, not its own)
+def warm_odds_async(snapshot):
+    def warm():
+        try:
+            season_odds(snapshot)
+        except Exception:
+            logger.exception("Season odds of season %s failed", snapshot.season)
+
+    threading.Thread(target=warm, name=f'warm-odds-{snapshot.season}', daemon=True).start()
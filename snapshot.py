@@ -0,0 +1,94 @@
+import threading
+from datetime import datetime, timezone
+
+from schema import normalize_frames
+from timing import count, timed
+
+# The frames that make up a season, in the order get_api_data returns them
+FRAME_NAMES = ['standings', 'team_stats', 'advanced_team_stats', 'player_stats', 'advanced_player_stats']
+
+# A season's regular season data doesn't change after this (month, day) of its second year
+SEASON_FINAL_AFTER = (7, 1)
+
+
+class Snapshot:
+    # One fetch of a season: the five frames, the round they cover and when
+    # they were fetched. Snapshots are never modified once published; a refresh
+    # builds a new one and swaps it in. Anything computed from the frames can be
+    # memoized on the snapshot with derive(), so it is built once per snapshot.
+
+    def __init__(self, season, round_number, frames, fetched_at=None, errors=None):
+        self.season = season
+        self.round_number = round_number
+        self.fetched_at = fetched_at or datetime.now(timezone.utc)
+        self.errors = dict(errors or {})
+        for name in FRAME_NAMES:
+            setattr(self, name, frames.get(name))
+        # Changed in memory after the fetch (live.py): the next refresh fetches the season again
+        self.provisional = False
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    # Function to build a snapshot from freshly fetched data; the frames are
+    # validated and type-coerced here, once, so readers get numbers, not "52.3%"
+    @classmethod
+    def from_season_data(cls, season, season_data):
+        errors = dict(season_data['errors'])
+        frames = normalize_frames({name: season_data.get(name) for name in FRAME_NAMES}, errors)
+        return cls(season, season_data['round_number'], frames, errors=errors)
+
+    @property
+    def frames(self):
+        return {name: getattr(self, name) for name in FRAME_NAMES}
+
+    @property
+    def version(self):
+        return f"{self.season}-r{self.round_number}-{self.fetched_at:%Y%m%d%H%M%S}"
+
+    # Whether this snapshot was taken after its season ended, so it never needs refreshing
+    def is_final(self):
+        month, day = SEASON_FINAL_AFTER
+        season_end = datetime(self.season + 1, month, day, tzinfo=timezone.utc)
+        return not self.errors and self.fetched_at >= season_end
+
+    def is_empty(self):
+        return all(frame is None for frame in self.frames.values())
+
+    def age_seconds(self):
+        return (datetime.now(timezone.utc) - self.fetched_at).total_seconds()
+
+    # Function to fill frames that failed to fetch with the ones from an older snapshot
+    def fill_missing_from(self, previous):
+        if previous is None:
+            return
+        for name in FRAME_NAMES:
+            if getattr(self, name) is None and getattr(previous, name) is not None:
+                setattr(self, name, getattr(previous, name))
+
+    # Same tuple get_api_data has always returned
+    def as_tuple(self):
+        return (self.standings, self.team_stats, self.advanced_team_stats,
+                self.player_stats, self.advanced_player_stats, self.round_number)
+
+    # Function to build (once) and return something computed from this snapshot.
+    # Builds are timed and hits/misses counted per kind (the first part of a tuple name).
+    def derive(self, name, builder):
+        kind = name[0] if isinstance(name, tuple) else name
+        with self._lock:
+            if name in self._derived:
+                count('derive_requests', kind=kind, result='hit')
+            else:
+                count('derive_requests', kind=kind, result='miss')
+                with timed(f'build {kind}'):
+                    self._derived[name] = builder(self)
+            return self._derived[name]
+
+    # Function to drop a derived value so the next derive builds it again
+    def forget(self, name):
+        with self._lock:
+            self._derived.pop(name, None)
+
+    # Function to list everything derived from this snapshot so far; doesn't
+    # wait for a build in progress
+    def derived_values(self):
+        return list(self._derived.values())
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from schema import normalize_frames
+from snapshot import Snapshot
+
+logger = logging.getLogger(__name__)
+
+# Where snapshots live; override with EUROLEAGUE_DATA_DIR (e.g. a mounted volume)
+DATA_DIR = os.environ.get('EUROLEAGUE_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshots')
+
+# Versions kept per (season, round); older ones are pruned after each save
+KEEP_VERSIONS = 2
+
+
+# Function to write a frame as Parquet. Object columns pyarrow can't type
+# (mixed values from the JSON payloads) are stored as strings.
+def write_frame(frame, path):
+    try:
+        frame.to_parquet(path, index=False)
+    except (TypeError, ValueError) as exc:
+        logger.warning("Storing mixed-type columns of %s as strings (%s)", os.path.basename(path), exc)
+        frame = frame.copy()
+        for column in frame.columns[frame.dtypes == object]:
+            frame[column] = frame[column].map(lambda value: value if value is None else str(value))
+        frame.to_parquet(path, index=False)
+
+
+class SnapshotStore:
+    # Snapshots on disk, one directory per season, round and version:
+    #
+    #   snapshots/season=2024/round=20/20250301120000/standings.parquet
+    #                                                 team_stats.parquet ...
+    #                                                 manifest.json
+    #   snapshots/season=2024/latest.json   <- manifest of the newest snapshot
+    #
+    # A version directory is complete before latest.json is (atomically)
+    # replaced to point at it, so readers never see a half written snapshot.
+
+    def __init__(self, root=SNAPSHOT_DIR):
+        self.root = root
+
+    def season_dir(self, season):
+        return os.path.join(self.root, f'season={season}')
+
+    def round_dir(self, season, round_number):
+        return os.path.join(self.season_dir(season), f'round={round_number}')
+
+    def seasons(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name.split('=')[1]) for name in os.listdir(self.root)
+                      if name.startswith('season=') and os.path.exists(
+                          os.path.join(self.root, name, 'latest.json')))
+
+    def rounds(self, season):
+        season_dir = self.season_dir(season)
+        if not os.path.isdir(season_dir):
+            return []
+        return sorted(int(name.split('=')[1]) for name in os.listdir(season_dir) if name.startswith('round='))
+
+    def _read_json(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, path, data):
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # Function to get the manifest of the newest snapshot of a season (cheap, no frames read)
+    def latest_manifest(self, season):
+        return self._read_json(os.path.join(self.season_dir(season), 'latest.json'))
+
+    # Function to get the manifest of the newest version stored for one round
+    def round_manifest(self, season, round_number):
+        round_dir = self.round_dir(season, round_number)
+        if not os.path.isdir(round_dir):
+            return None
+        for version in sorted(os.listdir(round_dir), reverse=True):
+            manifest = self._read_json(os.path.join(round_dir, version, 'manifest.json'))
+            if manifest is not None:
+                return manifest
+        return None
+
+    def save(self, snapshot):
+        version = snapshot.fetched_at.strftime('%Y%m%d%H%M%S')
+        round_dir = self.round_dir(snapshot.season, snapshot.round_number)
+        version_dir = os.path.join(round_dir, version)
+        tmp_dir = os.path.join(round_dir, f'.{version}.{uuid.uuid4().hex}.tmp')
+        os.makedirs(tmp_dir)
+
+        frames = {}
+        for name, frame in snapshot.frames.items():
+            if frame is None:
+                continue
+            write_frame(frame, os.path.join(tmp_dir, f'{name}.parquet'))
+            frames[name] = f'{name}.parquet'
+
+        manifest = {
+            'season': snapshot.season,
+            'round_number': snapshot.round_number,
+            'fetched_at': snapshot.fetched_at.isoformat(),
+            'version': version,
+            'path': os.path.relpath(version_dir, self.root),
+            'frames': frames,
+            'errors': {name: str(error) for name, error in snapshot.errors.items()},
+        }
+        self._write_json(os.path.join(tmp_dir, 'manifest.json'), manifest)
+        if os.path.exists(version_dir):
+            shutil.rmtree(version_dir)
+        os.replace(tmp_dir, version_dir)
+
+        # Only move the season pointer forwards
+        latest = self.latest_manifest(snapshot.season)
+        if latest is None or (latest['round_number'], latest['fetched_at']) <= (
+                manifest['round_number'], manifest['fetched_at']):
+            self._write_json(os.path.join(self.season_dir(snapshot.season), 'latest.json'), manifest)
+
+        self._prune(round_dir)
+        return manifest
+
+    def _prune(self, round_dir):
+        versions = sorted(name for name in os.listdir(round_dir) if not name.startswith('.'))
+        for version in versions[:-KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(round_dir, version), ignore_errors=True)
+
+    # Function to read the frames of a manifest; columns optionally limits
+    # each frame to the listed columns (only those are read from disk).
+    # Listed columns an older snapshot doesn't have are skipped.
+    def read_frames(self, manifest, columns=None):
+        version_dir = os.path.join(self.root, manifest['path'])
+        frames = {}
+        for name, file_name in manifest['frames'].items():
+            path = os.path.join(version_dir, file_name)
+            wanted = None if columns is None else columns.get(name)
+            if wanted is not None:
+                stored = set(pq.read_schema(path).names)
+                wanted = [column for column in wanted if column in stored]
+            frames[name] = pd.read_parquet(path, columns=wanted)
+        return frames
+
+    # Function to load a stored snapshot: the newest one of the season, or of a given round
+    def load(self, season, round_number=None, columns=None):
+        if round_number is None:
+            manifest = self.latest_manifest(season)
+        else:
+            manifest = self.round_manifest(season, round_number)
+        if manifest is None:
+            return None
+        try:
+            frames = self.read_frames(manifest, columns)
+        except OSError:
+            # Pruned between reading the manifest and the files
+            logger.warning("Snapshot %s of season %s disappeared while loading", manifest['version'], season)
+            return None
+        # Snapshots stored before frames were normalized still hold strings;
+        # normalizing already compact frames only copies them
+        errors = dict(manifest['errors'])
+        frames = normalize_frames(frames, errors)
+        return Snapshot(manifest['season'], manifest['round_number'], frames,
+                        fetched_at=datetime.fromisoformat(manifest['fetched_at']),
+                        errors=errors)
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Most recent durations kept per section
+SAMPLES_KEPT = 200
+
+# Prefix of every exported metric name
+METRICS_PREFIX = 'euroleague'
+
+# Seconds between metrics written to the log (0: never)
+METRICS_LOG_SECONDS = 0
+
+_samples = defaultdict(lambda: deque(maxlen=SAMPLES_KEPT))
+# section -> [runs, total ms] since start, unlike _samples not capped
+_totals = defaultdict(lambda: [0, 0.0])
+# (name, labels) -> value
+_counters = defaultdict(int)
+_gauges = {}
+_lock = threading.Lock()
+_log_thread = None
+
+
+# Function to time a block of code under a section name:
+#
+#   with timed('charts'):
+#       ...
+@contextmanager
+def timed(section):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with _lock:
+            _samples[section].append(elapsed_ms)
+            _totals[section][0] += 1
+            _totals[section][1] += elapsed_ms
+        logger.debug("%s took %.1f ms", section, elapsed_ms)
+
+
+# Function to summarize the recorded durations: section -> runs, last, median and p95 (ms)
+def summary():
+    with _lock:
+        samples = {section: sorted(durations) for section, durations in _samples.items()}
+        last = {section: durations[-1] for section, durations in _samples.items()}
+    return {section: {'runs': len(durations),
+                      'last_ms': round(last[section], 2),
+                      'median_ms': round(durations[len(durations) // 2], 2),
+                      'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 2)}
+            for section, durations in samples.items()}
+
+
+# Function to add to a counter, e.g. count('cache_requests', cache='figures', result='hit')
+def count(name, amount=1, **labels):
+    with _lock:
+        _counters[(name, tuple(sorted(labels.items())))] += amount
+
+
+# Function to set a gauge to its current value, e.g. set_gauge('snapshot_bytes', 1e6, season=2024);
+# None removes it
+def set_gauge(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        if value is None:
+            _gauges.pop(key, None)
+        else:
+            _gauges[key] = value
+
+
+def _rows(values):
+    return [{'name': name, **dict(labels), 'value': value} for (name, labels), value in sorted(values.items())]
+
+
+# Function to list the counters as rows: name, labels and value
+def counter_rows():
+    with _lock:
+        return _rows(dict(_counters))
+
+
+# Function to list the gauges as rows: name, labels and value
+def gauge_rows():
+    with _lock:
+        return _rows(dict(_gauges))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _metric_line(name, labels, value):
+    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+    value = int(value) if float(value).is_integer() else float(value)
+    return f"{METRICS_PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{METRICS_PREFIX}_{name} {value}"
+
+
+# Function to render every metric in the Prometheus text exposition format:
+# section durations as summaries (median and p95 of the recent runs, count and
+# sum since start), counters and gauges
+def prometheus_text():
+    stages = summary()
+    with _lock:
+        totals = {section: tuple(total) for section, total in _totals.items()}
+        counter_values = sorted(_counters.items())
+        gauge_values = sorted(_gauges.items())
+
+    lines = [f"# TYPE {METRICS_PREFIX}_stage_duration_milliseconds summary"]
+    for section, stats in sorted(stages.items()):
+        labels = (('stage', section),)
+        lines.append(_metric_line('stage_duration_milliseconds', labels + (('quantile', '0.5'),), stats['median_ms']))
+        lines.append(_metric_line('stage_duration_milliseconds', labels + (('quantile', '0.95'),), stats['p95_ms']))
+        lines.append(_metric_line('stage_duration_milliseconds_count', labels, totals[section][0]))
+        lines.append(_metric_line('stage_duration_milliseconds_sum', labels, round(totals[section][1], 3)))
+    for kind, values, suffix in [('counter', counter_values, '_total'), ('gauge', gauge_values, '')]:
+        for name in sorted({name for (name, _), _ in values}):
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name}{suffix} {kind}")
+            for (other, labels), value in values:
+                if other == name:
+                    lines.append(_metric_line(name + suffix, labels, value))
+    return '\n'.join(lines) + '\n'
+
+
+# Function to write the metrics to the log every `seconds` (once per process)
+def start_metrics_log(seconds=METRICS_LOG_SECONDS):
+    global _log_thread
+    if not seconds or _log_thread is not None:
+        return
+
+    def run():
+        while True:
+            time.sleep(seconds)
+            logger.info("Metrics:\n%s", prometheus_text())
+    _log_thread = threading.Thread(target=run, name='metrics-log', daemon=True)
+    _log_thread.start()
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
+        _gauges.clear()
@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from ingest import RoundIngestor, normalize_player_codes, team_games
+from store import DATA_DIR, write_frame
+
+logger = logging.getLogger(__name__)
+
+TRENDS_DIR = os.path.join(DATA_DIR, 'trends')
+
+# Games in each rolling window
+TREND_WINDOW = 5
+
+# Rolling metric -> (numerator, denominator, scale). Without a denominator the
+# metric is the per-game average over the window; with one it is the ratio of
+# the window's sums (shooting over 5 games is made / attempted over those 5
+# games, not the average of 5 percentages).
+TEAM_TRENDS = {
+    'points': ('pointsScored', None, 1),
+    'pointsAgainst': ('pointsScoredAgainst', None, 1),
+    'pir': ('pir', None, 1),
+    'twoPointersPercentage': ('twoPointersMade', 'twoPointersAttempted', 100),
+    'threePointersPercentage': ('threePointersMade', 'threePointersAttempted', 100),
+    'freeThrowsPercentage': ('freeThrowsMade', 'freeThrowsAttempted', 100),
+    'offensiveRating': ('pointsScored', 'possessions', 100),
+    'defensiveRating': ('pointsScoredAgainst', 'possessionsAgainst', 100),
+}
+PLAYER_TRENDS = {
+    'points': ('pointsScored', None, 1),
+    'pir': ('pir', None, 1),
+    'minutes': ('minutesPlayed', None, 1),
+    'twoPointersPercentage': ('twoPointersMade', 'twoPointersAttempted', 100),
+    'threePointersPercentage': ('threePointersMade', 'threePointersAttempted', 100),
+    'freeThrowsPercentage': ('freeThrowsMade', 'freeThrowsAttempted', 100),
+}
+
+# Materialized tables: name -> (entity key column, metrics)
+TREND_TABLES = {
+    'teams': ('team.code', TEAM_TRENDS),
+    'players': ('player.code', PLAYER_TRENDS),
+}
+
+ORDER_COLUMNS = ['Season', 'Round', 'Gamecode']
+
+
+# Function to list the per-game columns a table's metrics are computed from
+def game_columns(metrics):
+    columns = []
+    for numerator, denominator, _ in metrics.values():
+        for column in (numerator, denominator):
+            if column is not None and column not in columns:
+                columns.append(column)
+    return columns
+
+
+# Function to sum each row's window of the last `window` rows of its group.
+# values is (rows, columns) ordered by group then time and groups holds each
+# row's group; one cumulative sum over the whole array gives every window as a
+# difference of two prefix sums. Returns the sums and the rows in each window.
+def rolling_sums(values, groups, window):
+    n = len(values)
+    cumulative = np.zeros((n + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    positions = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = groups[1:] != groups[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    first = np.maximum(positions - window + 1, group_start)
+    return cumulative[positions + 1] - cumulative[first], positions + 1 - first
+
+
+# Function to add the rolling metrics ('rolling.<metric>') of per-game rows,
+# each entity's games in time order; the first rows of an entity get shorter windows
+def add_rolling(games, key, metrics, window=TREND_WINDOW):
+    games = games.sort_values([key, *ORDER_COLUMNS], kind='stable').reset_index(drop=True)
+    columns = game_columns(metrics)
+    groups = games[key].astype('category').cat.codes.to_numpy()
+    sums, counts = rolling_sums(games[columns].to_numpy(dtype='float64'), groups, window)
+    sums = dict(zip(columns, sums.T))
+
+    rolling = {'rolling.games': counts.astype('int16')}
+    for metric, (numerator, denominator, scale) in metrics.items():
+        if denominator is None:
+            values = sums[numerator] / counts
+        else:
+            totals = sums[denominator]
+            values = np.where(totals > 0, sums[numerator] / np.where(totals > 0, totals, 1), np.nan)
+        rolling[f'rolling.{metric}'] = (values * scale).round(1).astype('float32')
+    return pd.concat([games, pd.DataFrame(rolling)], axis=1)
+
+
+# Function to build one row per team and game from stored boxscore rows
+def team_game_rows(rows, tv_codes):
+    games = team_games(rows).rename(columns={'Team': 'team.code'})
+    games['team.tvCodes'] = games['team.code'].map(tv_codes).fillna(games['team.code'])
+    return compact(games[[*ORDER_COLUMNS, 'team.code', 'team.tvCodes', *game_columns(TEAM_TRENDS)]])
+
+
+# Function to build one row per player and game played (DNPs skipped) from stored boxscore rows
+def player_game_rows(rows, tv_codes):
+    players = rows[(rows['Player_ID'] != 'Total') & (rows['minutesPlayed'] > 0)]
+    games = pd.DataFrame({
+        'player.code': normalize_player_codes(players['Player_ID']),
+        'player.name': players['Player'],
+        'player.team.code': players['Team'],
+    })
+    games['player.team.tvCodes'] = games['player.team.code'].map(tv_codes).fillna(games['player.team.code'])
+    games = pd.concat([players[ORDER_COLUMNS], games, players[game_columns(PLAYER_TRENDS)]], axis=1)
+    return compact(games)
+
+
+# Function to store per-game rows compactly: small ints for the order, float32 stats, categorical codes
+def compact(games):
+    games = games.reset_index(drop=True)
+    for column in ['Season', 'Round']:
+        games[column] = games[column].astype('int16')
+    games['Gamecode'] = games['Gamecode'].astype('int32')
+    for column in games.columns:
+        if column.endswith('.code') or column.endswith('.tvCodes'):
+            games[column] = games[column].astype('category')
+        elif pd.api.types.is_float_dtype(games[column]):
+            games[column] = games[column].astype('float32')
+    return games
+
+
+class TrendStore:
+    # Rolling per-game trends of every team and player, materialized per season
+    # next to the ingested boxscores:
+    #
+    #   trends/season=2024/teams.parquet
+    #                      players.parquet
+    #                      trends.json   <- games included, signature of each round file
+    #
+    # update() only reads the rounds whose boxscore file changed since the last
+    # update and computes the windows of the new games alone, seeded with the
+    # last TREND_WINDOW - 1 games of each team and player (the previous
+    # season's too, so windows carry over into a new season). A game that
+    # lands in an earlier round than games already materialized (a postponed
+    # game) rebuilds the season.
+
+    def __init__(self, root=TRENDS_DIR, ingestor=None, window=TREND_WINDOW):
+        self.root = root
+        self.ingestor = ingestor or RoundIngestor()
+        self.window = window
+        self._lock = threading.Lock()
+        self._updating = set()
+
+    def season_dir(self, season):
+        return os.path.join(self.root, f'season={season}')
+
+    def seasons(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name.split('=')[1]) for name in os.listdir(self.root) if name.startswith('season='))
+
+    def table_path(self, season, name):
+        return os.path.join(self.season_dir(season), f'{name}.parquet')
+
+    def manifest(self, season):
+        try:
+            with open(os.path.join(self.season_dir(season), 'trends.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, season, manifest):
+        path = os.path.join(self.season_dir(season), 'trends.json')
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # Function to read a season's materialized table ('teams' or 'players'), None if there is none
+    def load(self, season, name, columns=None):
+        path = self.table_path(season, name)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path, columns=columns)
+
+    # Function to fingerprint every stored boxscore round of a season: round -> [mtime, size]
+    def round_signatures(self, season):
+        season_dir = self.ingestor.season_dir(season)
+        if not os.path.isdir(season_dir):
+            return {}
+        signatures = {}
+        for name in os.listdir(season_dir):
+            if not name.startswith('round='):
+                continue
+            try:
+                stat = os.stat(os.path.join(season_dir, name, 'boxscores.parquet'))
+            except FileNotFoundError:
+                continue
+            signatures[name.split('=')[1]] = [stat.st_mtime_ns, stat.st_size]
+        return signatures
+
+    # Function to materialize the trends of the games ingested since the last
+    # update; returns the number of new games
+    def update(self, season):
+        with self._lock:
+            manifest = self.manifest(season) or {'games': [], 'rounds': {}}
+            signatures = self.round_signatures(season)
+            changed = {int(round_number) for round_number, signature in signatures.items()
+                       if manifest['rounds'].get(round_number) != signature}
+            if not changed:
+                return 0
+
+            rows = self.ingestor.load_rows(season, rounds=changed)
+            rows = rows[~rows['Gamecode'].isin(manifest['games'])]
+            new_games = sorted(int(code) for code in rows['Gamecode'].unique())
+            if new_games:
+                ingest_manifest = self.ingestor.manifest(season) or {}
+                tv_codes = ingest_manifest.get('tv_codes', {})
+                rebuild = bool(manifest['games']) and rows['Round'].min() < manifest.get('last_round', 0)
+                if rebuild:
+                    logger.info("Rebuilding the trends of season %s (a game of an earlier round came in)", season)
+                    rows = self.ingestor.load_rows(season)
+                    manifest['games'] = []
+                    new_games = sorted(int(code) for code in rows['Gamecode'].unique())
+                self._materialize(season, 'teams', team_game_rows(rows, tv_codes), rebuild)
+                self._materialize(season, 'players', player_game_rows(rows, tv_codes), rebuild)
+                manifest['last_round'] = max(manifest.get('last_round', 0), int(rows['Round'].max()))
+
+            manifest['games'] = sorted(set(manifest['games']) | set(new_games))
+            manifest['rounds'] = signatures
+            os.makedirs(self.season_dir(season), exist_ok=True)
+            self._write_manifest(season, manifest)
+            if new_games:
+                logger.info("Materialized trends of %d games of season %s", len(new_games), season)
+            return len(new_games)
+
+    # Function to compute the rolling metrics of new per-game rows and append them to a table
+    def _materialize(self, season, name, games, rebuild=False):
+        key, metrics = TREND_TABLES[name]
+        stored = None if rebuild else self.load(season, name)
+
+        # The last window - 1 games of every entity, from the previous season and this one
+        history = [table for table in (self.load(season - 1, name, columns=list(games.columns)), stored)
+                   if table is not None]
+        context = None
+        if history and self.window > 1:
+            context = pd.concat([table[games.columns] for table in history], ignore_index=True)
+            context = context[context[key].isin(games[key].unique())]
+            context = context.sort_values([key, *ORDER_COLUMNS], kind='stable').groupby(key, observed=True).tail(
+                self.window - 1)
+
+        combined = games if context is None else pd.concat([context.assign(_context=True), games],
+                                                           ignore_index=True)
+        computed = add_rolling(combined, key, metrics, self.window)
+        if context is not None:
+            computed = computed[computed['_context'].isna()].drop(columns='_context')
+
+        table = computed if stored is None else pd.concat([stored, computed], ignore_index=True)
+        table = compact(table.sort_values([*ORDER_COLUMNS, key], kind='stable'))
+        os.makedirs(self.season_dir(season), exist_ok=True)
+        path = self.table_path(season, name)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        write_frame(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def update_async(self, season):
+        with self._lock:
+            if season in self._updating:
+                return
+            self._updating.add(season)
+
+        def update():
+            try:
+                self.update(season)
+            except Exception:
+                logger.exception("Trend update of season %s failed", season)
+            finally:
+                with self._lock:
+                    self._updating.discard(season)
+
+        threading.Thread(target=update, name=f'trends-{season}', daemon=True).start()
+
+
+trend_store = TrendStore()
+
+
+# Function to get (reading once) a season's trend table for a snapshot,
+# bringing the materialized trends up to date with the ingested rounds first.
+# An empty load (boxscores not backfilled yet) isn't kept, so later pages get
+# the trends once they exist.
+def snapshot_trends(snapshot, name, store=None):
+    store = store or trend_store
+
+    def build(snapshot):
+        try:
+            store.update(snapshot.season)
+        except Exception:
+            logger.exception("Trend update of season %s failed", snapshot.season)
+        return store.load(snapshot.season, name)
+    trends = snapshot.derive(f'{name}_trends', build)
+    if trends is None or trends.empty:
+        snapshot.forget(f'{name}_trends')
+    return trends